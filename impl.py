@@ -1,29 +1,359 @@
 import os
 import pandas as pd
-import re
 import requests
 import sqlite3
 import json
 import csv
-from rdflib import Graph, URIRef, Literal, Namespace
-from pandas import read_csv
+from rdflib import Graph, Dataset, URIRef, Literal, Namespace
 from rdflib.namespace import RDF
-from sparql_dataframe import get
 from pandas import concat
-from rdflib.plugins.stores.sparqlstore import SPARQLUpdateStore
 from typing import List, Union, Optional
+from concurrent.futures import ThreadPoolExecutor, wait
+from collections import OrderedDict
+import threading
+import contextvars
+from itertools import repeat
+import time
+import sys
+import asyncio
+from io import StringIO
+from urllib.request import pathname2url
+
+# Directories searched for data files that are not found at the given path:
+# the working directory at the time of the search, then the directory of this
+# module. Extra roots can be added through the DS24_SEARCH_PATH environment
+# variable (separated by os.pathsep, like PATH).
+def search_roots() -> List[str]:
+    return [os.getcwd(), os.path.dirname(os.path.abspath(__file__))] + [
+        root for root in os.environ.get("DS24_SEARCH_PATH", "").split(os.pathsep) if root
+    ]
+
+FILE_INDEX_PATH = os.path.join(os.path.expanduser("~"), ".cache", "ds24project", "file_index.json")
+SKIPPED_DIRS = {".git", "__pycache__", "node_modules", ".venv", "venv", ".tox", ".mypy_cache"}
+
+
+class FileLocator(object):
+    def __init__(
+        self,
+        roots: Optional[List[str]] = None,
+        index_path: Optional[str] = FILE_INDEX_PATH,
+        max_depth: int = 6,
+        workers: int = 8,
+    ):
+        # None searches the default roots of search_roots()
+        self.roots = roots
+        self.index_path = index_path
+        self.max_depth = max_depth
+        self.workers = workers
+        self.index = self.load_index()
+        self.lock = threading.Lock()
+
+    def load_index(self) -> dict:
+        # The index maps the search roots and a file name, as a JSON list, to
+        # the path the file was found at and its mtime
+        if not self.index_path or not os.path.isfile(self.index_path):
+            return {}
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
 
-# To search for a file anywhere on the system
-def find_file(filename, search_path="/"):  # start search from the system root
-    for root, dirs, files in os.walk(search_path):
-        if filename in files:
-            return os.path.join(root, filename)
-    return None
+    def save_index(self):
+        if not self.index_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.index, f)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            print(f"Could not save file index: {e}")
+
+    def search_roots(self) -> List[str]:
+        roots = self.roots if self.roots is not None else search_roots()
+        resolved = []
+        for root in roots:
+            root = os.path.realpath(root)
+            if os.path.isdir(root) and root not in resolved:
+                resolved.append(root)
+        return resolved
+
+    def find(self, filename: str) -> Optional[str]:
+        roots = self.search_roots()
+
+        # Files sitting directly in a root win, in the order the roots are
+        # given, before anything cached
+        for root in roots:
+            candidate = os.path.join(root, filename)
+            if os.path.isfile(candidate):
+                return candidate
+
+        # Paths found deeper in the roots are cached by roots and file name,
+        # and used as long as the file is still there and unchanged
+        key = json.dumps([roots, filename])
+        entry = self.index.get(key)
+        if entry:
+            path, mtime = entry
+            try:
+                if os.stat(path).st_mtime == mtime:
+                    return path
+            except OSError:
+                pass
+
+        path = self.scan(filename, roots)
+        with self.lock:
+            if path:
+                self.index[key] = [path, os.stat(path).st_mtime]
+            else:
+                self.index.pop(key, None)
+            self.save_index()
+        return path
+
+    def scan(self, filename: str, roots: List[str]) -> Optional[str]:
+        # Walk the subdirectories of the roots (the roots themselves have
+        # been checked by find)
+        subdirs = []
+        for root in roots:
+            subdirs.extend(self.list_subdirs(root))
+        if not subdirs or self.max_depth < 1:
+            return None
+
+        # Walk the subtrees in parallel and stop everyone at the first hit
+        found = threading.Event()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [
+                executor.submit(self.walk, subdir, filename, 1, found)
+                for subdir in subdirs
+            ]
+            for future in futures:
+                path = future.result()
+                if path:
+                    found.set()
+                    return path
+        return None
+
+    def walk(self, directory: str, filename: str, depth: int, found: threading.Event) -> Optional[str]:
+        if found.is_set():
+            return None
+        candidate = os.path.join(directory, filename)
+        if os.path.isfile(candidate):
+            found.set()
+            return candidate
+        if depth >= self.max_depth:
+            return None
+        for subdir in self.list_subdirs(directory):
+            path = self.walk(subdir, filename, depth + 1, found)
+            if path:
+                return path
+        return None
+
+    def list_subdirs(self, directory: str) -> List[str]:
+        try:
+            with os.scandir(directory) as entries:
+                return sorted(
+                    entry.path
+                    for entry in entries
+                    if entry.is_dir(follow_symlinks=False)
+                    and entry.name not in SKIPPED_DIRS
+                    and not entry.name.startswith(".")
+                )
+        except OSError:
+            return []
+
+
+FILE_LOCATOR = FileLocator()
+
+# To search for a data file in the configured search roots
+def find_file(filename, search_path=None):
+    if search_path is not None:
+        return FileLocator([search_path], index_path=None).find(filename)
+    return FILE_LOCATOR.find(filename)
 
 BLAZEGRAPH_ENDPOINT = 'http://127.0.0.1:9999/blazegraph/sparql'
 CSV_FILEPATH = 'data/meta.csv'
-
+PROCESS_DB_FILE = 'json.db'
+# Triples sent per INSERT DATA request, and attempts per request, when
+# uploading metadata to a SPARQL endpoint
+SPARQL_BATCH_SIZE = 10000
+SPARQL_RETRIES = 3
+# Seconds allowed to connect to a SPARQL endpoint and to read its answer
+SPARQL_TIMEOUT = (5, 60)
+# Keep-alive connections pooled by the HTTP session of each handler
+SPARQL_CONNECTIONS = 10
+# Results of SPARQL queries kept in memory, and for how many seconds
+QUERY_CACHE_SIZE = 128
+QUERY_CACHE_TTL = 300
+# Ids sent in the VALUES block of a single batched SPARQL query
+SPARQL_VALUES_CHUNK = 500
+# Content types of the RDF files posted to Blazegraph, by extension
+RDF_CONTENT_TYPES = {
+    ".ttl": "application/x-turtle",
+    ".nt": "application/n-triples; charset=utf-8",
+    ".nq": "text/x-nquads; charset=utf-8",
+}
+# RDF formats of the files of a local RDF store, by extension. Other
+# extensions are left to rdflib to guess.
+LOCAL_RDF_FORMATS = {
+    ".nt": "nt",
+    ".nq": "nquads",
+    ".ttl": "turtle",
+    ".trig": "trig",
+}
+# Rows of meta.csv converted to RDF at a time when streaming
+CSV_CHUNK_SIZE = 50000
+# Tables of the SQLite mirror of the catalog, and the schema name it is
+# attached under to a process database, so activities and objects can be
+# joined in a single query
+CATALOG_TABLES = {
+    "object": "id TEXT PRIMARY KEY, type_name TEXT, title TEXT, date TEXT, owner TEXT, place TEXT",
+    "author": "iri TEXT PRIMARY KEY, id TEXT, name TEXT",
+    "authorship": "object_id TEXT, author TEXT, PRIMARY KEY (object_id, author)",
+}
+CATALOG_SCHEMA = "catalog"
+
+# Activity tables filled from process.json: JSON key -> (table, columns)
+ACTIVITY_COLUMNS = ["object_id", "responsible_institute", "responsible_person", "tool", "start_date", "end_date"]
+ACTIVITY_TABLES = {
+    "acquisition": ("Acquisition", ["object_id", "responsible_institute", "responsible_person", "technique", "tool", "start_date", "end_date"]),
+    "processing": ("Processing", ACTIVITY_COLUMNS),
+    "modelling": ("Modelling", ACTIVITY_COLUMNS),
+    "optimising": ("Optimising", ACTIVITY_COLUMNS),
+    "exporting": ("Exporting", ACTIVITY_COLUMNS),
+}
+# Separator of the tools of an activity, stored together in the tool column
+TOOL_SEPARATOR = ", "
+# Table column -> key of the activity object in process.json
+ACTIVITY_FIELDS = {
+    "responsible_institute": "responsible institute",
+    "responsible_person": "responsible person",
+    "technique": "technique",
+    "start_date": "start date",
+    "end_date": "end date",
+}
+# Optional single-table layout holding every activity, keyed by (object_id, type)
+UNIFIED_ACTIVITY_TABLE = "activity"
+UNIFIED_ACTIVITY_COLUMNS = ["object_id", "type", "responsible_institute", "responsible_person", "technique", "tool", "start_date", "end_date"]
+# Columns searched by substring through the trigram index of each activity
+# table (<table>_search)
+SEARCH_COLUMNS = ["responsible_institute", "responsible_person", "technique", "tool"]
+# SQLite PRAGMAs applied to the connection used for bulk loads
+LOAD_PRAGMAS = {"journal_mode": "WAL", "synchronous": "OFF"}
+# Number of JSON objects written to SQLite per executemany batch
+LOAD_BATCH_SIZE = 5000
+# Object ids per IN list when activities are selected by object, small
+# enough for the parameter limit of SQLite even across the five tables
+SQL_IN_CHUNK = 150
+# Seconds a mashup waits for its query handlers, which all run at once
+HANDLER_TIMEOUT = 30
+# Threads shared by all the mashups to query their handlers
+HANDLER_EXECUTOR = ThreadPoolExecutor(max_workers=16, thread_name_prefix="handler")
+# time.monotonic() by which the handler call in progress must be over, set
+# by the mashups. The handlers bound their HTTP requests and interrupt their
+# SQLite statements with it, so a call given up on does not keep its worker
+# thread busy.
+CALL_DEADLINE = contextvars.ContextVar("call_deadline", default=None)
+
+
+# To call a handler method in a worker thread with the deadline of the call
+def call_with_deadline(function, deadline: float, *args):
+    token = CALL_DEADLINE.set(deadline)
+    try:
+        return function(*args)
+    finally:
+        CALL_DEADLINE.reset(token)
+
+
+# Seconds left before the deadline of the current call (None without one)
+def time_left() -> Optional[float]:
+    deadline = CALL_DEADLINE.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+# To parse a top-level JSON array one element at a time, so that memory use
+# does not depend on the size of the file
+def iter_json_array(file, chunk_size=65536):
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def skip_whitespace():
+        nonlocal buffer, pos, eof
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer, pos = chunk, 0
+
+    skip_whitespace()
+    if pos >= len(buffer) or buffer[pos] != "[":
+        raise ValueError("Expected a JSON array at the top level")
+    pos += 1
+
+    expect_value = True
+    while True:
+        skip_whitespace()
+        if pos >= len(buffer):
+            raise ValueError("Unexpected end of JSON array")
+        if buffer[pos] == "]":
+            return
+        if not expect_value:
+            if buffer[pos] != ",":
+                raise ValueError(f"Expected ',' or ']' in JSON array, found {buffer[pos]!r}")
+            pos += 1
+            skip_whitespace()
+
+        # Read more input until the next element decodes completely
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+                if end < len(buffer) or eof:
+                    break
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+
+        yield value
+        # The buffer is only cut when more input is read, so a chunk of many
+        # small elements is not copied once per element
+        pos = end
+        expect_value = False
+
+
+# To group an iterable into lists of at most size items
+def iter_batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+# To share one copy of strings repeated across many objects (owners, places,
+# institutes...). Values that are not strings are returned unchanged.
+def intern_str(value):
+    if type(value) == str:
+        return sys.intern(value)
+    return value
+
+
+# The domain classes use __slots__ instead of a per-instance __dict__, so the
+# whole catalog and its activities can be kept in memory cheaply
 class IdentifiableEntity(object):  
+    __slots__ = ("id",)
+
     def __init__(self, id: str):
         self.id = id
 
@@ -32,6 +362,8 @@ class IdentifiableEntity(object):
 
 
 class Person(IdentifiableEntity):   
+    __slots__ = ("name",)
+
     def __init__(self, id: str, name: str):
         self.name = name
         super().__init__(id)
@@ -41,6 +373,8 @@ class Person(IdentifiableEntity):
 
 
 class CulturalHeritageObject(IdentifiableEntity):   
+    __slots__ = ("title", "date", "owner", "place", "hasAuthor")
+
     def __init__(
         self,
         id: str,
@@ -56,16 +390,25 @@ class CulturalHeritageObject(IdentifiableEntity):
         self.id = id
         self.title = title
         self.date = date
-        self.hasAuthor = hasAuthor or []
-        self.owner = str(owner)
-        self.place = place
-        self.author_id = author_id
-        self.author_name = author_name
+        self.hasAuthor = []
+        self.owner = intern_str(str(owner))
+        self.place = intern_str(place)
 
         if type(hasAuthor) == Person:
-            self.hasAuthor.append(Person)
+            self.hasAuthor.append(hasAuthor)
         elif type(hasAuthor) == list:
             self.hasAuthor = hasAuthor
+        # author_id and author_name are only kept as the author they describe
+        if not self.hasAuthor and author_id and author_name:
+            self.hasAuthor.append(Person(author_id, author_name))
+
+    @property
+    def author_id(self) -> Optional[str]:
+        return "; ".join(str(author.id) for author in self.hasAuthor) or None
+
+    @property
+    def author_name(self) -> Optional[str]:
+        return "; ".join(str(author.name) for author in self.hasAuthor) or None
 
     def getTitle(self) -> str:
         return self.title
@@ -86,46 +429,250 @@ class CulturalHeritageObject(IdentifiableEntity):
 
 
 class NauticalChart(CulturalHeritageObject):
-    pass
+    __slots__ = ()
 
 
 class ManuscriptPlate(CulturalHeritageObject):
-    pass
+    __slots__ = ()
 
 
 class ManuscriptVolume(CulturalHeritageObject):
-    pass
+    __slots__ = ()
 
 
 class PrintedVolume(CulturalHeritageObject):
-    pass
+    __slots__ = ()
 
 
 class PrintedMaterial(CulturalHeritageObject):
-    pass
+    __slots__ = ()
 
 
 class Herbarium(CulturalHeritageObject):
-    pass
+    __slots__ = ()
 
 
 class Specimen(CulturalHeritageObject):
-    pass
+    __slots__ = ()
 
 
 class Painting(CulturalHeritageObject):
-    pass
+    __slots__ = ()
 
 
 class Model(CulturalHeritageObject):
-    pass
+    __slots__ = ()
 
 
 class Map(CulturalHeritageObject):
-    pass
+    __slots__ = ()
+
+
+# Class of each type_name returned by the metadata queries
+OBJECT_CLASSES = {
+    "NauticalChart": NauticalChart,
+    "ManuscriptPlate": ManuscriptPlate,
+    "ManuscriptVolume": ManuscriptVolume,
+    "PrintedVolume": PrintedVolume,
+    "PrintedMaterial": PrintedMaterial,
+    "Herbarium": Herbarium,
+    "Specimen": Specimen,
+    "Painting": Painting,
+    "Model": Model,
+    "Map": Map,
+}
+
+
+# To read a DataFrame column as a list of strings, with None for missing
+# values. The first of the given column names found is used.
+def column_values(df: pd.DataFrame, *names: str) -> list:
+    for name in names:
+        if name in df.columns:
+            values = df[name]
+            return [
+                None if missing or value == "" else str(value)
+                for value, missing in zip(values.tolist(), values.isna().tolist())
+            ]
+    return [None] * len(df)
+
+
+# Separators of the grouped authors column returned by the metadata queries:
+# one "id<TAB>name" pair per line
+AUTHOR_FIELD_SEPARATOR = "\t"
+AUTHOR_SEPARATOR = "\n"
+# Identifier stored for the authors of meta.csv given without one
+NO_AUTHOR_ID = "noID"
+
+
+# To turn a grouped authors value into (id, name) pairs
+def split_authors(authors: Optional[str]) -> list:
+    pairs = []
+    for entry in (authors or "").split(AUTHOR_SEPARATOR):
+        author_id, _, author_name = entry.partition(AUTHOR_FIELD_SEPARATOR)
+        if author_id and author_name:
+            pairs.append((author_id, author_name))
+    return pairs
+
+
+# Keeps one shared Person and CulturalHeritageObject instance per id for the
+# lifetime of a mashup (cleanMetadataHandlers empties it). Activities refer
+# to their objects through an ObjectReference until refersTo() is first
+# called: the objects of every reference still pending are then loaded at
+# once by load_objects, a function taking a list of ids.
+class IdentityMap(object):
+    def __init__(self, load_objects=None):
+        self.load_objects = load_objects
+        self.people = {}
+        self.objects = {}
+        # Ids referenced by activities and not loaded yet
+        self.pending = set()
+        # Ids the metadata handlers did not have, by bare object
+        self.missing = {}
+
+    def clear(self):
+        self.people.clear()
+        self.objects.clear()
+        self.pending.clear()
+        self.missing.clear()
+
+    def person(self, id: str, name: Optional[str] = None) -> Person:
+        key = str(id)
+        if not id or key == NO_AUTHOR_ID:
+            # Authors without an identifier are not the same person
+            return Person(key, name)
+        person = self.people.get(key)
+        if person is None:
+            person = self.people[key] = Person(key, name)
+        elif name:
+            person.name = name
+        return person
+
+    def loaded_object(self, key: str) -> Optional[CulturalHeritageObject]:
+        obj = self.objects.get(key)
+        return self.missing.get(key) if obj is None else obj
+
+    def object_reference(self, id: str):
+        # The loaded object with this id, or a reference resolved on first use
+        key = str(id)
+        obj = self.loaded_object(key)
+        if obj is not None:
+            return obj
+        self.pending.add(key)
+        return ObjectReference(key, self)
+
+    def resolve(self, id: str) -> CulturalHeritageObject:
+        key = str(id)
+        if self.loaded_object(key) is None:
+            ids = sorted(key for key in self.pending | {key} if self.loaded_object(key) is None)
+            self.pending.clear()
+            if self.load_objects is not None:
+                self.load_objects(ids)
+        obj = self.loaded_object(key)
+        if obj is None:
+            # Known only by its id
+            obj = self.missing[key] = CulturalHeritageObject(key, "", "", "", "")
+        return obj
+
+    def cultural_heritage_object(
+        self,
+        cls: type,
+        id: str,
+        title: str,
+        date: Optional[str],
+        owner: str,
+        place: str,
+        hasAuthor: Optional[List[Person]] = None,
+    ) -> CulturalHeritageObject:
+        key = str(id)
+        self.missing.pop(key, None)
+        obj = self.objects.get(key)
+        if obj is None or type(obj) is not cls:
+            obj = self.objects[key] = cls(key, title, date, owner, place, hasAuthor)
+            return obj
+        obj.title = title
+        obj.date = date
+        obj.owner = intern_str(str(owner))
+        obj.place = intern_str(place)
+        if hasAuthor is not None:
+            obj.hasAuthor = hasAuthor
+        return obj
+
+
+# The object of an activity until it is first asked for
+class ObjectReference(object):
+    __slots__ = ("id", "identity_map")
+
+    def __init__(self, id: str, identity_map: IdentityMap):
+        self.id = id
+        self.identity_map = identity_map
+
+    def resolve(self) -> CulturalHeritageObject:
+        return self.identity_map.resolve(self.id)
+
+
+# To build CulturalHeritageObject instances from the rows of a metadata
+# query, dispatching type_name through OBJECT_CLASSES. Objects are grouped by
+# id, so an object listed once per author still comes back once, with all of
+# its authors in hasAuthor. With an identity_map, objects and authors are
+# resolved through it instead of being created anew.
+def materialize_objects(df: pd.DataFrame, identity_map: Optional[IdentityMap] = None) -> list:
+    if df is None or df.empty:
+        return []
+    if identity_map is None:
+        identity_map = IdentityMap()
+    classes = df["type_name"].map(OBJECT_CLASSES).tolist()
+    if "authors" in df.columns:
+        author_pairs = [split_authors(value) for value in column_values(df, "authors")]
+    else:
+        author_pairs = [
+            [(author_id, author_name)] if author_id and author_name else []
+            for author_id, author_name in zip(
+                column_values(df, "author_id"),
+                column_values(df, "author_name", "name"),
+            )
+        ]
+    rows = {}
+    for cls, id, title, date, owner, place, pairs in zip(
+        classes,
+        column_values(df, "id"),
+        column_values(df, "title"),
+        column_values(df, "date"),
+        column_values(df, "owner"),
+        column_values(df, "place"),
+        author_pairs,
+    ):
+        if not isinstance(cls, type):
+            continue  # No class defined for this type
+        key = id if id is not None else len(rows)  # Rows without an id stay apart
+        row = rows.get(key)
+        if row is None:
+            row = rows[key] = (cls, id, title, date, owner, place, {})
+        for author_id, author_name in pairs:
+            # Authors without an identifier are told apart by name
+            key = (author_id, author_name) if author_id == NO_AUTHOR_ID else author_id
+            row[6].setdefault(key, (author_id, author_name))
+
+    objects = []
+    for cls, id, title, date, owner, place, authors in rows.values():
+        has_author = [
+            identity_map.person(author_id, author_name)
+            for author_id, author_name in authors.values()
+        ]
+        if id is None:
+            objects.append(cls(id, title, date, owner, place, has_author))
+        else:
+            objects.append(
+                identity_map.cultural_heritage_object(
+                    cls, id, title, date, owner, place, has_author
+                )
+            )
+    return objects
 
 
 class Activity(object):   
+    # refersTo is a method, so the object is stored in refers_to
+    __slots__ = ("refers_to", "institute", "person", "tool", "start", "end")
+
     def __init__(
         self,
         refersTo: CulturalHeritageObject,
@@ -135,17 +682,17 @@ class Activity(object):
         start: Optional[str],
         end: Union[str, List[str], None],
     ):
-        self.refersTo = refersTo
-        self.institute = institute
-        self.person = person
+        self.refers_to = refersTo
+        self.institute = intern_str(institute)
+        self.person = intern_str(person)
         self.tool = []
         self.start = start
         self.end = end
 
         if type(tool) == str:
-            self.tool.append(tool)
+            self.tool.append(intern_str(tool))
         elif type(tool) == list:
-            self.tool = tool
+            self.tool = [intern_str(item) for item in tool]
 
     def getResponsibleInstitute(self) -> str:
         return self.institute
@@ -169,10 +716,14 @@ class Activity(object):
         return None
 
     def refersTo(self) -> CulturalHeritageObject:
-        return self.refersTo
+        if isinstance(self.refers_to, ObjectReference):
+            self.refers_to = self.refers_to.resolve()
+        return self.refers_to
 
 
 class Acquisition(Activity):
+    __slots__ = ("technique",)
+
     def __init__(
         self,
         refersTo: CulturalHeritageObject,
@@ -184,26 +735,284 @@ class Acquisition(Activity):
         tool: Union[str, List[str], None],
     ):
         super().__init__(refersTo, institute, person, tool, start, end)
-        self.technique = technique
+        self.technique = intern_str(technique)
 
     def getTechnique(self) -> str:
         return self.technique
 
 
 class Processing(Activity):
-    pass
+    __slots__ = ()
 
 
 class Modelling(Activity):
-    pass
+    __slots__ = ()
 
 
 class Optimising(Activity):
-    pass
+    __slots__ = ()
 
 
 class Exporting(Activity):
-    pass
+    __slots__ = ()
+
+
+# Activity type (as in the type column of the activity queries) -> class
+ACTIVITY_CLASSES = {
+    "Acquisition": Acquisition,
+    "Processing": Processing,
+    "Modelling": Modelling,
+    "Optimising": Optimising,
+    "Exporting": Exporting,
+}
+
+
+# To build Activity instances from the rows of an activity query, dispatching
+# the type column through ACTIVITY_CLASSES. The objects they refer to come
+# from identity_map when given. Unless quiet, the activities are listed as
+# they were created.
+def materialize_activities(
+    df: pd.DataFrame, identity_map=None, quiet: bool = True
+) -> List[Activity]:
+    if df is None or df.empty:
+        return []
+    if "type" not in df.columns:
+        print("Warning: 'type' column not found in the DataFrame.")
+        return []
+    if identity_map is None:
+        identity_map = IdentityMap()
+    classes = df["type"].map(ACTIVITY_CLASSES).tolist()
+    activities = []
+    for cls, object_id, institute, person, technique, tool, start, end in zip(
+        classes,
+        column_values(df, "object_id"),
+        column_values(df, "responsible_institute"),
+        column_values(df, "responsible_person"),
+        column_values(df, "technique"),
+        column_values(df, "tool"),
+        column_values(df, "start_date"),
+        column_values(df, "end_date"),
+    ):
+        if not isinstance(cls, type):
+            continue  # No class defined for this type
+        refers_to = identity_map.object_reference(object_id)
+        tools = tool.split(TOOL_SEPARATOR) if tool else None
+        if cls is Acquisition:
+            activity = Acquisition(refers_to, institute, technique, person, start, end, tools)
+        else:
+            activity = cls(refers_to, institute, person, tools, start, end)
+        activities.append(activity)
+
+    if not quiet:
+        print("Activities list created:")
+        for activity in activities:
+            print(
+                f"Activity Type: {type(activity).__name__}, "
+                f"Responsible Institute: {activity.institute}, "
+                f"Responsible Person: {activity.person}, "
+                f"Tool: {activity.tool}, "
+                f"Start Date: {activity.start}, "
+                f"End Date: {activity.end}"
+            )
+    return activities
+
+
+# To open the HTTP session a handler sends all its SPARQL requests through:
+# its connections are kept alive and reused, and answers may come compressed
+def sparql_session(connections: int = SPARQL_CONNECTIONS) -> requests.Session:
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=connections, pool_maxsize=connections
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["Accept-Encoding"] = "gzip, deflate"
+    return session
+
+
+class QueryCache(object):
+    # Least recently used SPARQL results, by (endpoint, query text), each
+    # kept for at most ttl seconds. Callers get a copy, so changing it does
+    # not change the cached result.
+    def __init__(self, max_entries: int = QUERY_CACHE_SIZE, ttl: float = QUERY_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, endpoint: str, query: str) -> Optional[pd.DataFrame]:
+        key = (endpoint, query)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self.entries[key]  # Expired
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+        return entry[1].copy()
+
+    def put(self, endpoint: str, query: str, result: pd.DataFrame):
+        with self.lock:
+            self.entries[(endpoint, query)] = (time.monotonic() + self.ttl, result.copy())
+            self.entries.move_to_end((endpoint, query))
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, endpoint: Optional[str] = None):
+        # Forget the results of one endpoint, or of all of them
+        with self.lock:
+            if endpoint is None:
+                self.entries.clear()
+            else:
+                for key in [key for key in self.entries if key[0] == endpoint]:
+                    del self.entries[key]
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries)}
+
+
+# Shared by the metadata query handlers, and cleared by the upload handlers
+# whenever they change the data of an endpoint
+QUERY_CACHE = QueryCache()
+
+
+# To read the CSV results of a SPARQL SELECT query, as sparql_dataframe does.
+# Values are kept as text, so identifiers such as "1" are not turned into
+# numbers and compare equal to the ones stored in SQLite.
+def sparql_frame(text: str) -> pd.DataFrame:
+    return pd.read_csv(StringIO(text), sep=",", dtype=str)
+
+
+# To tell a local RDF store, queried in-process, from a SPARQL endpoint:
+# an RDF file (which may not exist yet) or a directory holding a persistent
+# rdflib store
+def is_local_rdf_store(pathOrUrl: str) -> bool:
+    if not pathOrUrl or pathOrUrl.startswith(("http://", "https://")):
+        return False
+    _, extension = os.path.splitext(pathOrUrl)
+    return extension.lower() in LOCAL_RDF_FORMATS or os.path.isdir(pathOrUrl)
+
+
+def rdf_format(file_path: str) -> str:
+    from rdflib.util import guess_format
+
+    _, extension = os.path.splitext(file_path)
+    return LOCAL_RDF_FORMATS.get(extension.lower()) or guess_format(file_path) or "turtle"
+
+
+class LocalRDFStore(object):
+    # In-process triple store answering the metadata queries without HTTP.
+    # An RDF file is parsed into memory on the first query, and parsed again
+    # only after it changes on disk. A directory holds a persistent rdflib
+    # BerkeleyDB store instead (an optional dependency), opened once.
+    # rdflib is not thread-safe, so queries and uploads take turns.
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        self.persistent = os.path.isdir(self.path)
+        self.lock = threading.RLock()
+        self.graph = None
+        self.version = None
+        self.writes = 0
+
+    def disk_version(self):
+        # Changes whenever the file is rewritten (None while it does not exist)
+        if self.persistent:
+            return self.writes
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def cache_key(self) -> str:
+        # Cached results are kept by store and version, so an upload or an
+        # edit of the file makes the old ones unreachable
+        return f"{self.path}@{self.disk_version()}"
+
+    def is_quads(self, file_path: str) -> bool:
+        return rdf_format(file_path) in ("nquads", "trig")
+
+    def open_graph(self):
+        if self.persistent:
+            if self.graph is None:
+                from rdflib.plugin import PluginException
+
+                try:
+                    graph = Dataset(store="BerkeleyDB", default_union=True)
+                except PluginException:
+                    raise ImportError(
+                        "A persistent local RDF store requires berkeleydb (pip install berkeleydb)"
+                    )
+                graph.open(self.path, create=True)
+                self.graph = graph
+            return self.graph
+
+        version = self.disk_version()
+        if self.graph is None or version != self.version:
+            # Named graphs are queried as a whole, as Blazegraph does
+            graph = Dataset(default_union=True) if self.is_quads(self.path) else Graph()
+            if version is not None:
+                graph.parse(self.path, format=rdf_format(self.path))
+            self.graph, self.version = graph, version
+        return self.graph
+
+    def query(self, query: str) -> pd.DataFrame:
+        # Results are text like the CSV of an endpoint: unbound values are NaN
+        with self.lock:
+            result = self.open_graph().query(query)
+            columns = [str(var) for var in result.vars]
+            rows = [
+                [float("nan") if value is None else str(value) for value in row]
+                for row in result
+            ]
+        return pd.DataFrame(rows, columns=columns, dtype=object)
+
+    def add_file(self, file_path: str):
+        # Add the triples of an RDF file, and write a file store back to disk
+        with self.lock:
+            graph = self.open_graph()
+            if self.is_quads(file_path) and not isinstance(graph, Dataset):
+                # A plain graph would drop the quads, so only their triples are kept
+                quads = Dataset(default_union=True)
+                quads.parse(file_path, format=rdf_format(file_path))
+                graph.addN((s, p, o, graph) for s, p, o in quads.triples((None, None, None)))
+            else:
+                graph.parse(file_path, format=rdf_format(file_path))
+
+            if self.persistent:
+                graph.commit()
+                self.writes += 1
+            else:
+                temporary = self.path + ".tmp"
+                graph.serialize(destination=temporary, format=rdf_format(self.path), encoding="utf-8")
+                os.replace(temporary, self.path)
+                self.version = self.disk_version()
+
+    def close(self):
+        with self.lock:
+            if self.persistent and self.graph is not None:
+                self.graph.close()
+            self.graph = None
+            self.version = None
+
+
+# One store per path, shared by the upload and the query handlers of the
+# process so they see each other's changes
+LOCAL_RDF_STORES = {}
+LOCAL_RDF_STORES_LOCK = threading.Lock()
+
+
+def open_local_rdf_store(path: str) -> LocalRDFStore:
+    with LOCAL_RDF_STORES_LOCK:
+        store = LOCAL_RDF_STORES.get(os.path.abspath(path))
+        if store is None:
+            store = LOCAL_RDF_STORES[os.path.abspath(path)] = LocalRDFStore(path)
+        return store
 
 
 class Handler(object):   
@@ -219,20 +1028,42 @@ class Handler(object):
 
 
 class UploadHandler(Handler):   
-    def __init__(self):
+    def __init__(self, output_format: str = "nt"):
         super().__init__()
+        # RDF is streamed to disk as N-Triples ("nt") or N-Quads ("nq") while
+        # the CSV is read, or built in memory and serialized as Turtle ("ttl")
+        if output_format not in ("nt", "nq", "ttl"):
+            raise ValueError(f"Unknown RDF output format: {output_format}")
+        self.output_format = output_format
+        # Named graph of the N-Quads output (None writes to the default graph)
+        self.graph_name = None
+        # Pooled HTTP session used for every request to the SPARQL endpoint
+        self.session = sparql_session()
+        self.timeout = SPARQL_TIMEOUT
+
+    def sparql_endpoint(self) -> str:
+        # The endpoint set with setDbPathOrUrl, or the default Blazegraph one
+        if self.dbPathOrUrl.startswith(("http://", "https://")):
+            return self.dbPathOrUrl
+        return BLAZEGRAPH_ENDPOINT
+
+    def local_store(self) -> Optional[LocalRDFStore]:
+        # The local RDF store set with setDbPathOrUrl, if any
+        if is_local_rdf_store(self.dbPathOrUrl):
+            return open_local_rdf_store(self.dbPathOrUrl)
+        return None
 
     def pushDataToDb(self, file_path: str) -> bool:
         # If the file is not found at the provided path, search for it
+        file_name = os.path.basename(file_path)  # Extract file name from the path
         if not os.path.isfile(file_path):
-            file_name = os.path.basename(file_path)  # Extract file name from the path
-            file_path = find_file(file_name)  # Search the entire system for the file
+            file_path = find_file(file_name)  # Search the configured roots for the file
 
         if not file_path:
             raise FileNotFoundError(f"File '{file_name}' not found.")
 
         self.file_path = file_path
-        blazegraph_endpoint = "http://127.0.0.1:9999/blazegraph/sparql"
+        blazegraph_endpoint = self.sparql_endpoint()
 
         # Split file path for file extension
         _, extension = os.path.splitext(file_path)
@@ -258,29 +1089,29 @@ class UploadHandler(Handler):
         return True
 
     def upload_json_to_sqlite(self, file_path: str) -> bool:
-        # Implement logic for processing JSON data and uploading to SQLite
-        with open(file_path, 'r') as file:
-            data = json.load(file)
-
-        with sqlite3.connect(self.dbPathOrUrl) as conn:
-            for record in data:
-                for table, rows in record.items():
-                    if isinstance(rows, list):
-                        pd.DataFrame(rows).to_sql(table, conn, if_exists='replace')
-        print("Uploaded JSON data to SQLite database successfully.")
+        # Stream the JSON objects into the activity tables in fixed-size batches
+        changed = ActivityLoader(self.dbPathOrUrl).load_file(file_path)
+        print(f"Uploaded JSON data to SQLite database successfully ({changed} rows changed).")
         return True
 
     def upload_csv_to_blazegraph(self, file_path: str, sparql_endpoint: str) -> bool:
         # Implement logic for processing CSV data and uploading RDF to Blazegraph
-        graph = Graph()
-        self.csv_to_rdf(file_path, graph)
-
-        local_turtle_file = "output_triples.ttl"
-        graph.serialize(destination=local_turtle_file, format="turtle")
+        output_file = f"output_triples.{self.output_format}"
+        if self.output_format == "ttl":
+            graph = Graph()
+            self.csv_to_rdf(file_path, graph)
+            graph.serialize(destination=output_file, format="turtle")
+        else:
+            with RDFStreamWriter(output_file, self.output_format, self.graph_name) as writer:
+                self.csv_to_rdf(file_path, writer)
 
-        return self.upload_to_blazegraph(local_turtle_file, sparql_endpoint)
+        store = self.local_store()
+        if store is not None:
+            return self.upload_to_local_store(output_file, store)
+        return self.upload_to_blazegraph(output_file, sparql_endpoint)
 
-    def csv_to_rdf(self, file_path: str, graph: Graph):
+    def csv_to_rdf(self, file_path: str, graph):
+        # graph is an rdflib Graph or an RDFStreamWriter, both take add(triple)
         with open(file_path, 'r') as f:
             reader = csv.DictReader(f)
             namespace = Namespace("http://example.org/")
@@ -292,190 +1123,690 @@ class UploadHandler(Handler):
                     obj = Literal(value)
                     graph.add((subject, predicate, obj))
 
+    def upload_to_local_store(self, rdf_file: str, store: LocalRDFStore) -> bool:
+        # Add the triples to the in-process store instead of posting them
+        store.add_file(rdf_file)
+        print(f"Uploaded {rdf_file} to the local RDF store {store.path}.")
+        return True
+
     def upload_to_blazegraph(self, turtle_file: str, sparql_endpoint: str) -> bool:
-        headers = {'Content-Type': 'application/x-turtle'}
+        _, extension = os.path.splitext(turtle_file)
+        headers = {'Content-Type': RDF_CONTENT_TYPES.get(extension, 'application/x-turtle')}
 
-        with open(turtle_file, 'rb') as f:
-            response = requests.post(sparql_endpoint, data=f, headers=headers)
+        try:
+            with open(turtle_file, 'rb') as f:
+                response = self.session.post(
+                    sparql_endpoint, data=f, headers=headers, timeout=self.timeout
+                )
+        finally:
+            # Cached query results of this endpoint may be outdated now
+            QUERY_CACHE.invalidate(sparql_endpoint)
 
         if response.status_code != 200:
             print(f"Upload failed: {response.status_code} - {response.reason}")
-            print(f"Response text: {response.text}")
             return False 
         
         print("Upload to Blazegraph successful!")
         return True
 
 
-class ProcessDataUploadHandler(UploadHandler):   
-    def __init__(self):
-        super().__init__()
-        self.file_path = find_file('process.json')
-        self.db_file = "json.db"
-        
-        # Load the JSON file and set up the database
-        self.load_json_and_setup_db()
+# To find the activity layout of a process database: the one recorded by
+# its last load or, for databases loaded before the layout was recorded, the
+# one whose tables hold rows (None for an empty database)
+def stored_layout(conn: sqlite3.Connection) -> Optional[str]:
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if "activity_layout" in tables:
+        row = conn.execute("SELECT layout FROM activity_layout").fetchone()
+        if row is not None:
+            return row[0]
+    for table, _ in ACTIVITY_TABLES.values():
+        if table in tables and conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone():
+            return "tables"
+    if UNIFIED_ACTIVITY_TABLE in tables and conn.execute(
+        f"SELECT 1 FROM {UNIFIED_ACTIVITY_TABLE} LIMIT 1"
+    ).fetchone():
+        return "activity"
+    return None
 
-    def load_json_and_setup_db(self):
-        try:
-            with open(self.file_path) as json_file:
-                data = json.load(json_file)
-
-            conn = sqlite3.connect(self.db_file)
-            c = conn.cursor()
-
-            # Create tables if they do not exist
-            c.execute(
-                """CREATE TABLE IF NOT EXISTS Acquisition (
-                            object_id TEXT,
-                            responsible_institute TEXT,
-                            responsible_person TEXT,
-                            technique TEXT,
-                            tool TEXT,
-                            start_date TEXT,
-                            end_date TEXT
-                        )"""
-            )
 
-            c.execute(
-                """CREATE TABLE IF NOT EXISTS Processing (
-                            object_id TEXT,
-                            responsible_institute TEXT,
-                            responsible_person TEXT,
-                            tool TEXT,
-                            start_date TEXT,
-                            end_date TEXT
-                        )"""
-            )
+class ActivityLoader(object):
+    def __init__(
+        self,
+        db_file: str,
+        pragmas: Optional[dict] = None,
+        batch_size: int = LOAD_BATCH_SIZE,
+        layout: str = "tables",
+    ):
+        # layout "tables" stores one table per activity type, layout
+        # "activity" stores every activity in the single activity table
+        if layout not in ("tables", "activity"):
+            raise ValueError(f"Unknown activity storage layout: {layout}")
+        self.db_file = db_file
+        self.pragmas = LOAD_PRAGMAS if pragmas is None else pragmas
+        self.batch_size = batch_size
+        self.layout = layout
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_file)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def storage_tables(self) -> list:
+        # (table, columns, key columns, SQL giving the activity type of a row)
+        if self.layout == "activity":
+            return [(UNIFIED_ACTIVITY_TABLE, UNIFIED_ACTIVITY_COLUMNS, ["object_id", "type"], "{row}.type")]
+        return [
+            (table, columns, ["object_id"], f"'{table}'")
+            for table, columns in ACTIVITY_TABLES.values()
+        ]
 
-            c.execute(
-                """CREATE TABLE IF NOT EXISTS Modelling (
-                            object_id TEXT,
-                            responsible_institute TEXT,
-                            responsible_person TEXT,
-                            tool TEXT,
-                            start_date TEXT,
-                            end_date TEXT
-                        )"""
+    def setup_tables(self, conn: sqlite3.Connection):
+        # Create the activity tables if they do not exist. In the "tables"
+        # layout every table holds one activity type, so object_id alone
+        # keys a row. A database stored in the other layout is moved to this
+        # one, and its search index rebuilt.
+        previous = stored_layout(conn)
+        switching = previous is not None and previous != self.layout
+        if switching:
+            self.drop_search(conn)
+        for table, columns, key, _ in self.storage_tables():
+            column_defs = ", ".join(
+                [f"{column} TEXT NOT NULL" if column in key else f"{column} TEXT" for column in columns]
+                + [f"PRIMARY KEY ({', '.join(key)})"]
             )
+            if self.has_unkeyed_table(conn, table):
+                # The rows get new rowids, which the search index refers to
+                self.drop_search(conn)
+                self.migrate_unkeyed_table(conn, table, columns, column_defs)
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({column_defs})")
+
+        if switching:
+            self.move_layout(conn, previous)
+        # The indexes of empty tables are built in one pass after the first
+        # load, by build_indexes, instead of row by row during it
+        if any(
+            conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone()
+            for table, _, _, _ in self.storage_tables()
+        ):
+            self.setup_indexes(conn)
+        self.setup_search(conn)
+
+        # Queries read the activities from the tables of this layout only
+        conn.execute("CREATE TABLE IF NOT EXISTS activity_layout (layout TEXT NOT NULL)")
+        conn.execute("DELETE FROM activity_layout")
+        conn.execute("INSERT INTO activity_layout (layout) VALUES (?)", (self.layout,))
+
+        # File size and mtime of every source loaded, to skip unchanged files
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS load_state (
+                source TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime REAL
+            )"""
+        )
+        # The source file each object was last loaded from, so reloading a
+        # file only removes the objects that file no longer holds
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'object_source'").fetchone()
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS object_source (
+                object_id TEXT PRIMARY KEY,
+                source TEXT NOT NULL
+            ) WITHOUT ROWID"""
+        )
+        sources = conn.execute("SELECT source FROM load_state").fetchall()
+        if not exists and len(sources) == 1:
+            # Databases loaded from a single file before sources were kept
+            for table, _, _, _ in self.storage_tables():
+                conn.execute(
+                    f"INSERT OR IGNORE INTO object_source SELECT object_id, ? FROM {table}", sources[0]
+                )
 
-            c.execute(
-                """CREATE TABLE IF NOT EXISTS Optimising (
-                            object_id TEXT,
-                            responsible_institute TEXT,
-                            responsible_person TEXT,
-                            tool TEXT,
-                            start_date TEXT,
-                            end_date TEXT
-                        )"""
-            )
+    def setup_indexes(self, conn: sqlite3.Connection):
+        for table, columns, _, _ in self.storage_tables():
+            for column in ["responsible_institute", "responsible_person", "technique"]:
+                if column in columns:
+                    conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_{column}_idx ON {table} ({column})")
+
+            # The date indexes cover every column the date queries return, so
+            # range filters are answered from the index alone
+            for column in ["start_date", "end_date"]:
+                covered = [column] + [other for other in columns if other != column]
+                conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS {table}_{column}_idx ON {table} ({', '.join(covered)})"
+                )
 
-            c.execute(
-                """CREATE TABLE IF NOT EXISTS Exporting (
-                            object_id TEXT,
-                            responsible_institute TEXT,
-                            responsible_person TEXT,
-                            tool TEXT,
-                            start_date TEXT,
-                            end_date TEXT
-                        )"""
-            )
+    def search_tables(self) -> list:
+        # (activity table, its trigram index, the columns indexed)
+        return [
+            (table, f"{table}_search", [column for column in SEARCH_COLUMNS if column in columns])
+            for table, columns, _, _ in self.storage_tables()
+        ]
 
-            for item in data:
-                object_id = item["object id"]
-
-                # Insert acquisition data
-                acquisition = item.get("acquisition", {})
-                c.execute(
-                    """INSERT INTO Acquisition (object_id, responsible_institute, responsible_person, technique, tool, start_date, end_date)
-                            VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                    (
-                        object_id,
-                        acquisition.get("responsible institute"),
-                        acquisition.get("responsible person"),
-                        acquisition.get("technique"),
-                        ", ".join(acquisition.get("tool", [])) if acquisition.get("tool") else None,
-                        acquisition.get("start date"),
-                        acquisition.get("end date"),
-                    ),
+    def setup_search(self, conn: sqlite3.Connection):
+        # Trigram full-text index over the columns searched with '%x%', one
+        # per activity table. The indexes are external-content fts5 tables:
+        # they hold the trigrams only, and their rowids are the rowids of the
+        # activity table. A VACUUM may renumber those rowids, so run
+        # rebuild_search after one.
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'activity_search_key'").fetchone():
+            # Shared index of older versions, kept in sync through key lookups
+            self.drop_search(conn)
+        for table, search, columns in self.search_tables():
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (search,)).fetchone():
+                continue
+            try:
+                conn.execute(
+                    f"""CREATE VIRTUAL TABLE {search} USING fts5(
+                        {', '.join(columns)}, content = '{table}', content_rowid = 'rowid',
+                        tokenize = 'trigram'
+                    )"""
                 )
+            except sqlite3.OperationalError as e:
+                # Older SQLite builds without FTS5 trigrams fall back to LIKE scans
+                print("Substring search index not available:", e)
+                return
+        self.index_search(conn)
+
+    def build_indexes(self, conn: sqlite3.Connection):
+        # Create the indexes still missing after a load
+        self.setup_indexes(conn)
+        self.index_search(conn)
+
+    def index_search(self, conn: sqlite3.Connection):
+        # Build the index of every table without search triggers in one pass,
+        # then keep it in sync with triggers. The index of an empty table is
+        # left to be built after the first load, so a bulk load does not pay
+        # for a trigger on every row.
+        for table, search, columns in self.search_tables():
+            if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (search,)).fetchone():
+                continue
+            if conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?", (f"{table}_search_insert",)
+            ).fetchone():
+                continue
+            if not conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone():
+                continue
+            conn.execute(f"INSERT INTO {search} ({search}) VALUES ('rebuild')")
+
+            column_list = ", ".join(columns)
+            add_row = f"""INSERT INTO {search} (rowid, {column_list})
+                VALUES (new.rowid, {', '.join(f'new.{column}' for column in columns)});"""
+            remove_row = f"""INSERT INTO {search} ({search}, rowid, {column_list})
+                VALUES ('delete', old.rowid, {', '.join(f'old.{column}' for column in columns)});"""
+            conn.execute(
+                f"CREATE TRIGGER {table}_search_insert AFTER INSERT ON {table} BEGIN {add_row} END"
+            )
+            conn.execute(
+                f"CREATE TRIGGER {table}_search_update AFTER UPDATE ON {table} BEGIN {remove_row} {add_row} END"
+            )
+            conn.execute(
+                f"CREATE TRIGGER {table}_search_delete AFTER DELETE ON {table} BEGIN {remove_row} END"
+            )
 
-                # Insert processing data
-                processing = item.get("processing", {})
-                c.execute(
-                    """INSERT INTO Processing (object_id, responsible_institute, responsible_person, tool, start_date, end_date)
-                            VALUES (?, ?, ?, ?, ?, ?)""",
-                    (
-                        object_id,
-                        processing.get("responsible institute"),
-                        processing.get("responsible person"),
-                        ", ".join(processing.get("tool", [])) if processing.get("tool") else None,
-                        processing.get("start date"),
-                        processing.get("end date"),
-                    ),
-                )
+    def rebuild_search(self):
+        # Build the search indexes again from the activity tables
+        conn = self.connect()
+        try:
+            with conn:
+                self.setup_tables(conn)
+                self.drop_search(conn)
+                self.setup_search(conn)
+        finally:
+            conn.close()
 
-                # Insert modelling data
-                modelling = item.get("modelling", {})
-                c.execute(
-                    """INSERT INTO Modelling (object_id, responsible_institute, responsible_person, tool, start_date, end_date)
-                            VALUES (?, ?, ?, ?, ?, ?)""",
-                    (
-                        object_id,
-                        modelling.get("responsible institute"),
-                        modelling.get("responsible person"),
-                        ", ".join(modelling.get("tool", [])) if modelling.get("tool") else None,
-                        modelling.get("start date"),
-                        modelling.get("end date"),
-                    ),
+    def move_layout(self, conn: sqlite3.Connection, previous: str):
+        # Copy the activities stored in the previous layout into the tables
+        # of this one, then drop the old tables
+        print(f"Moving the activities from the '{previous}' layout to the '{self.layout}' layout")
+        for table, columns in ACTIVITY_TABLES.values():
+            if self.layout == "activity":
+                conn.execute(
+                    f"""INSERT OR REPLACE INTO {UNIFIED_ACTIVITY_TABLE} (type, {', '.join(columns)})
+                        SELECT '{table}', {', '.join(columns)} FROM {table}"""
+                )
+                conn.execute(f"DROP TABLE {table}")
+            else:
+                conn.execute(
+                    f"""INSERT OR REPLACE INTO {table} ({', '.join(columns)})
+                        SELECT {', '.join(columns)} FROM {UNIFIED_ACTIVITY_TABLE} WHERE type = ?""",
+                    (table,),
                 )
+        if self.layout == "tables":
+            conn.execute(f"DROP TABLE {UNIFIED_ACTIVITY_TABLE}")
+
+    def drop_search(self, conn: sqlite3.Connection):
+        # Remove the search indexes and the triggers of both layouts, so that
+        # setup_search builds them again from the activity tables
+        for table in [table for table, _ in ACTIVITY_TABLES.values()] + [UNIFIED_ACTIVITY_TABLE]:
+            for event in ("insert", "update", "delete"):
+                conn.execute(f"DROP TRIGGER IF EXISTS {table}_search_{event}")
+            conn.execute(f"DROP TABLE IF EXISTS {table}_search")
+        conn.execute("DROP TABLE IF EXISTS activity_search_key")
+
+    def has_unkeyed_table(self, conn: sqlite3.Connection, table: str) -> bool:
+        info = conn.execute(f"PRAGMA table_info({table})").fetchall()
+        return bool(info) and not any(row[5] for row in info)
+
+    def migrate_unkeyed_table(self, conn, table, columns, column_defs):
+        # Tables from older versions had no key and collected duplicate rows
+        # on every reload: keep the last row of each object_id
+        print(f"Migrating {table} to a keyed table")
+        column_list = ", ".join(columns)
+        conn.execute(f"ALTER TABLE {table} RENAME TO {table}_unkeyed")
+        conn.execute(f"CREATE TABLE {table} ({column_defs})")
+        conn.execute(
+            f"""INSERT OR REPLACE INTO {table} ({column_list})
+                SELECT {column_list} FROM {table}_unkeyed WHERE object_id IS NOT NULL ORDER BY rowid"""
+        )
+        conn.execute(f"DROP TABLE {table}_unkeyed")
+
+    def upsert_statement(self, table: str, columns: List[str], key: List[str]) -> str:
+        # Insert new rows, and only rewrite existing rows whose values changed
+        values = [column for column in columns if column not in key]
+        return f"""INSERT INTO {table} ({', '.join(columns)})
+            VALUES ({', '.join('?' for _ in columns)})
+            ON CONFLICT({', '.join(key)}) DO UPDATE SET
+                {', '.join(f'{column} = excluded.{column}' for column in values)}
+            WHERE {' OR '.join(f'{column} IS NOT excluded.{column}' for column in values)}"""
+
+    def to_batches(self, data) -> dict:
+        # Turn the JSON objects into one list of row tuples per storage table
+        unified = self.layout == "activity"
+        batches = {table: [] for table, _, _, _ in self.storage_tables()}
+        for item in data:
+            object_id = item["object id"]
+            for key, (table, columns) in ACTIVITY_TABLES.items():
+                activity = item.get(key, {})
+                tool = activity.get("tool")
+                row = {
+                    "object_id": object_id,
+                    "type": table,
+                    "tool": TOOL_SEPARATOR.join(tool) if tool else None,
+                }
+                for column in columns:
+                    if column not in row:
+                        row[column] = activity.get(ACTIVITY_FIELDS[column])
+                if unified:
+                    # Columns the activity type does not have stay NULL
+                    table, columns = UNIFIED_ACTIVITY_TABLE, UNIFIED_ACTIVITY_COLUMNS
+                batches[table].append(tuple(row.get(column) for column in columns))
+        return batches
+
+    def load(self, data) -> int:
+        # Upsert every table with executemany inside a single transaction.
+        # data can be any iterable of JSON objects (e.g. iter_json_array), it
+        # is consumed batch_size objects at a time. Returns the number of rows
+        # inserted or changed.
+        conn = self.connect()
+        try:
+            with conn:
+                self.setup_tables(conn)
+                changed = self.upsert(conn, data)
+                self.build_indexes(conn)
+            self.refresh_statistics(conn, changed)
+            return changed
+        finally:
+            conn.close()
 
-                # Insert optimising data
-                optimising = item.get("optimising", {})
-                c.execute(
-                    """INSERT INTO Optimising (object_id, responsible_institute, responsible_person, tool, start_date, end_date)
-                            VALUES (?, ?, ?, ?, ?, ?)""",
-                    (
-                        object_id,
-                        optimising.get("responsible institute"),
-                        optimising.get("responsible person"),
-                        ", ".join(optimising.get("tool", [])) if optimising.get("tool") else None,
-                        optimising.get("start date"),
-                        optimising.get("end date"),
-                    ),
+    def load_file(self, file_path: str, stream: bool = True) -> int:
+        # Load a process JSON file, unless the same file was already loaded
+        # and has not changed since
+        stat = os.stat(file_path)
+        source = os.path.abspath(file_path)
+        conn = self.connect()
+        try:
+            with conn:
+                self.setup_tables(conn)
+                state = conn.execute(
+                    "SELECT size, mtime FROM load_state WHERE source = ?", (source,)
+                ).fetchone()
+                if state == (stat.st_size, stat.st_mtime):
+                    return 0
+
+                with open(file_path) as json_file:
+                    # In streaming mode only one batch of objects is held in memory
+                    data = iter_json_array(json_file) if stream else json.load(json_file)
+                    # Objects removed from the file since its last load are
+                    # removed from the database too
+                    changed = self.upsert(conn, data, source)
+                self.build_indexes(conn)
+
+                conn.execute(
+                    "INSERT OR REPLACE INTO load_state (source, size, mtime) VALUES (?, ?, ?)",
+                    (source, stat.st_size, stat.st_mtime),
                 )
+            self.refresh_statistics(conn, changed)
+            return changed
+        finally:
+            conn.close()
 
-                # Insert exporting data
-                exporting = item.get("exporting", {})
-                c.execute(
-                    """INSERT INTO Exporting (object_id, responsible_institute, responsible_person, tool, start_date, end_date)
-                            VALUES (?, ?, ?, ?, ?, ?)""",
-                    (
-                        object_id,
-                        exporting.get("responsible institute"),
-                        exporting.get("responsible person"),
-                        ", ".join(exporting.get("tool", [])) if exporting.get("tool") else None,
-                        exporting.get("start date"),
-                        exporting.get("end date"),
-                    ),
+    def refresh_statistics(self, conn: sqlite3.Connection, changed: int):
+        # Refresh the planner statistics the indexes are chosen from. They
+        # are read from the whole tables: sampled statistics can make the
+        # planner scan a table instead of seeking its date index.
+        if changed:
+            for table, _, _, _ in self.storage_tables():
+                conn.execute(f"ANALYZE {table}")
+
+    def upsert(self, conn: sqlite3.Connection, data, source: Optional[str] = None) -> int:
+        # With a source file, the objects of data are recorded as coming from
+        # it, and the activities of the objects it held on its previous load
+        # but no longer does are deleted. Objects of other sources are kept.
+        changed = 0
+        statements = {
+            table: self.upsert_statement(table, columns, key)
+            for table, columns, key, _ in self.storage_tables()
+        }
+        if source is not None:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS loaded_objects (object_id TEXT PRIMARY KEY)")
+            conn.execute("DELETE FROM loaded_objects")
+        for items in iter_batches(data, self.batch_size):
+            batches = self.to_batches(items)
+            for table, statement in statements.items():
+                # rowcount leaves out the rows written by the search triggers
+                changed += conn.executemany(statement, batches[table]).rowcount
+            if source is not None:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO loaded_objects (object_id) VALUES (?)",
+                    ((item["object id"],) for item in items),
                 )
+        if source is not None:
+            dropped = """SELECT object_id FROM object_source WHERE source = ?
+                AND object_id NOT IN (SELECT object_id FROM loaded_objects)"""
+            for table in statements:
+                changed += conn.execute(
+                    f"DELETE FROM {table} WHERE object_id IN ({dropped})", (source,)
+                ).rowcount
+            conn.execute(f"DELETE FROM object_source WHERE object_id IN ({dropped})", (source,))
+            conn.execute(
+                "INSERT OR REPLACE INTO object_source (object_id, source) SELECT object_id, ? FROM loaded_objects",
+                (source,),
+            )
+            conn.execute("DROP TABLE loaded_objects")
+        return changed
 
-            conn.commit()
-            print("\nData insertion and querying completed successfully.")
+
+class ProcessDataUploadHandler(UploadHandler):   
+    def __init__(
+        self,
+        pragmas: Optional[dict] = None,
+        stream: bool = True,
+        batch_size: int = LOAD_BATCH_SIZE,
+        layout: str = "tables",
+    ):
+        super().__init__()
+        self.file_path = find_file('process.json')
+        self.db_file = PROCESS_DB_FILE
+        self.pragmas = LOAD_PRAGMAS if pragmas is None else pragmas
+        self.stream = stream
+        self.batch_size = batch_size
+        # "activity" keeps every activity in one table instead of five
+        self.layout = layout
+        
+        # Load the JSON file and set up the database
+        self.load_json_and_setup_db()
+
+    def load_json_and_setup_db(self):
+        if self.file_path is None:
+            print("Error: JSON file not found.")
+            return
+        try:
+            loader = ActivityLoader(self.db_file, self.pragmas, self.batch_size, self.layout)
+            changed = loader.load_file(self.file_path, self.stream)
+            print(f"\nData insertion completed successfully ({changed} rows changed).")
         except FileNotFoundError:
             print("Error: JSON file not found.")
         except sqlite3.Error as e:
             print("\nSQLite error:", e)
-        finally:
-            if conn:
-                conn.close()
 
+    def upload_json_to_sqlite(self, file_path: str) -> bool:
+        # As in UploadHandler, with the layout and load settings of this handler
+        loader = ActivityLoader(self.dbPathOrUrl, self.pragmas, self.batch_size, self.layout)
+        changed = loader.load_file(file_path, self.stream)
+        print(f"Uploaded JSON data to SQLite database successfully ({changed} rows changed).")
+        return True
+
+
+# To write an RDF term in N-Triples syntax (Term.n3() may use Turtle
+# long strings, which N-Triples does not allow)
+def ntriples_term(term) -> str:
+    if isinstance(term, Literal):
+        value = (
+            str(term).replace("\\", "\\\\").replace('"', '\\"')
+            .replace("\n", "\\n").replace("\r", "\\r")
+        )
+        if term.language:
+            return f'"{value}"@{term.language}'
+        if term.datatype:
+            return f'"{value}"^^<{term.datatype}>'
+        return f'"{value}"'
+    return term.n3()
+
+
+def ntriples_line(triple) -> str:
+    subject, predicate, obj = triple
+    return f"{ntriples_term(subject)} {ntriples_term(predicate)} {ntriples_term(obj)} .\n"
+
+
+class RDFStreamWriter(object):
+    def __init__(self, destination, format: str = "nt", graph_name: Optional[str] = None):
+        # Write triples as N-Triples or N-Quads lines as soon as they are
+        # added, to a file path or to any writable text file object
+        if format not in ("nt", "nq"):
+            raise ValueError(f"Unknown streaming RDF format: {format}")
+        self.owns_file = isinstance(destination, str)
+        self.file = open(destination, "w", encoding="utf-8") if self.owns_file else destination
+        self.end = " .\n"
+        if format == "nq" and graph_name:
+            self.end = f" {ntriples_term(URIRef(graph_name))} .\n"
+        self.count = 0
+
+    def add(self, triple):
+        subject, predicate, obj = triple
+        self.file.write(
+            f"{ntriples_term(subject)} {ntriples_term(predicate)} {ntriples_term(obj)}{self.end}"
+        )
+        self.count += 1
+
+    def write(self, triples):
+        for triple in triples:
+            self.add(triple)
+
+    def close(self):
+        if self.owns_file:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SPARQLBulkLoader(object):
+    def __init__(
+        self,
+        endpoint: str,
+        mode: str = "update",
+        batch_size: int = SPARQL_BATCH_SIZE,
+        retries: int = SPARQL_RETRIES,
+        backoff: float = 0.5,
+        timeout=SPARQL_TIMEOUT,
+        session: Optional[requests.Session] = None,
+    ):
+        # mode "update" sends INSERT DATA blocks of batch_size triples, mode
+        # "graph" posts every triple in a single Graph Store Protocol request
+        if mode not in ("update", "graph"):
+            raise ValueError(f"Unknown SPARQL upload mode: {mode}")
+        self.endpoint = endpoint
+        self.mode = mode
+        self.batch_size = batch_size
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        # A session passed in belongs to the caller and is left open by close()
+        self.owns_session = session is None
+        self.session = sparql_session() if session is None else session
+        self.requests_sent = 0
+
+    def to_ntriples(self, triples) -> str:
+        return "".join(ntriples_line(triple) for triple in triples)
+
+    def load(self, triples) -> int:
+        # Upload the triples and return how many were sent
+        sent = 0
+        if self.mode == "graph":
+            body = self.to_ntriples(triples)
+            sent = body.count("\n")
+            self.post(
+                data=body.encode("utf-8"),
+                headers={"Content-Type": "application/n-triples; charset=utf-8"},
+            )
+            return sent
+
+        for batch in iter_batches(triples, self.batch_size):
+            update = "INSERT DATA {\n" + self.to_ntriples(batch) + "}"
+            self.post(data={"update": update})
+            sent += len(batch)
+        return sent
+
+    def load_file(self, file_path: str):
+        # Upload an N-Triples or N-Quads file without reading it into memory
+        _, extension = os.path.splitext(file_path)
+        if self.mode == "graph":
+            with open(file_path, "rb") as f:
+                self.post(rewind=f, data=f, headers={"Content-Type": RDF_CONTENT_TYPES[extension]})
+            return
+
+        if extension != ".nt":
+            raise ValueError("Only N-Triples files can be sent as INSERT DATA, use mode 'graph'")
+        with open(file_path, encoding="utf-8") as f:
+            for lines in iter_batches(f, self.batch_size):
+                self.post(data={"update": "INSERT DATA {\n" + "".join(lines) + "}"})
+
+    def post(self, rewind=None, **kwargs) -> requests.Response:
+        # Retry connection errors and server errors with exponential backoff.
+        # A file sent as body is rewound before every attempt.
+        for attempt in range(max(1, self.retries)):
+            if rewind is not None:
+                rewind.seek(0)
+            try:
+                response = self.session.post(self.endpoint, timeout=self.timeout, **kwargs)
+                self.requests_sent += 1
+                if response.status_code < 500:
+                    response.raise_for_status()
+                    return response
+                error = requests.HTTPError(
+                    f"{response.status_code} - {response.reason}", response=response
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            if attempt + 1 < max(1, self.retries):
+                time.sleep(self.backoff * 2 ** attempt)
+        raise error
+
+    def close(self):
+        if self.owns_session:
+            self.session.close()
+
+
+class CatalogMirror(object):
+    # Copy of the uploaded catalog in SQLite: one row per object and per
+    # author, and the authorship links between them. Rows are upserted, so
+    # uploading the same data again leaves the tables unchanged.
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_file)
+        conn.execute("PRAGMA synchronous = OFF")
+        for table, columns in CATALOG_TABLES.items():
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({columns}) WITHOUT ROWID")
+        # Authors are joined to their objects through this index
+        conn.execute("CREATE INDEX IF NOT EXISTS authorship_author ON authorship (author)")
+        return conn
+
+    def write(self, conn: sqlite3.Connection, columns: dict) -> int:
+        # Write the heritage columns of MetadataUploadHandler.heritage_columns.
+        # Objects without an id or a known class are left out, as the
+        # metadata queries leave them out.
+        frame = pd.DataFrame(columns)
+        frame = frame[(frame["id"] != "") & frame["class"].notna()]
+        type_names = frame["class"].astype(str).str.replace("https://schema.org/", "", regex=False)
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO object VALUES (?, ?, ?, ?, ?, ?)",
+                zip(frame["id"], type_names, frame["title"], frame["date"], frame["owner"], frame["place"]),
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO author VALUES (?, ?, ?)",
+                frame[["author", "author_id", "author_name"]].drop_duplicates("author").itertuples(index=False),
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO authorship VALUES (?, ?)",
+                zip(frame["id"], frame["author"]),
+            )
+        return len(frame)
+
+    def authors_of(self, object_ids: List[str]) -> pd.DataFrame:
+        # The authors of the given objects, as rows of
+        # getAuthorsOfCulturalHeritageObjects, SQL_IN_CHUNK ids at a time
+        conn = self.connect()
+        try:
+            frames = []
+            for chunk in iter_batches(object_ids, SQL_IN_CHUNK):
+                placeholders = ", ".join("?" * len(chunk))
+                frames.append(pd.read_sql_query(
+                    f"""
+                    SELECT DISTINCT a.id, a.name
+                    FROM authorship w
+                    JOIN author a ON a.iri = w.author
+                    WHERE w.object_id IN ({placeholders})
+                    """,
+                    conn,
+                    params=list(chunk),
+                ))
+        finally:
+            conn.close()
+        return merge_frames(frames, ["id"])
 
 
 class MetadataUploadHandler(UploadHandler):   
-    def __init__(self):
-        super().__init__()
+    def __init__(
+        self,
+        upload_mode: Optional[str] = None,
+        batch_size: int = SPARQL_BATCH_SIZE,
+        retries: int = SPARQL_RETRIES,
+        output_format: str = "nt",
+        chunk_size: int = CSV_CHUNK_SIZE,
+        endpoint: Optional[str] = None,
+        catalog_db: Optional[str] = None,
+    ):
+        super().__init__(output_format)
+        # The data is uploaded while the handler is created, so the endpoint
+        # (or the path of a local RDF store) is given here rather than with
+        # setDbPathOrUrl
+        if endpoint:
+            self.setDbPathOrUrl(endpoint)
+        # Quads cannot be sent as INSERT DATA, so N-Quads output is posted
+        # whole with the Graph Store Protocol. The check is made before the
+        # CSV is converted.
+        if upload_mode is None:
+            upload_mode = "graph" if output_format == "nq" else "update"
+        if upload_mode not in ("update", "graph"):
+            raise ValueError(f"Unknown SPARQL upload mode: {upload_mode}")
+        if upload_mode == "update" and output_format == "nq" and not self.local_store():
+            raise ValueError("N-Quads output can only be uploaded with upload_mode 'graph'")
+        # Only filled with output_format "ttl", streamed output skips the graph
         self.my_graph = Graph()
+        self.upload_mode = upload_mode
+        self.batch_size = batch_size
+        self.retries = retries
+        self.chunk_size = chunk_size
+        # SQLite file the objects and authors are also written to, for the
+        # single-query joins of AdvancedMashup.useCatalogMirror
+        self.catalog = CatalogMirror(catalog_db) if catalog_db else None
 
         # Define resource classes
         self.NauticalChart = URIRef("https://schema.org/NauticalChart")
@@ -501,12 +1832,20 @@ class MetadataUploadHandler(UploadHandler):
 
         # Base URL
         self.base_url = "https://github.com/katyakrsn/ds24project/"
-        self.file_path_csv = "data/meta.csv"
+        self.file_path_csv = find_file('meta.csv')
         
-        # Load heritage data from CSV
-        self.heritage = pd.read_csv(
-            find_file('meta.csv'),
+        # Load heritage data from CSV. When streaming, the CSV is read in
+        # chunks while the triples are written instead.
+        self.heritage = self.read_heritage() if self.output_format == "ttl" else None
+
+        # Process each row in the heritage DataFrame
+        self.process_heritage_data()
+
+    def read_heritage(self, chunksize: Optional[int] = None):
+        return pd.read_csv(
+            self.file_path_csv,
             keep_default_na=False,
+            chunksize=chunksize,
             dtype={
                 "Id": "string",
                 "Type": "string",
@@ -518,59 +1857,120 @@ class MetadataUploadHandler(UploadHandler):
             },
         )
 
-        # Process each row in the heritage DataFrame
-        self.process_heritage_data()
-
     def process_heritage_data(self):
-    # Process each row of heritage data and add RDF triples to the graph
-        for idx, row in self.heritage.iterrows():
-            class_uri = self.get_class_uri(row["Type"])
-            resource_uri = URIRef(f"{self.base_url}{row['Id']}")
-
-            # Handle missing date values
-            row["Date"] = row["Date"].strip() if row["Date"].strip() else "Unknown"
-            print(f"Missing Date at index {idx}" if row["Date"] == "Unknown" else "")
-            
-            # Handle missing and whitespace values
-            date = row["Date"].strip() if row["Date"].strip() else "Unknown"
-            title = row["Title"].strip() if row["Title"].strip() else "Unknown"
-            owner = row["Owner"].strip() if row["Owner"].strip() else "Unknown"
-            place = row["Place"].strip() if row["Place"].strip() else "Unknown"
-
-            # Add triples to the graph
-            self.my_graph.add((resource_uri, RDF.type, class_uri))
-            self.my_graph.add((resource_uri, self.identifier, Literal(row["Id"])))
-            self.my_graph.add((resource_uri, self.title, Literal(title)))
-            self.my_graph.add((resource_uri, self.date, Literal(date)))
-            self.my_graph.add((resource_uri, self.owner, Literal(owner)))
-            self.my_graph.add((resource_uri, self.place, Literal(place)))
-
-            # Handle Author
-            author = row["Author"].strip() if row["Author"].strip() else "Unknown"
-            if author != "Unknown":
-                self.add_author_data(row, resource_uri, idx)
+        output_path = f"output_triples.{self.output_format}"
+        catalog_conn = self.catalog.connect() if self.catalog is not None else None
+        try:
+            if self.output_format == "ttl":
+                # Add the RDF triples of all the heritage data to the graph at once
+                columns = self.heritage_columns(self.heritage)
+                self.my_graph.addN(
+                    (s, p, o, self.my_graph)
+                    for s, p, o in self.heritage_triples(self.heritage, columns=columns)
+                )
+                if catalog_conn is not None:
+                    self.catalog.write(catalog_conn, columns)
+                self.my_graph.serialize(destination=output_path, format="ttl")
+                print(f"Turtle file created at: {output_path}")
             else:
-                print(f"Missing Author at index {idx}")
-                self.add_author_data({"Author": "Unknown"}, resource_uri, idx)  # Add placeholder author
-
-        # Serialize graph to a local file
-        turtle_file_path = "output_triples.ttl"
-        self.my_graph.serialize(destination=turtle_file_path, format="ttl")
-
-        # Log the creation of the Turtle file
-        print(f"Turtle file created at: {turtle_file_path}")
-        with open(turtle_file_path, 'r') as f:
-            print(f"Contents of the Turtle file:\n{f.read()[:500]}")  # Log first 500 characters
+                # Write the triples of each chunk of rows as soon as it is read
+                seen_authors = set()
+                with RDFStreamWriter(output_path, self.output_format, self.graph_name) as writer:
+                    for chunk in self.read_heritage(self.chunk_size):
+                        columns = self.heritage_columns(chunk)
+                        writer.write(self.heritage_triples(chunk, seen_authors, columns))
+                        if catalog_conn is not None:
+                            self.catalog.write(catalog_conn, columns)
+                print(f"{writer.count} triples written to: {output_path}")
+        finally:
+            if catalog_conn is not None:
+                catalog_conn.close()
+        if catalog_conn is not None:
+            print(f"Catalog mirrored to SQLite database: {self.catalog.db_file}")
+
+        # Add the triples to the local RDF store, if one was set
+        store = self.local_store()
+        if store is not None:
+            self.upload_to_local_store(output_path, store)
+            return
 
         # Upload triples to the Blazegraph database
-        if not self.upload_to_blazegraph(turtle_file_path, "http://127.0.0.1:9999/blazegraph/sparql"):
+        if not self.upload_to_blazegraph(output_path, self.sparql_endpoint()):
             print("Failed to upload RDF to Blazegraph!")
             return
 
+    def heritage_columns(self, heritage: pd.DataFrame) -> dict:
+        # Clean the heritage columns with vectorized string operations:
+        # missing and blank values become "Unknown", authors are split into
+        # name, ID and IRI
+        def clean(column):
+            values = heritage[column].fillna("").str.strip()
+            return values.mask(values == "", "Unknown")
+
+        for idx in heritage.index[heritage["Date"].fillna("").str.strip() == ""]:
+            print(f"Missing Date at index {idx}")
+        missing_author = heritage["Author"].fillna("").str.strip() == ""
+        for idx in heritage.index[missing_author]:
+            print(f"Missing Author at index {idx}")
+
+        author = heritage["Author"].fillna("").mask(missing_author, "Unknown")
+        author_name = author.str.split(" (", n=1, regex=False).str[0]
+        return {
+            "subject": self.base_url + heritage["Id"].fillna(""),
+            "id": heritage["Id"].fillna(""),
+            "class": heritage["Type"].map(self.class_mapping()),
+            "title": clean("Title"),
+            "date": clean("Date"),
+            "owner": clean("Owner"),
+            "place": clean("Place"),
+            "author": self.base_url
+            + author_name.str.replace(" ", "_", regex=False).str.replace(",", "", regex=False),
+            "author_id": author.str.extract(r"\((.*?)\)", expand=False).fillna(NO_AUTHOR_ID),
+            "author_name": author_name,
+        }
 
-    def get_class_uri(self, type_value):
-        # Return the URI of the class based on the type of CulturalHeritageObject
-        class_mapping = {
+    def heritage_triples(
+        self,
+        heritage: pd.DataFrame,
+        seen_authors: Optional[set] = None,
+        columns: Optional[dict] = None,
+    ):
+        # Yield the RDF triples of a heritage DataFrame, built column by column.
+        # Authors already in seen_authors (from earlier chunks) are skipped.
+        # columns may hold the heritage_columns already computed for it.
+        if columns is None:
+            columns = self.heritage_columns(heritage)
+        subjects = list(map(URIRef, columns["subject"]))
+        authors = list(map(URIRef, columns["author"]))
+
+        for subject, class_uri in zip(subjects, columns["class"]):
+            if isinstance(class_uri, URIRef):
+                yield subject, RDF.type, class_uri
+        for predicate, column in [
+            (self.identifier, "id"),
+            (self.title, "title"),
+            (self.date, "date"),
+            (self.owner, "owner"),
+            (self.place, "place"),
+        ]:
+            yield from zip(subjects, repeat(predicate), map(Literal, columns[column]))
+        yield from zip(subjects, repeat(self.hasAuthor), authors)
+
+        # Every author is described once, however many objects they made
+        people = pd.DataFrame(
+            {"iri": columns["author"], "id": columns["author_id"], "name": columns["author_name"]}
+        ).drop_duplicates()
+        if seen_authors is not None:
+            people = people[~people["iri"].isin(seen_authors)]
+            seen_authors.update(people["iri"])
+        for iri, author_id, name in zip(map(URIRef, people["iri"]), people["id"], people["name"]):
+            yield iri, self.identifier, Literal(author_id)
+            yield iri, RDF.type, self.Author
+            yield iri, self.label, Literal(name)
+
+    def class_mapping(self) -> dict:
+        # Map each type of CulturalHeritageObject to the URI of its class
+        return {
             "Nautical chart": self.NauticalChart,
             "Manuscript plate": self.ManuscriptPlate,
             "Manuscript volume": self.ManuscriptVolume,
@@ -582,66 +1982,172 @@ class MetadataUploadHandler(UploadHandler):
             "Model": self.Model,
             "Map": self.Map,
         }
-        return class_mapping.get(type_value, None)
 
-    def add_author_data(self, row, resource_uri, idx):
-        # Add author data to the RDF graph
-        author = row["Author"]
-        text_before_parentheses = author.split(" (")[0]
-        authorID = re.findall(r"\((.*?)\)", author)
-        authorID = authorID[0] if authorID else "noID"
-        authorIRI = self.base_url + text_before_parentheses.replace(" ", "_").replace(",", "")
-
-        self.my_graph.add((resource_uri, self.hasAuthor, URIRef(authorIRI)))
-        self.my_graph.add((URIRef(authorIRI), self.identifier, Literal(authorID)))
-        self.my_graph.add((URIRef(authorIRI), RDF.type, self.Author))
-        self.my_graph.add((URIRef(authorIRI), self.label, Literal(text_before_parentheses)))
+    def get_class_uri(self, type_value):
+        # Return the URI of the class based on the type of CulturalHeritageObject
+        return self.class_mapping().get(type_value, None)
 
     def upload_to_blazegraph(self, turtle_file, sparql_endpoint):
-        # Upload RDF triples to Blazegraph
-        store = SPARQLUpdateStore()
-        store.open((sparql_endpoint, sparql_endpoint))
-        
-        # Upload triples to the Blazegraph database
+        # Upload RDF triples to Blazegraph in a handful of bulk requests
+        loader = SPARQLBulkLoader(
+            sparql_endpoint,
+            self.upload_mode,
+            self.batch_size,
+            self.retries,
+            timeout=self.timeout,
+            session=self.session,
+        )
         try:
-            for triple in self.my_graph.triples((None, None, None)):
-                store.add(triple)
-            store.close()
+            if self.output_format == "ttl":
+                loader.load(self.my_graph.triples((None, None, None)))
+            else:
+                loader.load_file(turtle_file)
+            print(f"Uploaded {turtle_file} in {loader.requests_sent} requests.")
         except Exception as e:
             print(f"Error during upload to Blazegraph: {e}")
-            store.close() 
             raise Exception("Failed to upload RDF to Blazegraph!")
-
-        # Run a SPARQL query to confirm upload
-        return self.run_sparql_query()
-
-    def run_sparql_query(self):
-        # Run a SPARQL query to confirm that data has been uploaded
-        sparql_query = """
-            SELECT ?subject ?predicate ?object
-            WHERE {
-                ?subject ?predicate ?object .
-            }
-            ORDER BY ASC(xsd:integer(REPLACE(str(?subject), "https://github.com/katyakrsn/ds24project/", "")))
-        """
-        sparql_endpoint = "http://127.0.0.1:9999/blazegraph/sparql"
-        response = requests.post(sparql_endpoint, data={"query": sparql_query})
-        
+        finally:
+            loader.close()
+            # Cached query results of this endpoint may be outdated now
+            QUERY_CACHE.invalidate(sparql_endpoint)
+
+        # Confirm that the endpoint now holds data
+        return self.confirm_upload()
+
+    def confirm_upload(self) -> bool:
+        # An ASK query answers with one boolean, whatever the size of the store
+        response = self.session.post(
+            self.sparql_endpoint(),
+            data={"query": "ASK { ?subject ?predicate ?object }"},
+            headers={"Accept": "application/sparql-results+json"},
+            timeout=self.timeout,
+        )
         if response.status_code != 200:
             print(f"Error during SPARQL query: {response.status_code} - {response.reason}")
             return False
-        else:
-            print("SPARQL query executed successfully.")
-            print(f"Response: {response.text}")
-            return True
+        return bool(response.json().get("boolean"))
                 
+# Python's lower(), registered on the query connections as py_lower: the
+# built-in LIKE only ignores the case of ASCII letters
+def py_lower(value):
+    if type(value) == str:
+        return value.lower()
+    return value
+
+
+class SQLiteConnectionPool(object):
+    def __init__(self, db_file: str, read_only: bool = True):
+        self.db_file = db_file
+        self.read_only = read_only
+        self.local = threading.local()
+        self.connections = []
+        self.lock = threading.Lock()
+
+    def get(self) -> sqlite3.Connection:
+        # Every thread gets its own connection, opened on first use and then
+        # reused for all the following queries of that thread
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            if self.read_only:
+                uri = "file:" + pathname2url(os.path.abspath(self.db_file)) + "?mode=ro"
+                conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            else:
+                conn = sqlite3.connect(self.db_file, check_same_thread=False)
+            conn.create_function("py_lower", 1, py_lower, deterministic=True)
+            # Statements still running at the deadline of the call are interrupted
+            conn.set_progress_handler(lambda: time_left() == 0.0, 10000)
+            self.local.conn = conn
+            with self.lock:
+                self.connections.append(conn)
+        return conn
+
+    def close(self):
+        with self.lock:
+            for conn in self.connections:
+                conn.close()
+            self.connections.clear()
+            self.local = threading.local()
+
+
 class QueryHandler(Handler):
     def __init__(self):
         super().__init__()
 
-    def getById(self, input_id: str) -> pd.DataFrame:   /Rubens
-        endpoint = self.blazegraph_endpoint
-        id_author_query = f"""
+    def getById(self, input_id: str) -> pd.DataFrame:   
+        # Overridden by the handlers of each kind of data
+        return pd.DataFrame()
+
+
+class MetadataQueryHandler(QueryHandler):
+    def __init__(self, timeout=SPARQL_TIMEOUT, connections: int = SPARQL_CONNECTIONS):
+        super().__init__()
+        self.blazegraph_endpoint = BLAZEGRAPH_ENDPOINT
+        self.csv_file_path = CSV_FILEPATH
+        # Every query goes through this session, reusing its connections.
+        # timeout is a number of seconds or a (connect, read) pair.
+        self.timeout = timeout
+        self.session = sparql_session(connections)
+        # Set to None to always query the endpoint
+        self.cache = QUERY_CACHE
+        # Answers the queries in-process instead of the endpoint, when set
+        self.local_store = None
+
+    def setDbPathOrUrl(self, pathOrUrl: str) -> bool:
+        # Queries are sent to this endpoint from now on, or answered by the
+        # local RDF store at this path
+        result = super().setDbPathOrUrl(pathOrUrl)
+        if is_local_rdf_store(pathOrUrl):
+            self.local_store = open_local_rdf_store(pathOrUrl)
+            self.blazegraph_endpoint = BLAZEGRAPH_ENDPOINT
+        else:
+            self.local_store = None
+            self.blazegraph_endpoint = pathOrUrl or BLAZEGRAPH_ENDPOINT
+        return result
+
+    def querySource(self) -> str:
+        # Key of the cached results of this handler's queries
+        if self.local_store is not None:
+            return self.local_store.cache_key()
+        return self.blazegraph_endpoint
+
+    def sparqlQuery(self, query: str) -> pd.DataFrame:
+        source = self.querySource()
+        if self.cache is not None:
+            cached = self.cache.get(source, query)
+            if cached is not None:
+                return cached
+        if self.local_store is not None:
+            result = self.local_store.query(query)
+        else:
+            response = self.session.post(
+                self.blazegraph_endpoint,
+                data=query.encode("utf-8"),
+                headers={"Content-Type": "application/sparql-query", "Accept": "text/csv"},
+                timeout=self.requestTimeout(),
+            )
+            response.raise_for_status()
+            result = sparql_frame(response.content.decode("utf-8"))
+        if self.cache is not None:
+            self.cache.put(source, query, result)
+        return result
+
+    def requestTimeout(self):
+        # The timeout of the handler, cut to what is left of the mashup call
+        left = time_left()
+        if left is None:
+            return self.timeout
+        connect, read = self.timeout if isinstance(self.timeout, tuple) else (self.timeout, self.timeout)
+        left = max(left, 0.001)
+        return (min(connect, left), min(read, left))
+
+    def close(self):
+        self.session.close()
+
+    # The SPARQL text of each query is built by its own method, so the
+    # blocking and the asynchronous handlers send exactly the same queries
+
+    def entityByIdQuery(self, input_id: str) -> str:
+        return f"""
         PREFIX rdf:  <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
         PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
         PREFIX schema: <https://schema.org/>
@@ -655,16 +2161,9 @@ class QueryHandler(Handler):
             ?entity schema:name ?title
         }}
         """
-        df_sparql = get(endpoint, id_author_query, True)
-        return df_sparql
-
-class MetadataQueryHandler(QueryHandler):
-    def __init__(self):
-        self.blazegraph_endpoint = BLAZEGRAPH_ENDPOINT
-        self.csv_file_path = CSV_FILEPATH
 
-    def getAllPeople(self) -> pd.DataFrame:   
-        sparql_query = """
+    def allPeopleQuery(self) -> str:
+        return """
         PREFIX schema: <https://schema.org/>
         PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
         
@@ -675,27 +2174,36 @@ class MetadataQueryHandler(QueryHandler):
             ?Author schema:identifier ?id .
         }
         """
-        df_sparql = get(self.blazegraph_endpoint, sparql_query, True)
-        return df_sparql
 
-    def getAllCulturalHeritageObjects(self) -> pd.DataFrame:   
-        endpoint = self.blazegraph_endpoint
-        cultural_object_query = """
+    def allCulturalHeritageObjectsQuery(self, input_ids: Optional[List[str]] = None) -> str:
+        # One row per object: authors holds every "id<TAB>name" pair, one per
+        # line, while author_id and author_name join the same values by "; ".
+        # With input_ids only the objects with those ids are selected.
+        if input_ids is None:
+            id_pattern = "OPTIONAL { ?cultural_object schema:identifier ?id }"
+        else:
+            values = " ".join(json.dumps(str(input_id), ensure_ascii=False) for input_id in input_ids)
+            id_pattern = f"VALUES ?id {{ {values} }}\n        ?cultural_object schema:identifier ?id ."
+        return """
         PREFIX rdf:  <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
         PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
         PREFIX schema: <https://schema.org/>
 
-        SELECT (REPLACE(STR(?type), "https://schema.org/", "") AS ?type_name) ?id ?title ?date ?owner ?place ?author_id ?author_name
+        SELECT ?type_name ?id ?title ?date ?owner ?place
+            (GROUP_CONCAT(DISTINCT ?creator_id; SEPARATOR="; ") AS ?author_id)
+            (GROUP_CONCAT(DISTINCT ?creator_name; SEPARATOR="; ") AS ?author_name)
+            (GROUP_CONCAT(DISTINCT CONCAT(STR(?creator_id), "\\t", STR(?creator_name)); SEPARATOR="\\n") AS ?authors)
         WHERE {
         ?cultural_object rdf:type ?type .
         ?cultural_object schema:name ?title .
-        OPTIONAL { ?cultural_object schema:identifier ?id }
+        """ + id_pattern + """
         OPTIONAL { ?cultural_object schema:dateCreated ?date }
         OPTIONAL { ?cultural_object schema:provider ?owner }
         OPTIONAL { ?cultural_object schema:contentLocation ?place }
         OPTIONAL { ?cultural_object schema:creator ?author }
-        OPTIONAL { ?author schema:identifier ?author_id }
-        OPTIONAL { ?author rdfs:label ?author_name }
+        OPTIONAL { ?author schema:identifier ?creator_id }
+        OPTIONAL { ?author rdfs:label ?creator_name }
+        BIND(REPLACE(STR(?type), "https://schema.org/", "") AS ?type_name)
         
         FILTER(?type IN (
         <https://schema.org/NauticalChart>,
@@ -709,16 +2217,14 @@ class MetadataQueryHandler(QueryHandler):
         <https://schema.org/Model>,
         <https://schema.org/Map>
         ))
-        FILTER(?author_name != "NaN")
-        FILTER(?author_id != "NaN")
+        FILTER(?creator_name != "NaN")
+        FILTER(?creator_id != "NaN")
         }
+        GROUP BY ?cultural_object ?type_name ?id ?title ?date ?owner ?place
         """
-        df_sparql = get(endpoint, cultural_object_query, True)
-        return df_sparql
 
-    def getAuthorsOfCulturalHeritageObject(self, input_id) -> pd.DataFrame:   
-        endpoint = self.blazegraph_endpoint
-        id_author_query = f"""
+    def authorsOfCulturalHeritageObjectQuery(self, input_id) -> str:
+        return f"""
         PREFIX rdf:  <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
         PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
         PREFIX schema: <https://schema.org/>
@@ -731,22 +2237,38 @@ class MetadataQueryHandler(QueryHandler):
             ?Author schema:identifier ?id .
         }}
         """
-        df_sparql = get(endpoint, id_author_query, True)
-        return df_sparql
 
-    def getCulturalHeritageObjectsAuthoredBy(
-        self, input_id
-    ) -> pd.DataFrame:   
-        endpoint = self.blazegraph_endpoint
-        id_cultural_query = f"""
+    def authorsOfCulturalHeritageObjectsQuery(self, input_ids: List[str]) -> str:
+        # Authors of all the given objects at once, with the object they made
+        values = " ".join(json.dumps(str(input_id), ensure_ascii=False) for input_id in input_ids)
+        return f"""
         PREFIX rdf:  <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
         PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
         PREFIX schema: <https://schema.org/>
 
-        SELECT ?object ?type_name ?id ?title ?date ?owner ?place ?name ?author_id
-            WHERE {{
-            ?entity schema:identifier "{input_id}" .
+        SELECT ?object_id ?id ?name
+        WHERE {{
+            VALUES ?object_id {{ {values} }}
+            ?entity schema:identifier ?object_id .
             ?entity schema:creator ?Author .
+            ?Author rdfs:label ?name .
+            ?Author schema:identifier ?id .
+        }}
+        """
+
+    def culturalHeritageObjectsAuthoredByQuery(self, input_id) -> str:
+        # Grouped like allCulturalHeritageObjectsQuery, listing every co-author
+        return f"""
+        PREFIX rdf:  <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+        PREFIX schema: <https://schema.org/>
+
+        SELECT ?object ?type_name ?id ?title ?date ?owner ?place
+            (GROUP_CONCAT(DISTINCT ?coauthor_name; SEPARATOR="; ") AS ?name)
+            (GROUP_CONCAT(DISTINCT ?coauthor_id; SEPARATOR="; ") AS ?author_id)
+            (GROUP_CONCAT(DISTINCT CONCAT(STR(?coauthor_id), "\\t", STR(?coauthor_name)); SEPARATOR="\\n") AS ?authors)
+            WHERE {{
+            ?Author schema:identifier "{input_id}" .
             ?object schema:creator ?Author .
             ?object rdf:type ?type .
             ?object schema:name ?title .
@@ -755,9 +2277,9 @@ class MetadataQueryHandler(QueryHandler):
             ?object schema:provider ?owner .
             ?object schema:contentLocation ?place .
             OPTIONAL {{
-                ?object schema:creator ?Author .
-                ?Author rdfs:label ?name .
-                ?Author schema:identifier ?author_id .
+                ?object schema:creator ?coauthor .
+                ?coauthor rdfs:label ?coauthor_name .
+                ?coauthor schema:identifier ?coauthor_id .
             }}
             BIND(REPLACE(STR(?type), "https://schema.org/", "") AS ?type_name)
             FILTER(?type IN (
@@ -773,212 +2295,489 @@ class MetadataQueryHandler(QueryHandler):
                     <https://schema.org/Map>
                     ))
             }}
+            GROUP BY ?object ?type_name ?id ?title ?date ?owner ?place
             """
 
-        df_sparql = get(endpoint, id_cultural_query, True)
-        df_sparql.drop_duplicates(inplace=True)
-        return df_sparql
+    def getById(self, input_id: str) -> pd.DataFrame:   
+        return self.sparqlQuery(self.entityByIdQuery(input_id))
 
+    def getAllPeople(self) -> pd.DataFrame:   
+        return self.sparqlQuery(self.allPeopleQuery())
 
-class ProcessDataQueryHandler(QueryHandler):
-    def __init__(self):
-        super().__init__()
+    def getAllCulturalHeritageObjects(self) -> pd.DataFrame:   
+        return self.sparqlQuery(self.allCulturalHeritageObjectsQuery())
+
+    def getAuthorsOfCulturalHeritageObject(self, input_id) -> pd.DataFrame:   
+        return self.sparqlQuery(self.authorsOfCulturalHeritageObjectQuery(input_id))
+
+    def getAuthorsOfCulturalHeritageObjects(self, input_ids: List[str]) -> pd.DataFrame:
+        # One query per SPARQL_VALUES_CHUNK ids instead of one per object
+        frames = [
+            self.sparqlQuery(self.authorsOfCulturalHeritageObjectsQuery(chunk))
+            for chunk in iter_batches(input_ids, SPARQL_VALUES_CHUNK)
+        ]
+        return merge_frames(frames)
+
+    def getCulturalHeritageObjectsAuthoredBy(
+        self, input_id
+    ) -> pd.DataFrame:   
+        return self.sparqlQuery(self.culturalHeritageObjectsAuthoredByQuery(input_id))
+
+    def getCulturalHeritageObjectsByIds(self, input_ids: List[str]) -> pd.DataFrame:
+        # Rows of getAllCulturalHeritageObjects for the given ids only
+        frames = [
+            self.sparqlQuery(self.allCulturalHeritageObjectsQuery(chunk))
+            for chunk in iter_batches(input_ids, SPARQL_VALUES_CHUNK)
+        ]
+        return merge_frames(frames)
+
+
+class ProcessDataQueryHandler(QueryHandler):
+    def __init__(self):
+        super().__init__()
+        self.pool = SQLiteConnectionPool(PROCESS_DB_FILE)
+
+    def setDbPathOrUrl(self, pathOrUrl: str) -> bool:
+        # Queries go to the new database from now on
+        result = super().setDbPathOrUrl(pathOrUrl)
+        self.closeConnections()
+        self.pool = SQLiteConnectionPool(pathOrUrl or PROCESS_DB_FILE)
+        return result
+
+    def getConnection(self) -> sqlite3.Connection:
+        return self.pool.get()
+
+    def closeConnections(self):
+        self.pool.close()
 
     def getById(self, id: str):   
         return pd.DataFrame()
 
-    def getAllActivities(self) -> pd.DataFrame:   
-        db_file = "json.db"
+    def activitySelect(self, table: str, columns: List[str]) -> str:
+        # Every activity table is selected with the same columns, so the
+        # results of the five tables can be combined
+        technique = "technique" if "technique" in columns else "NULL as technique"
+        return (
+            f"SELECT object_id, responsible_institute, responsible_person, {technique}, tool, "
+            f"start_date, end_date, '{table}' as type FROM {table}"
+        )
+
+    def hasTable(self, conn: sqlite3.Connection, name: str) -> bool:
+        return conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = ?", (name,)
+        ).fetchone() is not None
+
+    def searchCondition(self, table: str, column: str) -> str:
+        # Match the rows found by the trigram index of the table, by rowid
+        return f"rowid IN (SELECT rowid FROM {table}_search WHERE {column} LIKE ?)"
+
+    def likeCondition(self, column: str, value: str) -> tuple:
+        # Case-insensitive substring match of value, with any % _ or \ in it
+        # taken literally. Returns (condition, parameter, indexable): only the
+        # plain LIKE on ASCII text can use the trigram index.
+        if not value.isascii():
+            condition, value, indexable = f"py_lower({column}) LIKE ?", value.lower(), False
+        else:
+            condition, indexable = f"{column} LIKE ?", True
+        if any(char in value for char in "%_\\"):
+            value = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            condition, indexable = condition + " ESCAPE '\\'", False
+        return condition, f"%{value}%", indexable
+
+    def activityQuery(
+        self,
+        conn: sqlite3.Connection,
+        column: Optional[str] = None,
+        operator: Optional[str] = None,
+        value: Optional[str] = None,
+        tables: Optional[List[str]] = None,
+    ) -> tuple:
+        # The SELECT of queryActivities and its parameters, also used as a
+        # subquery by the joins with the catalog mirror
+        if operator == "LIKE":
+            condition, param, indexable = self.likeCondition(column, value)
+            values = [param]
+        elif operator == "IN":
+            # value is a list, matched through the index of the column
+            condition = f"{column} IN ({', '.join('?' for _ in value)})"
+            values, indexable = list(value), False
+        else:
+            condition, values, indexable = f"{column} {operator} ?", [value], False
+        # Trigram lookups need at least three characters to use the index
+        use_search = indexable and len(value) >= 3
+
+        layout = stored_layout(conn)
+        if layout == "activity":
+            # Single-table layout: one indexed query, no UNION to dedupe
+            query = (
+                "SELECT object_id, responsible_institute, responsible_person, technique, tool, "
+                f"start_date, end_date, type FROM {UNIFIED_ACTIVITY_TABLE}"
+            )
+            conditions = []
+            params = []
+            if tables is not None:
+                conditions.append(f"type IN ({', '.join('?' for _ in tables)})")
+                params.extend(tables)
+            if column is not None:
+                if use_search and self.hasTable(conn, f"{UNIFIED_ACTIVITY_TABLE}_search"):
+                    conditions.append(self.searchCondition(UNIFIED_ACTIVITY_TABLE, column))
+                else:
+                    conditions.append(condition)
+                params.extend(values)
+            if conditions:
+                query += " WHERE " + " AND ".join(conditions)
+            return query, params
+
+        selects = []
+        params = []
+        for table, columns in ACTIVITY_TABLES.values():
+            if tables is not None and table not in tables:
+                continue
+            select = self.activitySelect(table, columns)
+            if column is not None:
+                if use_search and self.hasTable(conn, f"{table}_search"):
+                    select += " WHERE " + self.searchCondition(table, column)
+                else:
+                    select += f" WHERE {condition}"
+                params.extend(values)
+            selects.append(select)
+
+        # Every table is keyed by object_id and tags its rows with its own
+        # type, so the branches cannot overlap and need no deduplication
+        return "\nUNION ALL\n".join(selects), params
+
+    def queryActivities(
+        self,
+        column: Optional[str] = None,
+        operator: Optional[str] = None,
+        value: Optional[str] = None,
+        tables: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        # Select the activities of the given types (all of them by default)
+        # where column <operator> value. With operator "LIKE" value is matched
+        # as a substring, ignoring case, through the trigram index when it is
+        # available.
         try:
-            conn = sqlite3.connect(db_file)
-
-            # Use LIKE operator to match partially with the technique string
-            query = """
-                SELECT object_id, responsible_institute, responsible_person, technique, NULL as tool, start_date, end_date, 'Acquisition' as type  FROM Acquisition
-                UNION
-                SELECT object_id, responsible_institute, responsible_person, NULL as technique, NULL as tool, start_date, end_date, 'Processing' as type  FROM Processing
-                UNION
-                SELECT object_id, responsible_institute, responsible_person, NULL as technique, NULL as tool, start_date, end_date, 'Modelling' as type  FROM Modelling
-                UNION
-                SELECT object_id, responsible_institute, responsible_person, NULL as technique, NULL as tool, start_date, end_date, 'Optimising' as type  FROM Optimising
-                UNION
-                SELECT object_id, responsible_institute, responsible_person, NULL as technique, NULL as tool, start_date, end_date, 'Exporting' as type  FROM Exporting
-            """
-            df = pd.read_sql_query(query, conn)
-            return df
+            conn = self.getConnection()
+            query, params = self.activityQuery(conn, column, operator, value, tables)
+            return pd.read_sql_query(query, conn, params=params)
 
         except sqlite3.Error as e:
             print("SQLite error:", e)
-        finally:
-            conn.close()
+
+    def getAllActivities(self) -> pd.DataFrame:   
+        return self.queryActivities()
 
     def getActivitiesByResponsibleInstitution(
         self, institution_str: str
     ) -> pd.DataFrame:   
-        db_file = "json.db"
-        try:
-            conn = sqlite3.connect(db_file)
-
-            # Use LIKE operator to match partially with the technique string
-            query = """
-                SELECT object_id, responsible_institute, responsible_person, technique, NULL as tool, start_date, end_date, 'Acquisition' as type  FROM Acquisition WHERE responsible_institute LIKE ?
-                UNION
-                SELECT object_id, responsible_institute, responsible_person, NULL as technique, NULL as tool, start_date, end_date, 'Processing' as type  FROM Processing WHERE responsible_institute LIKE ?
-                UNION
-                SELECT object_id, responsible_institute, responsible_person, NULL as technique, NULL as tool, start_date, end_date, 'Modelling' as type  FROM Modelling WHERE responsible_institute LIKE ?
-                UNION
-                SELECT object_id, responsible_institute, responsible_person, NULL as technique, NULL as tool, start_date, end_date, 'Optimising' as type  FROM Optimising WHERE responsible_institute LIKE ?
-                UNION
-                SELECT object_id, responsible_institute, responsible_person, NULL as technique, NULL as tool, start_date, end_date, 'Exporting' as type  FROM Exporting WHERE responsible_institute LIKE ?
-            """
-            like_param = f"%{institution_str}%"
-            params = (like_param, like_param, like_param, like_param, like_param)
-
-            # Fetch the data using pandas
-            df = pd.read_sql_query(query, conn, params=params)
-            return df
-
-        except sqlite3.Error as e:
-            print("SQLite error:", e)
-        finally:
-            conn.close()
+        # Partial, case-insensitive match on the institute name
+        return self.queryActivities("responsible_institute", "LIKE", institution_str)
 
     def getActivitiesByResponsiblePerson(
         self, responsible_person_str: str
     ) -> pd.DataFrame:   
-        db_file = "json.db"
-        try:
-            conn = sqlite3.connect(db_file)
-
-            # Use LIKE operator to match partially with the technique string
-            query = """
-                SELECT object_id, responsible_institute, responsible_person, technique, NULL as tool, start_date, end_date, 'Acquisition' as type  FROM Acquisition WHERE responsible_person LIKE ?
-                UNION
-                SELECT object_id, responsible_institute, responsible_person, NULL as technique, NULL as tool, start_date, end_date, 'Processing' as type  FROM Processing WHERE responsible_person LIKE ?
-                UNION
-                SELECT object_id, responsible_institute, responsible_person, NULL as technique, NULL as tool, start_date, end_date, 'Modelling' as type  FROM Modelling WHERE responsible_person LIKE ?
-                UNION
-                SELECT object_id, responsible_institute, responsible_person, NULL as technique, NULL as tool, start_date, end_date, 'Optimising' as type  FROM Optimising WHERE responsible_person LIKE ?
-                UNION
-                SELECT object_id, responsible_institute, responsible_person, NULL as technique, NULL as tool, start_date, end_date, 'Exporting' as type  FROM Exporting WHERE responsible_person LIKE ?
-            """
-            like_param = f"%{responsible_person_str}%"
-            params = (like_param, like_param, like_param, like_param, like_param)
+        # Partial, case-insensitive match on the person name
+        return self.queryActivities("responsible_person", "LIKE", responsible_person_str)
 
-            df = pd.read_sql_query(query, conn, params=params)
-            return df
+    def getActivitiesUsingTool(self, tool_str: str) -> pd.DataFrame:   
+        # Partial, case-insensitive match on any of the tools
+        return self.queryActivities("tool", "LIKE", tool_str)
 
-        except sqlite3.Error as e:
-            print("SQLite error:", e)
-        finally:
-            conn.close()
+    def getActivitiesStartedAfter(self, start_date: str) -> pd.DataFrame:   
+        # Range seek on the start_date index of every table
+        return self.queryActivities("start_date", ">=", start_date)
 
-    def getActivitiesUsingTool(self, tool_str: str) -> pd.DataFrame:   
-        db_file = "json.db"
+    def getActivitiesEndedBefore(self, end_date: str) -> pd.DataFrame:   
+        # Range seek on the end_date index of every table
+        return self.queryActivities("end_date", "<=", end_date)
 
+    def getAcquisitionsByTechnique(self, technique_str: str) -> pd.DataFrame:   
+        # Partial, case-insensitive match on the acquisition technique
+        return self.queryActivities("technique", "LIKE", technique_str, ["Acquisition"])
+
+    def getActivitiesOnObjects(self, object_ids: List[str]) -> pd.DataFrame:
+        # Only the activities of the given objects leave SQLite: the ids are
+        # looked up on the object_id key, SQL_IN_CHUNK at a time
+        ids = sorted({str(object_id) for object_id in object_ids})
+        frames = [
+            self.queryActivities("object_id", "IN", chunk)
+            for chunk in iter_batches(ids, SQL_IN_CHUNK)
+        ]
+        return merge_frames(frames)
+
+    def attachCatalog(self, conn: sqlite3.Connection, catalog_db: str):
+        # ATTACH the catalog mirror to this thread's connection, unless it
+        # is already there
+        path = os.path.realpath(catalog_db)
+        attached = {row[1]: row[2] for row in conn.execute("PRAGMA database_list")}
+        if attached.get(CATALOG_SCHEMA) and os.path.realpath(attached[CATALOG_SCHEMA]) == path:
+            return
+        if CATALOG_SCHEMA in attached:
+            conn.execute(f"DETACH DATABASE {CATALOG_SCHEMA}")
+        if self.pool.read_only:
+            path = "file:" + pathname2url(path) + "?mode=ro"
+        conn.execute(f"ATTACH DATABASE ? AS {CATALOG_SCHEMA}", (path,))
+
+    def getCatalogObjectsHandledBy(self, catalog_db: str, column: str, value: str) -> pd.DataFrame:
+        # The objects of the catalog mirror with an activity where column
+        # matches value, as rows of getAllCulturalHeritageObjects, joined in
+        # one query
         try:
-            conn = sqlite3.connect(db_file)
-
-            # Use LIKE operator to match partially with the tool string
-            query = """
-                SELECT object_id, responsible_institute, responsible_person, technique, NULL as tool, start_date, end_date, 'Acquisition' as type  FROM Acquisition WHERE tool LIKE ?
-                UNION
-                SELECT object_id, responsible_institute, responsible_person, NULL as technique, NULL as tool, start_date, end_date, 'Processing' as type  FROM Processing WHERE tool LIKE ?
-                UNION
-                SELECT object_id, responsible_institute, responsible_person, NULL as technique, NULL as tool, start_date, end_date, 'Modelling' as type  FROM Modelling WHERE tool LIKE ?
-                UNION
-                SELECT object_id, responsible_institute, responsible_person, NULL as technique, NULL as tool, start_date, end_date, 'Optimising' as type  FROM Optimising WHERE tool LIKE ?
-                UNION
-                SELECT object_id, responsible_institute, responsible_person, NULL as technique, NULL as tool, start_date, end_date, 'Exporting' as type  FROM Exporting WHERE tool LIKE ?
+            conn = self.getConnection()
+            self.attachCatalog(conn, catalog_db)
+            activities, params = self.activityQuery(conn, column, "LIKE", value)
+            query = f"""
+                SELECT o.type_name, o.id, o.title, o.date, o.owner, o.place,
+                    group_concat(a.id || char(9) || a.name, char(10)) AS authors
+                FROM {CATALOG_SCHEMA}.object o
+                LEFT JOIN {CATALOG_SCHEMA}.authorship w ON w.object_id = o.id
+                LEFT JOIN {CATALOG_SCHEMA}.author a ON a.iri = w.author
+                WHERE o.id IN (SELECT object_id FROM ({activities}))
+                GROUP BY o.id
             """
-            like_param = f"%{tool_str}%"
-            params = (like_param, like_param, like_param, like_param, like_param)
-
-            df = pd.read_sql_query(query, conn, params=params)
-            return df
+            return pd.read_sql_query(query, conn, params=params)
 
         except sqlite3.Error as e:
             print("SQLite error:", e)
-        finally:
-            conn.close()
-
-    def getActivitiesStartedAfter(self, start_date: str) -> pd.DataFrame:   
-        db_file = "json.db"
 
+    def getCatalogAuthorsOfObjectsAcquiredInTimeFrame(
+        self, catalog_db: str, start_date: str, end_date: str
+    ) -> pd.DataFrame:
+        # The authors in the catalog mirror of the objects acquired after
+        # start_date and exported before end_date, joined in one query. Both
+        # activities must be in this database, so the mashups only use it
+        # with a single process handler.
         try:
-            conn = sqlite3.connect(db_file)
-            query = """
-            SELECT object_id, responsible_institute, responsible_person, technique, NULL as tool, start_date, end_date, 'Acquisition' as type 
-            FROM Acquisition WHERE start_date >= ? 
-            UNION 
-            SELECT object_id, responsible_institute, responsible_person, NULL as technique, NULL as tool, start_date, end_date, 'Processing' as type 
-            FROM Processing WHERE start_date >= ? 
-            UNION 
-            SELECT object_id, responsible_institute, responsible_person, NULL as technique, NULL as tool, start_date, end_date, 'Modelling' as type 
-            FROM Modelling WHERE start_date >= ? 
-            UNION 
-            SELECT object_id, responsible_institute, responsible_person, NULL as technique, NULL as tool, start_date, end_date, 'Optimising' as type 
-            FROM Optimising WHERE start_date >= ? 
-            UNION 
-            SELECT object_id, responsible_institute, responsible_person, NULL as technique, NULL as tool, start_date, end_date, 'Exporting' as type 
-            FROM Exporting WHERE start_date >= ?
-            """
-            df = pd.read_sql_query(
-                query,
-                conn,
-                params=(start_date, start_date, start_date, start_date, start_date),
+            conn = self.getConnection()
+            self.attachCatalog(conn, catalog_db)
+            acquired, acquired_params = self.activityQuery(
+                conn, "start_date", ">=", start_date, ["Acquisition"]
             )
-            return df
+            exported, exported_params = self.activityQuery(
+                conn, "end_date", "<=", end_date, ["Exporting"]
+            )
+            query = f"""
+                SELECT DISTINCT a.id, a.name
+                FROM {CATALOG_SCHEMA}.authorship w
+                JOIN {CATALOG_SCHEMA}.author a ON a.iri = w.author
+                WHERE w.object_id IN (
+                    SELECT object_id FROM ({acquired})
+                    INTERSECT
+                    SELECT object_id FROM ({exported})
+                )
+            """
+            return pd.read_sql_query(query, conn, params=acquired_params + exported_params)
 
         except sqlite3.Error as e:
             print("SQLite error:", e)
-        finally:
-            conn.close()
 
-    def getActivitiesEndedBefore(self, end_date: str) -> pd.DataFrame:   
-        db_file = "json.db"
 
-        try:
-            conn = sqlite3.connect(db_file)
+class AsyncMetadataQueryHandler(QueryHandler):
+    # Metadata queries for asyncio applications. The blocking handler it
+    # wraps holds the endpoint (or local store) and the cache, and builds the
+    # SPARQL text, so both send exactly the same queries. Requests go
+    # through an aiohttp session (an optional dependency), which keeps its
+    # connections alive and shares them among all the queries of the
+    # handler. The session belongs to the event loop that first used it.
+    # The methods are coroutines, so only the async mashups take it.
+    def __init__(self, connections: int = 20, timeout: float = 60):
+        super().__init__()
+        self.handler = MetadataQueryHandler()
+        self.connections = connections
+        self.timeout = timeout
+        self.session = None
 
-            # Construct the SQL query with NULL columns where necessary
-            query = (
-                "SELECT object_id, responsible_institute, responsible_person, technique, NULL as tool, start_date, end_date, 'Acquisition' as type FROM Acquisition WHERE end_date <= ? UNION "
-                "SELECT object_id, responsible_institute, responsible_person, NULL as technique, NULL as tool, start_date, end_date, 'Processing' as type FROM Processing WHERE end_date <= ? UNION "
-                "SELECT object_id, responsible_institute, responsible_person, NULL as technique, NULL as tool, start_date, end_date, 'Modelling' as type FROM Modelling WHERE end_date <= ? UNION "
-                "SELECT object_id, responsible_institute, responsible_person, NULL as technique, NULL as tool, start_date, end_date, 'Optimising' as type  FROM Optimising WHERE end_date <= ? UNION "
-                "SELECT object_id, responsible_institute, responsible_person, NULL as technique, NULL as tool, start_date, end_date, 'Exporting' as type FROM Exporting WHERE end_date <= ?"
+    def setDbPathOrUrl(self, pathOrUrl: str) -> bool:
+        super().setDbPathOrUrl(pathOrUrl)
+        return self.handler.setDbPathOrUrl(pathOrUrl)
+
+    @property
+    def cache(self) -> Optional[QueryCache]:
+        # Set to None to always query the endpoint
+        return self.handler.cache
+
+    @cache.setter
+    def cache(self, cache: Optional[QueryCache]):
+        self.handler.cache = cache
+
+    async def getSession(self):
+        if self.session is None or self.session.closed:
+            try:
+                import aiohttp
+            except ImportError:
+                raise ImportError(
+                    "AsyncMetadataQueryHandler requires aiohttp (pip install aiohttp)"
+                )
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.connections),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
             )
+        return self.session
+
+    async def sparqlQuery(self, query: str) -> pd.DataFrame:
+        if self.handler.local_store is not None:
+            # No HTTP: the local store answers in a worker thread
+            return await asyncio.to_thread(self.handler.sparqlQuery, query)
+        endpoint = self.handler.blazegraph_endpoint
+        if self.cache is not None:
+            cached = self.cache.get(endpoint, query)
+            if cached is not None:
+                return cached
+        session = await self.getSession()
+        headers = {"Content-Type": "application/sparql-query", "Accept": "text/csv"}
+        async with session.post(endpoint, data=query.encode("utf-8"), headers=headers) as response:
+            response.raise_for_status()
+            text = await response.text(encoding="utf-8")
+        result = sparql_frame(text)
+        if self.cache is not None:
+            self.cache.put(endpoint, query, result)
+        return result
+
+    async def close(self):
+        self.handler.close()
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def getById(self, input_id: str) -> pd.DataFrame:
+        return await self.sparqlQuery(self.handler.entityByIdQuery(input_id))
+
+    async def getAllPeople(self) -> pd.DataFrame:
+        return await self.sparqlQuery(self.handler.allPeopleQuery())
+
+    async def getAllCulturalHeritageObjects(self) -> pd.DataFrame:
+        return await self.sparqlQuery(self.handler.allCulturalHeritageObjectsQuery())
+
+    async def getAuthorsOfCulturalHeritageObject(self, input_id) -> pd.DataFrame:
+        return await self.sparqlQuery(self.handler.authorsOfCulturalHeritageObjectQuery(input_id))
+
+    async def getAuthorsOfCulturalHeritageObjects(self, input_ids: List[str]) -> pd.DataFrame:
+        frames = await asyncio.gather(
+            *(
+                self.sparqlQuery(self.handler.authorsOfCulturalHeritageObjectsQuery(chunk))
+                for chunk in iter_batches(input_ids, SPARQL_VALUES_CHUNK)
+            )
+        )
+        return merge_frames(frames)
 
-            df = pd.read_sql_query(
-                query, conn, params=(end_date, end_date, end_date, end_date, end_date)
+    async def getCulturalHeritageObjectsAuthoredBy(self, input_id) -> pd.DataFrame:
+        return await self.sparqlQuery(self.handler.culturalHeritageObjectsAuthoredByQuery(input_id))
+
+    async def getCulturalHeritageObjectsByIds(self, input_ids: List[str]) -> pd.DataFrame:
+        frames = await asyncio.gather(
+            *(
+                self.sparqlQuery(self.handler.allCulturalHeritageObjectsQuery(chunk))
+                for chunk in iter_batches(input_ids, SPARQL_VALUES_CHUNK)
             )
-            return df
+        )
+        return merge_frames(frames)
 
-        except sqlite3.Error as e:
-            print("SQLite error:", e)
-        finally:
-            conn.close()
 
-    def getAcquisitionsByTechnique(self, technique_str: str) -> pd.DataFrame:   
-        db_file = "json.db"
-        try:
-            conn = sqlite3.connect(db_file)
+class AsyncProcessDataQueryHandler(QueryHandler):
+    # Process queries for asyncio applications: every query of the wrapped
+    # ProcessDataQueryHandler runs in a worker thread, on that thread's
+    # pooled connection, so SQLite never blocks the event loop. The methods
+    # are coroutines, so only the async mashups take it.
+    def __init__(self):
+        super().__init__()
+        self.handler = ProcessDataQueryHandler()
 
-            # Use LIKE operator to match partially with the technique string
-            query = f"SELECT * FROM Acquisition WHERE technique LIKE ?"
+    def setDbPathOrUrl(self, pathOrUrl: str) -> bool:
+        super().setDbPathOrUrl(pathOrUrl)
+        return self.handler.setDbPathOrUrl(pathOrUrl)
 
-            # Execute the query and pass the technique_str wrapped with '%' for partial match
-            df = pd.read_sql_query(query, conn, params=("%" + technique_str + "%",))
+    def closeConnections(self):
+        self.handler.closeConnections()
 
-            # Add the type column
-            df["type"] = "Acquisition"
-            return df
+    async def inThread(self, method: str, *args) -> pd.DataFrame:
+        return await asyncio.to_thread(getattr(self.handler, method), *args)
+
+    async def getById(self, id: str) -> pd.DataFrame:
+        return await self.inThread("getById", id)
+
+    async def getAllActivities(self) -> pd.DataFrame:
+        return await self.inThread("getAllActivities")
+
+    async def getActivitiesByResponsibleInstitution(self, institution_str: str) -> pd.DataFrame:
+        return await self.inThread("getActivitiesByResponsibleInstitution", institution_str)
+
+    async def getActivitiesByResponsiblePerson(self, responsible_person_str: str) -> pd.DataFrame:
+        return await self.inThread("getActivitiesByResponsiblePerson", responsible_person_str)
+
+    async def getActivitiesUsingTool(self, tool_str: str) -> pd.DataFrame:
+        return await self.inThread("getActivitiesUsingTool", tool_str)
+
+    async def getActivitiesStartedAfter(self, start_date: str) -> pd.DataFrame:
+        return await self.inThread("getActivitiesStartedAfter", start_date)
+
+    async def getActivitiesEndedBefore(self, end_date: str) -> pd.DataFrame:
+        return await self.inThread("getActivitiesEndedBefore", end_date)
+
+    async def getAcquisitionsByTechnique(self, technique_str: str) -> pd.DataFrame:
+        return await self.inThread("getAcquisitionsByTechnique", technique_str)
+
+    async def getActivitiesOnObjects(self, object_ids: List[str]) -> pd.DataFrame:
+        return await self.inThread("getActivitiesOnObjects", object_ids)
+
+    async def getCatalogObjectsHandledBy(
+        self, catalog_db: str, column: str, value: str
+    ) -> pd.DataFrame:
+        return await self.inThread("getCatalogObjectsHandledBy", catalog_db, column, value)
+
+    async def getCatalogAuthorsOfObjectsAcquiredInTimeFrame(
+        self, catalog_db: str, start_date: str, end_date: str
+    ) -> pd.DataFrame:
+        return await self.inThread(
+            "getCatalogAuthorsOfObjectsAcquiredInTimeFrame", catalog_db, start_date, end_date
+        )
 
-        except sqlite3.Error as e:
-            print("SQLite error:", e)
-        finally:
-            conn.close()
+
+# To combine the DataFrames returned by several handlers, dropping the rows
+# repeated on the given key columns, within or across them
+def merge_frames(frames: List[pd.DataFrame], keys: Optional[List[str]] = None) -> pd.DataFrame:
+    frames = [df for df in frames if df is not None]
+    non_empty = [df for df in frames if not df.empty]
+    if not non_empty:
+        # An empty result keeps the columns the handlers returned, so the
+        # callers can still select them
+        return frames[0].copy() if frames else pd.DataFrame()
+    frames = non_empty
+    merged = frames[0] if len(frames) == 1 else concat(frames, ignore_index=True)
+    if keys:
+        merged = merged.drop_duplicates(subset=[key for key in keys if key in merged.columns])
+    return merged
+
+
+# To join activities with the catalog on the object id. Ids are compared as
+# text; the catalog is indexed by id once and all the activity ids are looked
+# up in a single merge, instead of scanning the catalog for every activity.
+# Each matching object is returned once, in the order of its first activity.
+def join_objects(
+    activities_df: pd.DataFrame, objects_df: pd.DataFrame, identity_map: Optional[IdentityMap] = None
+) -> List[CulturalHeritageObject]:
+    if (
+        activities_df is None
+        or objects_df is None
+        or "object_id" not in activities_df.columns
+        or "id" not in objects_df.columns
+    ):
+        return []
+    activity_ids = pd.DataFrame(
+        {"id": activities_df["object_id"].dropna().astype(str).drop_duplicates()}
+    )
+    objects_df = objects_df[objects_df["id"].notna()]
+    catalog = objects_df.assign(id=objects_df["id"].astype(str))
+    return materialize_objects(activity_ids.merge(catalog, on="id"), identity_map)
+
+
+# To collect the ids of the objects with an activity of the given type
+def object_ids_of_type(activities_df: pd.DataFrame, activity_type: str) -> set:
+    if activities_df is None or "type" not in activities_df.columns:
+        return set()
+    return set(
+        column_values(activities_df[activities_df["type"] == activity_type], "object_id")
+    )
 
 
 class BasicMashup(object):
@@ -986,12 +2785,25 @@ class BasicMashup(object):
         self,
         metadataQuery: List[MetadataQueryHandler],
         processQuery: List[ProcessDataQueryHandler],
+        quiet: bool = True,
     ) -> None:   
         self.metadataQuery = metadataQuery if metadataQuery is not None else []
         self.processQuery = processQuery if processQuery is not None else []
+        for handler in self.metadataQuery + self.processQuery:
+            self.checkHandler(handler)
+        # Set quiet to False to list the activities built by each query
+        self.quiet = quiet
+        # Shared Person and CulturalHeritageObject instances, by id
+        self.identity_map = IdentityMap(self.loadObjects)
+        # A handler that has not answered after this many seconds is skipped
+        self.handler_timeout = HANDLER_TIMEOUT
+        # SQLite mirror of the catalog attached to the process databases, see
+        # useCatalogMirror
+        self.catalog_db = None
 
     def cleanMetadataHandlers(self) -> bool:   
         self.metadataQuery.clear()
+        self.identity_map.clear()
         return True
 
     def cleanProcessHandlers(self) -> bool:   
@@ -999,1320 +2811,432 @@ class BasicMashup(object):
         return True
 
     def addMetadataHandler(self, handler: MetadataQueryHandler) -> bool:   
+        self.checkHandler(handler)
         self.metadataQuery.append(handler)
+        # The new handler may have the objects the others did not
+        self.identity_map.missing.clear()
         return True
 
     def addProcessHandler(self, handler: ProcessDataQueryHandler) -> bool:   
+        self.checkHandler(handler)
         self.processQuery.append(handler)
         return True
 
-    def getEntityById(self, id: str) -> IdentifiableEntity | None:   
-        id_entity: List[Person] = []
-        processed_ids = set()  # Set to keep track of processed IDs
-
-        for handler in self.metadataQuery:
-            people_df = handler.getById(id)
-            for _, row in people_df.iterrows():
-                person_id = row["identifier"]
-                # Check if the ID has already been processed
-                if person_id not in processed_ids:
-                    person = Person(id=person_id, name=row["name"])
-                id_entity.append(person)
-                processed_ids.add(person_id)  # Add the ID to the set of processed IDs
-
-        print("Entity found by Id:")
-        for person in id_entity:
-            print(
-                f"Name: {person.name}, Id: {person.id}, Type: {type(person).__name__}"
-            )
-        if id_entity == []:
-            id_entity = None
-            
-        return id_entity
-
-    def getAllPeople(self) -> List[Person]:   /Rubens
-        all_people: List[Person] = []
-        processed_ids = set()  # Set to keep track of processed IDs
-
-        for handler in self.metadataQuery:
-            people_df = handler.getAllPeople()
-            for _, row in people_df.iterrows():
-                person_id = row["id"]
-                # Check if the ID has already been processed
-                if person_id not in processed_ids:
-                    person = Person(id=person_id, name=row["name"])
-                    all_people.append(person)
-                    processed_ids.add(
-                        person_id
-                    )  # Add the ID to the set of processed IDs
-
-        print("Person list created:")
-        for person in all_people:
-            print(f"Name: {person.name}, Type: {type(person).__name__}")
-        return all_people
+    def checkHandler(self, handler):
+        # The methods of the async handlers are coroutines, which only the
+        # async mashups await
+        if isinstance(handler, (AsyncMetadataQueryHandler, AsyncProcessDataQueryHandler)):
+            raise TypeError(f"{type(handler).__name__} can only be used with the async mashups")
+
+    def useCatalogMirror(self, catalog_db: Optional[str]) -> bool:
+        # With the catalog_db written by MetadataUploadHandler, the queries
+        # joining objects and activities run as a single SQL query on each
+        # process database, without the metadata handlers. None turns it off.
+        self.catalog_db = catalog_db
+        return True
 
-    def getAllCulturalHeritageObjects(
-        self,
-    ) -> List[CulturalHeritageObject]:   
-        objects_list = []
-        df = pd.DataFrame()
+    def fanOut(self, handlers: list, method: str, *args) -> List[pd.DataFrame]:
+        # Call the method on every handler at once, so a query takes as long
+        # as the slowest handler rather than the sum of all of them. Handlers
+        # that fail or time out are reported and left out.
+        deadline = time.monotonic() + self.handler_timeout
+        futures = [
+            HANDLER_EXECUTOR.submit(call_with_deadline, getattr(handler, method), deadline, *args)
+            for handler in handlers
+        ]
+        done, _ = wait(futures, timeout=self.handler_timeout)
+        results = []
+        for handler, future in zip(handlers, futures):
+            if future not in done:
+                future.cancel()
+                print(f"{type(handler).__name__}.{method} timed out after {self.handler_timeout}s.")
+                continue
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"{type(handler).__name__}.{method} failed:", e)
+        return results
+
+    def metadataFrame(self, method: str, *args, keys: Optional[List[str]] = None) -> pd.DataFrame:
+        return merge_frames(self.fanOut(self.metadataQuery, method, *args), keys)
+
+    def processFrame(self, method: str, *args) -> pd.DataFrame:
+        # Each object has at most one activity of each type
+        return merge_frames(self.fanOut(self.processQuery, method, *args), ["object_id", "type"])
+
+    def catalogFrame(self, method: str, *args, keys: Optional[List[str]] = None) -> pd.DataFrame:
+        # Joins of the process databases with the attached catalog mirror
+        return merge_frames(self.fanOut(self.processQuery, method, self.catalog_db, *args), keys)
+
+    def personList(
+        self, people_df: pd.DataFrame, id_column: str = "id", title: str = "Person list created:"
+    ) -> List[Person]:
+        people = [
+            self.identity_map.person(person_id, name)
+            for person_id, name in zip(
+                column_values(people_df, id_column), column_values(people_df, "name")
+            )
+        ]
+        if not self.quiet:
+            print(title)
+            for person in people:
+                print(
+                    f"Name: {person.name}, Id: {person.id}, Type: {type(person).__name__}"
+                )
+        return people
 
-        if len(self.metadataQuery) > 0:
-            df = self.metadataQuery[0].getAllCulturalHeritageObjects()
-            print("DataFrame returned from SPARQL query:")
+    def objectList(self, objects_df: pd.DataFrame) -> List[CulturalHeritageObject]:
+        # Objects found by several handlers are merged by id
+        return materialize_objects(objects_df, self.identity_map)
 
-        if df.empty:
-            print("The DataFrame is empty.")
-        else:
-            for _, row in df.iterrows():
-                id = str(row["id"])
-                title = row["title"]
-                date = row["date"]
-                owner = str(row["owner"])
-                place = row["place"]
-                author_id = str(row["author_id"])
-                author_name = row["author_name"]
-
-                hasAuthor = None
-                if author_id and author_name:
-                    hasAuthor = [Person(author_id, author_name)]
+    def getEntityById(self, id: str) -> IdentifiableEntity | None:   
+        people_df = self.metadataFrame("getById", id, keys=["identifier"])
+        return self.personList(people_df, "identifier", "Entity found by Id:") or None
 
-                try:
-                    # Use if-elif-else to instantiate objects based on type name
-                    type_name = row["type_name"]
-                    if type_name == "NauticalChart":
-                        obj = NauticalChart(id, title, date, owner, place, hasAuthor)
-                    elif type_name == "ManuscriptPlate":
-                        obj = ManuscriptPlate(id, title, date, owner, place, hasAuthor)
-                    elif type_name == "ManuscriptVolume":
-                        obj = ManuscriptVolume(id, title, date, owner, place, hasAuthor)
-                    elif type_name == "PrintedVolume":
-                        obj = PrintedVolume(id, title, date, owner, place, hasAuthor)
-                    elif type_name == "PrintedMaterial":
-                        obj = PrintedMaterial(id, title, date, owner, place, hasAuthor)
-                    elif type_name == "Herbarium":
-                        obj = Herbarium(id, title, date, owner, place, hasAuthor)
-                    elif type_name == "Specimen":
-                        obj = Specimen(id, title, date, owner, place, hasAuthor)
-                    elif type_name == "Painting":
-                        obj = Painting(id, title, date, owner, place, hasAuthor)
-                    elif type_name == "Model":
-                        obj = Model(id, title, date, owner, place, hasAuthor)
-                    elif type_name == "Map":
-                        obj = Map(id, title, date, owner, place, hasAuthor)
-                    else:
-                        print(f"No class defined for type: {type_name}")
-
-                    # Append the instantiated object to the list
-                    objects_list.append(obj)
-                except ValueError as e:
-                    print(f"Error creating CulturalHeritageObject: {e}")
-
-            print("Objects list created:")
-            for obj in objects_list:
-                print(
-                    f"Object ID: {obj.id}, Title: {obj.title}, Type: {obj.__class__.__name__}, hasAuthor: {', '.join([f'{author.name} ({author.id})' for author in obj.hasAuthor]) if obj.hasAuthor else 'None'}"
-                )
+    def getAllPeople(self) -> List[Person]:   
+        return self.personList(self.metadataFrame("getAllPeople", keys=["id"]))
 
-        return objects_list
+    def getAllCulturalHeritageObjects(
+        self,
+    ) -> List[CulturalHeritageObject]:   
+        return self.objectList(self.metadataFrame("getAllCulturalHeritageObjects"))
 
     def getAuthorsOfCulturalHeritageObject(
         self, object_id: str
     ) -> List[Person]:   
-        authors_list = []
-
-        for metadata_qh in self.metadataQuery:
-            authors_df = metadata_qh.getAuthorsOfCulturalHeritageObject(object_id)
-            print(authors_df)
-
-            for _, row in authors_df.iterrows():
-                author = Person(row["id"], row["name"])
-                authors_list.append(author)
-
-        return authors_list
+        return self.personList(
+            self.metadataFrame("getAuthorsOfCulturalHeritageObject", object_id, keys=["id"])
+        )
 
     def getCulturalHeritageObjectsAuthoredBy(
         self, input_id: str
     ) -> List[CulturalHeritageObject]:   
-        objects_list = []
-        df = pd.DataFrame()
-
-        if len(self.metadataQuery) > 0:
-            df = self.metadataQuery[0].getCulturalHeritageObjectsAuthoredBy(input_id)
-            print("DataFrame returned from SPARQL query:")
-            print(df)
-
-        if not df.empty:
-            for _, row in df.iterrows():
-                id = str(row["id"])
-                title = row["title"]
-                date = str(row["date"])
-                owner = str(row["owner"])
-                place = row["place"]
-                author_id = str(row["author_id"]) if "author_id" in df.columns else None
-                author_name = (
-                    row["author_name"] if "author_name" in df.columns else None
-                )
-
-                hasAuthor = None
-                if author_id and author_name:
-                    hasAuthor = [Person(author_id, author_name)]
-
-                try:
-                    # Use if-elif-else to instantiate objects based on type name
-                    type_name = row["type_name"]
-                    if type_name == "NauticalChart":
-                        obj = NauticalChart(id, title, date, owner, place, hasAuthor)
-                    elif type_name == "ManuscriptPlate":
-                        obj = ManuscriptPlate(id, title, date, owner, place, hasAuthor)
-                    elif type_name == "ManuscriptVolume":
-                        obj = ManuscriptVolume(id, title, date, owner, place, hasAuthor)
-                    elif type_name == "PrintedVolume":
-                        obj = PrintedVolume(id, title, date, owner, place, hasAuthor)
-                    elif type_name == "PrintedMaterial":
-                        obj = PrintedMaterial(id, title, date, owner, place, hasAuthor)
-                    elif type_name == "Herbarium":
-                        obj = Herbarium(id, title, date, owner, place, hasAuthor)
-                    elif type_name == "Specimen":
-                        obj = Specimen(id, title, date, owner, place, hasAuthor)
-                    elif type_name == "Painting":
-                        obj = Painting(id, title, date, owner, place, hasAuthor)
-                    elif type_name == "Model":
-                        obj = Model(id, title, date, owner, place, hasAuthor)
-                    elif type_name == "Map":
-                        obj = Map(id, title, date, owner, place, hasAuthor)
-                    else:
-                        print(f"No class defined for type: {type_name}")
-                        continue
-
-                    # Append the instantiated object to the list
-                    objects_list.append(obj)
-                except ValueError as e:
-                    print(f"Error creating CulturalHeritageObject: {e}")
-
-            print("Objects list created:")
-            for obj in objects_list:
-                print(
-                    f"Object ID: {obj.id}, Title: {obj.title}, Type: {type(obj).__name__}"
-                )
-
-        return objects_list
-
-    def getAllActivities(self) -> List[Activity]:   /Ekaterina
-        all_activities = []
-        activities_df = pd.DataFrame()
-
-        if len(self.processQuery) > 0:
-            activities_df = self.processQuery[0].getAllActivities()
-            print("DataFrame returned from SQL query:")
-            print(activities_df)
-
-            for _, row in activities_df.iterrows():
-                activity_type = row["type"]
-                activity = None  # Initialize activity variable
-
-                # Convert necessary fields to strings
-                object_id = str(row["object_id"])
-                responsible_institute = str(row["responsible_institute"])
-                responsible_person = str(row["responsible_person"])
-                tool = str(row["tool"])
-                start_date = str(row["start_date"])
-                end_date = str(row["end_date"])
-
-                # Create CulturalHeritageObject instance
-                cultural_heritage_object = CulturalHeritageObject(
-                    object_id, "", "", "", ""
-                )
-
-                if activity_type == "Acquisition":
-                    technique = str(row["technique"])
-                    activity = Acquisition(
-                        cultural_heritage_object,
-                        responsible_institute,
-                        technique,
-                        responsible_person,
-                        start_date,
-                        end_date,
-                        tool,
-                    )
-                elif activity_type == "Processing":
-                    activity = Processing(
-                        cultural_heritage_object,
-                        responsible_institute,
-                        responsible_person,
-                        tool,
-                        start_date,
-                        end_date,
-                    )
-                elif activity_type == "Modelling":
-                    activity = Modelling(
-                        cultural_heritage_object,
-                        responsible_institute,
-                        responsible_person,
-                        tool,
-                        start_date,
-                        end_date,
-                    )
-                elif activity_type == "Optimising":
-                    activity = Optimising(
-                        cultural_heritage_object,
-                        responsible_institute,
-                        responsible_person,
-                        tool,
-                        start_date,
-                        end_date,
-                    )
-                elif activity_type == "Exporting":
-                    activity = Exporting(
-                        cultural_heritage_object,
-                        responsible_institute,
-                        responsible_person,
-                        tool,
-                        start_date,
-                        end_date,
-                    )
+        return self.objectList(
+            self.metadataFrame("getCulturalHeritageObjectsAuthoredBy", input_id)
+        )
 
-                if activity:
-                    all_activities.append(activity)
+    def loadObjects(self, object_ids: List[str]):
+        # Load the objects of activities into the identity map, in one
+        # batched query per metadata handler, when refersTo() first needs one
+        if self.metadataQuery:
+            self.objectList(self.metadataFrame("getCulturalHeritageObjectsByIds", object_ids))
 
-            print("Activities list created:")
-            for activity in all_activities:
-                print(
-                    f"Activity Type: {type(activity).__name__}, "
-                    f"Responsible Institute: {activity.institute}, "
-                    f"Responsible Person: {activity.person}, "
-                    f"Tool: {activity.tool}, "
-                    f"Start Date: {activity.start}, "
-                    f"End Date: {activity.end}"
-                )
+    def activityList(self, activities_df: pd.DataFrame) -> List[Activity]:
+        # The objects of the activities are taken from the identity map, or
+        # loaded when refersTo() is first called, see IdentityMap
+        return materialize_activities(activities_df, self.identity_map, self.quiet)
 
-        return all_activities
+    def getAllActivities(self) -> List[Activity]:   
+        return self.activityList(self.processFrame("getAllActivities"))
 
     def getActivitiesByResponsibleInstitution(
         self, institute_name: str
-    ) -> List[Activity]:   /Ekaterina
-        all_activities = []
-        activities_df = pd.DataFrame()
-
-        if len(self.processQuery) > 0:
-            activities_df = self.processQuery[0].getAllActivities()
-            print("DataFrame returned from SQL query:")
-            print(activities_df)
-
-            if "type" not in activities_df.columns:
-                print("Warning: 'type' column not found in the DataFrame.")
-                return all_activities
-
-            for _, row in activities_df.iterrows():
-                responsible_institute = str(row["responsible_institute"])
-
-                if institute_name.lower() in responsible_institute.lower():
-                    activity_type = row["type"]
-                    object_id = str(row["object_id"])
-                    responsible_person = str(row["responsible_person"])
-                    tool = str(row["tool"])
-                    start_date = str(row["start_date"])
-                    end_date = str(row["end_date"])
-
-                    cultural_heritage_object = CulturalHeritageObject(
-                        object_id, "", "", "", ""
-                    )
-
-                    activity = None  # Initialize activity variable
-                    if activity_type == "Acquisition":
-                        technique = str(row["technique"])
-                        activity = Acquisition(
-                            cultural_heritage_object,
-                            responsible_institute,
-                            technique,
-                            responsible_person,
-                            start_date,
-                            end_date,
-                            tool,
-                        )
-                    elif activity_type == "Processing":
-                        activity = Processing(
-                            cultural_heritage_object,
-                            responsible_institute,
-                            responsible_person,
-                            tool,
-                            start_date,
-                            end_date,
-                        )
-                    elif activity_type == "Modelling":
-                        activity = Modelling(
-                            cultural_heritage_object,
-                            responsible_institute,
-                            responsible_person,
-                            tool,
-                            start_date,
-                            end_date,
-                        )
-                    elif activity_type == "Optimising":
-                        activity = Optimising(
-                            cultural_heritage_object,
-                            responsible_institute,
-                            responsible_person,
-                            tool,
-                            start_date,
-                            end_date,
-                        )
-                    elif activity_type == "Exporting":
-                        activity = Exporting(
-                            cultural_heritage_object,
-                            responsible_institute,
-                            responsible_person,
-                            tool,
-                            start_date,
-                            end_date,
-                        )
-
-                    if activity:
-                        all_activities.append(activity)
-
-            print("Activities list created:")
-            for activity in all_activities:
-                print(
-                    f"Activity Type: {type(activity).__name__}, "
-                    f"Responsible Institute: {activity.institute}, "
-                    f"Responsible Person: {activity.person}, "
-                    f"Tool: {activity.tool}, "
-                    f"Start Date: {activity.start}, "
-                    f"End Date: {activity.end}"
-                )
-
-        return all_activities
+    ) -> List[Activity]:   
+        # The handler matches the name in SQL and only returns those rows
+        return self.activityList(
+            self.processFrame("getActivitiesByResponsibleInstitution", institute_name)
+        )
 
     def getActivitiesByResponsiblePerson(
         self, person_name: str
-    ) -> List[Activity]:   /Ekaterina
-        all_activities = []
-        activities_df = pd.DataFrame()
-
-        if len(self.processQuery) > 0:
-            activities_df = self.processQuery[0].getAllActivities()
-            print("DataFrame returned from SQL query:")
-            print(activities_df)
-
-            if "type" not in activities_df.columns:
-                print("Warning: 'type' column not found in the DataFrame.")
-                return all_activities
-
-            for _, row in activities_df.iterrows():
-                responsible_person = str(row["responsible_person"])
-
-                if person_name.lower() in responsible_person.lower():
-                    activity_type = row["type"]
-                    object_id = str(row["object_id"])
-                    responsible_institute = str(row["responsible_institute"])
-                    tool = str(row["tool"])
-                    start_date = str(row["start_date"])
-                    end_date = str(row["end_date"])
-
-                    cultural_heritage_object = CulturalHeritageObject(
-                        object_id, "", "", "", ""
-                    )
-
-                    activity = None
-                    if activity_type == "Acquisition":
-                        technique = str(row["technique"])
-                        activity = Acquisition(
-                            cultural_heritage_object,
-                            responsible_institute,
-                            technique,
-                            responsible_person,
-                            start_date,
-                            end_date,
-                            tool,
-                        )
-                    elif activity_type == "Processing":
-                        activity = Processing(
-                            cultural_heritage_object,
-                            responsible_institute,
-                            responsible_person,
-                            tool,
-                            start_date,
-                            end_date,
-                        )
-                    elif activity_type == "Modelling":
-                        activity = Modelling(
-                            cultural_heritage_object,
-                            responsible_institute,
-                            responsible_person,
-                            tool,
-                            start_date,
-                            end_date,
-                        )
-                    elif activity_type == "Optimising":
-                        activity = Optimising(
-                            cultural_heritage_object,
-                            responsible_institute,
-                            responsible_person,
-                            tool,
-                            start_date,
-                            end_date,
-                        )
-                    elif activity_type == "Exporting":
-                        activity = Exporting(
-                            cultural_heritage_object,
-                            responsible_institute,
-                            responsible_person,
-                            tool,
-                            start_date,
-                            end_date,
-                        )
-
-                    if activity:
-                        all_activities.append(activity)
-
-            print("Activities list created:")
-            for activity in all_activities:
-                print(
-                    f"Activity Type: {type(activity).__name__}, "
-                    f"Responsible Institute: {activity.institute}, "
-                    f"Responsible Person: {activity.person}, "
-                    f"Tool: {activity.tool}, "
-                    f"Start Date: {activity.start}, "
-                    f"End Date: {activity.end}"
-                )
-
-        return all_activities
-
-    def getActivitiesUsingTool(self, tool_name: str) -> List[Activity]:   /Ekaterina
-        all_activities = []
-        activities_df = pd.DataFrame()
-
-        if len(self.processQuery) > 0:
-            activities_df = self.processQuery[0].getAllActivities()
-            print("DataFrame returned from SQL query:")
-            print(activities_df)
-
-            # Check if 'type' column exists
-            if "type" not in activities_df.columns:
-                print("Warning: 'type' column not found in the DataFrame.")
-                return all_activities
-
-            for _, row in activities_df.iterrows():
-                tool = str(row["tool"])
-
-                if tool_name.lower() in tool.lower():
-                    activity_type = row["type"]
-                    object_id = str(row["object_id"])
-                    responsible_person = str(row["responsible_person"])
-                    responsible_institute = str(row["responsible_institute"])
-                    start_date = str(row["start_date"])
-                    end_date = str(row["end_date"])
-
-                    cultural_heritage_object = CulturalHeritageObject(
-                        object_id, "", "", "", ""
-                    )
-
-                    activity = None
-                    if activity_type == "Acquisition":
-                        technique = str(row["technique"])
-                        activity = Acquisition(
-                            cultural_heritage_object,
-                            responsible_institute,
-                            technique,
-                            responsible_person,
-                            start_date,
-                            end_date,
-                            tool,
-                        )
-                    elif activity_type == "Processing":
-                        activity = Processing(
-                            cultural_heritage_object,
-                            responsible_institute,
-                            responsible_person,
-                            tool,
-                            start_date,
-                            end_date,
-                        )
-                    elif activity_type == "Modelling":
-                        activity = Modelling(
-                            cultural_heritage_object,
-                            responsible_institute,
-                            responsible_person,
-                            tool,
-                            start_date,
-                            end_date,
-                        )
-                    elif activity_type == "Optimising":
-                        activity = Optimising(
-                            cultural_heritage_object,
-                            responsible_institute,
-                            responsible_person,
-                            tool,
-                            start_date,
-                            end_date,
-                        )
-                    elif activity_type == "Exporting":
-                        activity = Exporting(
-                            cultural_heritage_object,
-                            responsible_institute,
-                            responsible_person,
-                            tool,
-                            start_date,
-                            end_date,
-                        )
-
-                    if activity:
-                        all_activities.append(activity)
-
-            print("Activities list created:")
-            for activity in all_activities:
-                print(
-                    f"Activity Type: {type(activity).__name__}, "
-                    f"Responsible Institute: {activity.institute}, "
-                    f"Responsible Person: {activity.person}, "
-                    f"Tool: {activity.tool}, "
-                    f"Start Date: {activity.start}, "
-                    f"End Date: {activity.end}"
-                )
+    ) -> List[Activity]:   
+        return self.activityList(
+            self.processFrame("getActivitiesByResponsiblePerson", person_name)
+        )
 
-        return all_activities
+    def getActivitiesUsingTool(self, tool_name: str) -> List[Activity]:   
+        return self.activityList(self.processFrame("getActivitiesUsingTool", tool_name))
 
     def getActivitiesStartedAfter(
         self, date: str
-    ) -> List[Activity]:   /Ekaterina
-        all_activities = []
-        activities_df = pd.DataFrame()
-
-        if len(self.processQuery) > 0:
-            activities_df = self.processQuery[0].getActivitiesStartedAfter(date)
-            print("DataFrame returned from SQL query:")
-            print(activities_df)
-
-            if "type" not in activities_df.columns:
-                print("Warning: 'type' column not found in the DataFrame.")
-                return all_activities
-
-            for index, row in activities_df.iterrows():
-                activity_type = row["type"]
-                object_id = str(row["object_id"])
-                tool = str(row["tool"])
-                responsible_person = str(row["responsible_person"])
-                responsible_institute = str(row["responsible_institute"])
-                start_date = str(row["start_date"])
-                end_date = str(row["end_date"])
-
-                cultural_heritage_object = CulturalHeritageObject(
-                    object_id, "", "", "", ""
-                )
+    ) -> List[Activity]:   
+        return self.activityList(self.processFrame("getActivitiesStartedAfter", date))
+
+    def getActivitiesEndedBefore(self, date: str) -> List[Activity]:   
+        return self.activityList(self.processFrame("getActivitiesEndedBefore", date))
+
+    def getAcquisitionsByTechnique(self, technique: str):   
+        activities_df = self.processFrame("getAcquisitionsByTechnique", technique)
+        return [
+            activity
+            for activity in self.activityList(activities_df)
+            if isinstance(activity, Acquisition)
+        ]
 
-                activity = None
-                if activity_type == "Acquisition":
-                    technique = str(row["technique"])
-                    activity = Acquisition(
-                        cultural_heritage_object,
-                        responsible_institute,
-                        technique,
-                        responsible_person,
-                        start_date,
-                        end_date,
-                        tool,
-                    )
-                elif activity_type == "Processing":
-                    activity = Processing(
-                        cultural_heritage_object,
-                        responsible_institute,
-                        responsible_person,
-                        tool,
-                        start_date,
-                        end_date,
-                    )
-                elif activity_type == "Modelling":
-                    activity = Modelling(
-                        cultural_heritage_object,
-                        responsible_institute,
-                        responsible_person,
-                        tool,
-                        start_date,
-                        end_date,
-                    )
-                elif activity_type == "Optimising":
-                    activity = Optimising(
-                        cultural_heritage_object,
-                        responsible_institute,
-                        responsible_person,
-                        tool,
-                        start_date,
-                        end_date,
-                    )
-                elif activity_type == "Exporting":
-                    activity = Exporting(
-                        cultural_heritage_object,
-                        responsible_institute,
-                        responsible_person,
-                        tool,
-                        start_date,
-                        end_date,
-                    )
 
-                if activity:
-                    all_activities.append(activity)
+class AdvancedMashup(BasicMashup):
+    def __init__(self, metadataQuery=None, processQuery=None, quiet=True):
+        super().__init__(metadataQuery, processQuery, quiet)
+        
+    def getActivitiesOnObjectsAuthoredBy(
+        self, author_id: str
+    ) -> list[Activity]:   
+        # The objects are loaded first, so the activities refer to them, and
+        # only their activities are selected from the process handlers
+        objects = self.getCulturalHeritageObjectsAuthoredBy(author_id)
+        object_ids = sorted({obj.id for obj in objects if obj.id is not None})
+        if not object_ids:
+            return []
+        return self.activityList(self.processFrame("getActivitiesOnObjects", object_ids))
+
+    def objectsHandledBy(self, method: str, column: str, name: str) -> List[CulturalHeritageObject]:
+        # The objects with an activity returned by the process method, joined
+        # with the catalog of the metadata handlers, or with the catalog
+        # mirror in SQL on the activity column
+        if self.catalog_db is not None:
+            objects = self.objectList(
+                self.catalogFrame("getCatalogObjectsHandledBy", column, name)
+            )
+        else:
+            activities_df = self.processFrame(method, name)
+            if activities_df.empty:
+                return []
+            objects = join_objects(
+                activities_df,
+                self.metadataFrame("getAllCulturalHeritageObjects"),
+                self.identity_map,
+            )
 
-            print("Activities list created:")
-            for activity in all_activities:
+        if not self.quiet:
+            print("Cultural Heritage Objects list created:")
+            for obj in objects:
                 print(
-                    f"Activity Type: {type(activity).__name__}, "
-                    f"Responsible Institute: {activity.institute}, "
-                    f"Responsible Person: {activity.person}, "
-                    f"Tool: {activity.tool}, "
-                    f"Start Date: {activity.start}, "
-                    f"End Date: {activity.end}"
-                )
-
-        return all_activities
-
-    def getActivitiesEndedBefore(self, date: str) -> List[Activity]:   /Ekaterina
-        all_activities = []
-        activities_df = pd.DataFrame()
-
-        if len(self.processQuery) > 0:
-            activities_df = self.processQuery[0].getActivitiesEndedBefore(date)
-            print("DataFrame returned from SQL query:")
-            print(activities_df)
-
-            if "type" not in activities_df.columns:
-                print("Warning: 'type' column not found in the DataFrame.")
-                return all_activities
-
-            for index, row in activities_df.iterrows():
-                activity_type = row["type"]
-                object_id = str(row["object_id"])
-                tool = str(row["tool"])
-                responsible_person = str(row["responsible_person"])
-                responsible_institute = str(row["responsible_institute"])
-                start_date = str(row["start_date"])
-                end_date = str(row["end_date"])
-
-                cultural_heritage_object = CulturalHeritageObject(
-                    object_id, "", "", "", ""
+                    f"Object ID: {obj.id}, Title: {obj.title}, Type: {type(obj).__name__}"
                 )
+        return objects
 
-                activity = None
-                if activity_type == "Acquisition":
-                    technique = str(row["technique"])
-                    activity = Acquisition(
-                        cultural_heritage_object,
-                        responsible_institute,
-                        technique,
-                        responsible_person,
-                        start_date,
-                        end_date,
-                        tool,
-                    )
-                elif activity_type == "Processing":
-                    activity = Processing(
-                        cultural_heritage_object,
-                        responsible_institute,
-                        responsible_person,
-                        tool,
-                        start_date,
-                        end_date,
-                    )
-                elif activity_type == "Modelling":
-                    activity = Modelling(
-                        cultural_heritage_object,
-                        responsible_institute,
-                        responsible_person,
-                        tool,
-                        start_date,
-                        end_date,
-                    )
-                elif activity_type == "Optimising":
-                    activity = Optimising(
-                        cultural_heritage_object,
-                        responsible_institute,
-                        responsible_person,
-                        tool,
-                        start_date,
-                        end_date,
-                    )
-                elif activity_type == "Exporting":
-                    activity = Exporting(
-                        cultural_heritage_object,
-                        responsible_institute,
-                        responsible_person,
-                        tool,
-                        start_date,
-                        end_date,
-                    )
+    def getObjectsHandledByResponsiblePerson(
+        self, responsible_person: str
+    ) -> List[CulturalHeritageObject]:   
+        return self.objectsHandledBy("getActivitiesByResponsiblePerson", "responsible_person", responsible_person)
 
-                if activity:
-                    all_activities.append(activity)
+    def getObjectsHandledByResponsibleInstitution(
+        self, institute_name: str
+    ) -> List[CulturalHeritageObject]:   
+        return self.objectsHandledBy("getActivitiesByResponsibleInstitution", "responsible_institute", institute_name)
 
-            print("Activities list created:")
-            for activity in all_activities:
-                print(
-                    f"Activity Type: {type(activity).__name__}, "
-                    f"Responsible Institute: {activity.institute}, "
-                    f"Responsible Person: {activity.person}, "
-                    f"Tool: {activity.tool}, "
-                    f"Start Date: {activity.start}, "
-                    f"End Date: {activity.end}"
+    def getAuthorsOfObjectsAcquiredInTimeFrame(
+        self, start_date: str, end_date: str
+    ) -> list[Person]:   
+        # Objects acquired after start_date and exported before end_date. With
+        # sharded process data the acquisition and the export of an object
+        # may be in different databases, so they are joined here instead.
+        if self.catalog_db is not None and len(self.processQuery) == 1:
+            return self.personList(
+                self.catalogFrame(
+                    "getCatalogAuthorsOfObjectsAcquiredInTimeFrame",
+                    start_date,
+                    end_date,
+                    keys=["id"],
                 )
+            )
+        activities_started = self.processFrame("getActivitiesStartedAfter", start_date)
+        activities_ended = self.processFrame("getActivitiesEndedBefore", end_date)
+        object_ids = object_ids_of_type(activities_started, "Acquisition") & object_ids_of_type(
+            activities_ended, "Exporting"
+        )
+        if not self.quiet:
+            print("IDs of this timeframe:", sorted(object_ids))
+        if not object_ids:
+            return []
+
+        # The authors of all of them come from one batched query per handler,
+        # or from the catalog mirror
+        if self.catalog_db is not None:
+            authors_df = CatalogMirror(self.catalog_db).authors_of(sorted(object_ids))
+        else:
+            authors_df = self.metadataFrame(
+                "getAuthorsOfCulturalHeritageObjects", sorted(object_ids), keys=["id"]
+            )
+        return self.personList(authors_df)
+
+
+class AsyncBasicMashup(BasicMashup):
+    # BasicMashup for asyncio applications: the methods are coroutines that
+    # query all the handlers concurrently on the event loop. Handlers with
+    # blocking methods are run in worker threads.
+    def checkHandler(self, handler):
+        # Blocking and async handlers are both accepted
+        pass
+
+    async def fanOut(self, handlers: list, method: str, *args) -> List[pd.DataFrame]:
+        deadline = time.monotonic() + self.handler_timeout
+
+        async def call(handler):
+            # Each call runs in its own task, and the worker threads it uses
+            # inherit the deadline set in the task's context
+            CALL_DEADLINE.set(deadline)
+            function = getattr(handler, method)
+            if asyncio.iscoroutinefunction(function):
+                return await function(*args)
+            return await asyncio.to_thread(function, *args)
+
+        results = await asyncio.gather(
+            *(asyncio.wait_for(call(handler), self.handler_timeout) for handler in handlers),
+            return_exceptions=True,
+        )
+        frames = []
+        for handler, result in zip(handlers, results):
+            if isinstance(result, asyncio.TimeoutError):
+                print(f"{type(handler).__name__}.{method} timed out after {self.handler_timeout}s.")
+            elif isinstance(result, Exception):
+                print(f"{type(handler).__name__}.{method} failed:", result)
+            else:
+                frames.append(result)
+        return frames
+
+    def loadObjects(self, object_ids: List[str]):
+        # refersTo() is not a coroutine, so the objects it needs are loaded
+        # with the blocking handlers the async ones wrap
+        handlers = [
+            handler.handler if isinstance(handler, AsyncMetadataQueryHandler) else handler
+            for handler in self.metadataQuery
+        ]
+        if handlers:
+            self.objectList(
+                merge_frames(BasicMashup.fanOut(self, handlers, "getCulturalHeritageObjectsByIds", object_ids))
+            )
 
-        return all_activities
+    async def activityList(self, activities_df: pd.DataFrame) -> List[Activity]:
+        return materialize_activities(activities_df, self.identity_map, self.quiet)
 
-    def getAcquisitionsByTechnique(self, technique: str):   /Ekaterina
-        all_activities = []
-        activities_df = pd.DataFrame()
+    async def metadataFrame(self, method: str, *args, keys: Optional[List[str]] = None) -> pd.DataFrame:
+        return merge_frames(await self.fanOut(self.metadataQuery, method, *args), keys)
 
-        if len(self.processQuery) > 0:
-            activities_df = self.processQuery[0].getAcquisitionsByTechnique(technique)
-            print("DataFrame returned from SQL query:")
-            print(activities_df)
+    async def processFrame(self, method: str, *args) -> pd.DataFrame:
+        return merge_frames(await self.fanOut(self.processQuery, method, *args), ["object_id", "type"])
 
-            if "type" not in activities_df.columns:
-                print("Warning: 'type' column not found in the DataFrame.")
-                return all_activities
+    async def catalogFrame(self, method: str, *args, keys: Optional[List[str]] = None) -> pd.DataFrame:
+        return merge_frames(
+            await self.fanOut(self.processQuery, method, self.catalog_db, *args), keys
+        )
 
-            for index, row in activities_df.iterrows():
-                activity_type = row["type"]
-                object_id = str(row["object_id"])
-                tool = str(row["tool"])
-                responsible_person = str(row["responsible_person"])
-                responsible_institute = str(row["responsible_institute"])
-                start_date = str(row["start_date"])
-                end_date = str(row["end_date"])
+    async def getEntityById(self, id: str) -> IdentifiableEntity | None:
+        people_df = await self.metadataFrame("getById", id, keys=["identifier"])
+        return self.personList(people_df, "identifier", "Entity found by Id:") or None
 
-                cultural_heritage_object = CulturalHeritageObject(
-                    object_id, "", "", "", ""
-                )
+    async def getAllPeople(self) -> List[Person]:
+        return self.personList(await self.metadataFrame("getAllPeople", keys=["id"]))
 
-                activity = None
-                if activity_type == "Acquisition":
-                    technique = str(row["technique"])
-                    activity = Acquisition(
-                        cultural_heritage_object,
-                        responsible_institute,
-                        technique,
-                        responsible_person,
-                        start_date,
-                        end_date,
-                        tool,
-                    )
+    async def getAllCulturalHeritageObjects(self) -> List[CulturalHeritageObject]:
+        return self.objectList(await self.metadataFrame("getAllCulturalHeritageObjects"))
 
-                if activity:
-                    all_activities.append(activity)
+    async def getAuthorsOfCulturalHeritageObject(self, object_id: str) -> List[Person]:
+        return self.personList(
+            await self.metadataFrame("getAuthorsOfCulturalHeritageObject", object_id, keys=["id"])
+        )
 
-            print("Activities list created:")
-            for activity in all_activities:
-                print(
-                    f"Activity Type: {type(activity).__name__}, "
-                    f"Responsible Institute: {activity.institute}, "
-                    f"Responsible Person: {activity.person}, "
-                    f"Tool: {activity.tool}, "
-                    f"Start Date: {activity.start}, "
-                    f"End Date: {activity.end}"
-                )
+    async def getCulturalHeritageObjectsAuthoredBy(self, input_id: str) -> List[CulturalHeritageObject]:
+        return self.objectList(
+            await self.metadataFrame("getCulturalHeritageObjectsAuthoredBy", input_id)
+        )
 
-        return all_activities
+    async def getAllActivities(self) -> List[Activity]:
+        return await self.activityList(await self.processFrame("getAllActivities"))
 
+    async def getActivitiesByResponsibleInstitution(self, institute_name: str) -> List[Activity]:
+        return await self.activityList(
+            await self.processFrame("getActivitiesByResponsibleInstitution", institute_name)
+        )
 
-class AdvancedMashup(BasicMashup):
-    def __init__(self, metadataQuery=None, processQuery=None):
-        super().__init__(metadataQuery, processQuery)
-        
-    def getActivitiesOnObjectsAuthoredBy(
-        self, author_id: str
-    ) -> list[Activity]:   
-        related_cultural_heritage_objects = self.metadataQuery[0].getCulturalHeritageObjectsAuthoredBy(author_id)
+    async def getActivitiesByResponsiblePerson(self, person_name: str) -> List[Activity]:
+        return await self.activityList(
+            await self.processFrame("getActivitiesByResponsiblePerson", person_name)
+        )
 
-        related_ids = set(related_cultural_heritage_objects["id"])
-        print("Related IDs:", related_ids)
-        related_ids_str = {str(id) for id in related_ids}
+    async def getActivitiesUsingTool(self, tool_name: str) -> List[Activity]:
+        return await self.activityList(
+            await self.processFrame("getActivitiesUsingTool", tool_name)
+        )
 
-        all_activities = self.processQuery[0].getAllActivities()
-        # print(all_activities)
+    async def getActivitiesStartedAfter(self, date: str) -> List[Activity]:
+        return await self.activityList(
+            await self.processFrame("getActivitiesStartedAfter", date)
+        )
 
-        # Convert object_id column to string (if not already)
+    async def getActivitiesEndedBefore(self, date: str) -> List[Activity]:
+        return await self.activityList(
+            await self.processFrame("getActivitiesEndedBefore", date)
+        )
 
-        all_activities["object_id"] = all_activities["object_id"].astype(str)
-        selected_rows = all_activities[
-            all_activities["object_id"].isin(related_ids_str)
+    async def getAcquisitionsByTechnique(self, technique: str):
+        activities_df = await self.processFrame("getAcquisitionsByTechnique", technique)
+        return [
+            activity
+            for activity in await self.activityList(activities_df)
+            if isinstance(activity, Acquisition)
         ]
-        
-        # Convert selected_rows to a list of Activity objects
-        activities_list = [Activity(row) for index, row in selected_rows.iterrows()]
-        
-        return activities_list
 
-    def getObjectsHandledByResponsiblePerson(
-        self, responsible_person: str
-    ) -> List[CulturalHeritageObject]:   
-        all_objects = []
-        if len(self.processQuery) > 0:
-            activities_df = self.processQuery[0].getActivitiesByResponsiblePerson(
-                responsible_person
-            )
 
-            if len(self.metadataQuery) > 0:
-                objects_df = self.metadataQuery[0].getAllCulturalHeritageObjects()
-
-                object_ids = []
-                for index, row in activities_df.iterrows():
-                    activity_id = row["object_id"]
-                    if activity_id not in object_ids:
-                        object_ids.append(activity_id)
-                        object_data = objects_df[objects_df["id"] == activity_id].iloc[
-                            0
-                        ]
-                        object_type = object_data["type_name"]
-                        if object_type == "NauticalChart":
-                            obj = NauticalChart(
-                                id=str(object_data["id"]),
-                                title=object_data["title"],
-                                date=str(object_data["date"]),
-                                owner=str(object_data["owner"]),
-                                place=object_data["place"],
-                                author_id=(
-                                    str(object_data["author_id"])
-                                    if "author_id" in objects_df.columns
-                                    else None
-                                ),
-                                author_name=(
-                                    object_data["author_name"]
-                                    if "author_name" in objects_df.columns
-                                    else None
-                                ),
-                            )
-                        elif object_type == "ManuscriptPlate":
-                            obj = ManuscriptPlate(
-                                id=str(object_data["id"]),
-                                title=object_data["title"],
-                                date=str(object_data["date"]),
-                                owner=str(object_data["owner"]),
-                                place=object_data["place"],
-                                author_id=(
-                                    str(object_data["author_id"])
-                                    if "author_id" in objects_df.columns
-                                    else None
-                                ),
-                                author_name=(
-                                    object_data["author_name"]
-                                    if "author_name" in objects_df.columns
-                                    else None
-                                ),
-                            )
-                        elif object_type == "ManuscriptVolume":
-                            obj = ManuscriptVolume(
-                                id=str(object_data["id"]),
-                                title=object_data["title"],
-                                date=str(object_data["date"]),
-                                owner=str(object_data["owner"]),
-                                place=object_data["place"],
-                                author_id=(
-                                    str(object_data["author_id"])
-                                    if "author_id" in objects_df.columns
-                                    else None
-                                ),
-                                author_name=(
-                                    object_data["author_name"]
-                                    if "author_name" in objects_df.columns
-                                    else None
-                                ),
-                            )
-                        elif object_type == "PrintedVolume":
-                            obj = PrintedVolume(
-                                id=str(object_data["id"]),
-                                title=object_data["title"],
-                                date=str(object_data["date"]),
-                                owner=str(object_data["owner"]),
-                                place=object_data["place"],
-                                author_id=(
-                                    str(object_data["author_id"])
-                                    if "author_id" in objects_df.columns
-                                    else None
-                                ),
-                                author_name=(
-                                    object_data["author_name"]
-                                    if "author_name" in objects_df.columns
-                                    else None
-                                ),
-                            )
-                        elif object_type == "PrintedMaterial":
-                            obj = PrintedMaterial(
-                                id=str(object_data["id"]),
-                                title=object_data["title"],
-                                date=str(object_data["date"]),
-                                owner=str(object_data["owner"]),
-                                place=object_data["place"],
-                                author_id=(
-                                    str(object_data["author_id"])
-                                    if "author_id" in objects_df.columns
-                                    else None
-                                ),
-                                author_name=(
-                                    object_data["author_name"]
-                                    if "author_name" in objects_df.columns
-                                    else None
-                                ),
-                            )
-                        elif object_type == "Herbarium":
-                            obj = Herbarium(
-                                id=str(object_data["id"]),
-                                title=object_data["title"],
-                                date=str(object_data["date"]),
-                                owner=str(object_data["owner"]),
-                                place=object_data["place"],
-                                author_id=(
-                                    str(object_data["author_id"])
-                                    if "author_id" in objects_df.columns
-                                    else None
-                                ),
-                                author_name=(
-                                    object_data["author_name"]
-                                    if "author_name" in objects_df.columns
-                                    else None
-                                ),
-                            )
-                        elif object_type == "Specimen":
-                            obj = Specimen(
-                                id=str(object_data["id"]),
-                                title=object_data["title"],
-                                date=str(object_data["date"]),
-                                owner=str(object_data["owner"]),
-                                place=object_data["place"],
-                                author_id=(
-                                    str(object_data["author_id"])
-                                    if "author_id" in objects_df.columns
-                                    else None
-                                ),
-                                author_name=(
-                                    object_data["author_name"]
-                                    if "author_name" in objects_df.columns
-                                    else None
-                                ),
-                            )
-                        elif object_type == "Painting":
-                            obj = Painting(
-                                id=str(object_data["id"]),
-                                title=object_data["title"],
-                                date=str(object_data["date"]),
-                                owner=str(object_data["owner"]),
-                                place=object_data["place"],
-                                author_id=(
-                                    str(object_data["author_id"])
-                                    if "author_id" in objects_df.columns
-                                    else None
-                                ),
-                                author_name=(
-                                    object_data["author_name"]
-                                    if "author_name" in objects_df.columns
-                                    else None
-                                ),
-                            )
-                        elif object_type == "Model":
-                            obj = Model(
-                                id=str(object_data["id"]),
-                                title=object_data["title"],
-                                date=str(object_data["date"]),
-                                owner=str(object_data["owner"]),
-                                place=object_data["place"],
-                                author_id=str(object_data["author_id"]),
-                                author_name=object_data["author_name"],
-                            )
-                        elif object_type == "Model":
-                            obj = Model(
-                                id=str(object_data["id"]),
-                                title=object_data["title"],
-                                date=str(object_data["date"]),
-                                owner=str(object_data["owner"]),
-                                place=object_data["place"],
-                                author_id=(
-                                    str(object_data["author_id"])
-                                    if "author_id" in objects_df.columns
-                                    else None
-                                ),
-                                author_name=(
-                                    object_data["author_name"]
-                                    if "author_name" in objects_df.columns
-                                    else None
-                                ),
-                            )
-                        elif object_type == "Map":
-                            obj = Map(
-                                id=str(object_data["id"]),
-                                title=object_data["title"],
-                                date=str(object_data["date"]),
-                                owner=str(object_data["owner"]),
-                                place=object_data["place"],
-                                author_id=(
-                                    str(object_data["author_id"])
-                                    if "author_id" in objects_df.columns
-                                    else None
-                                ),
-                                author_name=(
-                                    object_data["author_name"]
-                                    if "author_name" in objects_df.columns
-                                    else None
-                                ),
-                            )
-                        else:
-                            print(f"No class defined for type: {object_type}")
-                            continue
-
-                    all_objects.append(obj)
-
-        print("Cultural Heritage Objects list created:")
-        for obj in all_objects:
-            print(
-                f"Object ID: {obj.id}, Title: {obj.title}, Type: {type(obj).__name__}"
-            )
-
-        return all_objects
-
-    def getObjectsHandledByResponsibleInstitution(
-        self, institute_name: str
-    ) -> List[CulturalHeritageObject]:   
-        all_objects = []
-        activities_df = pd.DataFrame()
+class AsyncAdvancedMashup(AsyncBasicMashup):
+    # AdvancedMashup for asyncio applications. The metadata and process
+    # queries of a method run concurrently, and the activities point to the
+    # loaded objects through the identity map.
+    async def getActivitiesOnObjectsAuthoredBy(self, author_id: str) -> List[Activity]:
+        objects = await self.getCulturalHeritageObjectsAuthoredBy(author_id)
+        object_ids = sorted({obj.id for obj in objects if obj.id is not None})
+        if not object_ids:
+            return []
+        return await self.activityList(
+            await self.processFrame("getActivitiesOnObjects", object_ids)
+        )
 
-        if len(self.processQuery) > 0:
-            activities_df = self.processQuery[0].getActivitiesByResponsibleInstitution(
-                institute_name
+    async def objectsHandledBy(
+        self, method: str, column: str, name: str
+    ) -> List[CulturalHeritageObject]:
+        # Same join as AdvancedMashup.objectsHandledBy, with both sides
+        # queried at once
+        if self.catalog_db is not None:
+            return self.objectList(
+                await self.catalogFrame("getCatalogObjectsHandledBy", column, name)
             )
+        activities_df, objects_df = await asyncio.gather(
+            self.processFrame(method, name),
+            self.metadataFrame("getAllCulturalHeritageObjects"),
+        )
+        return join_objects(activities_df, objects_df, self.identity_map)
 
-            if len(self.metadataQuery) > 0:
-                objects_df = self.metadataQuery[0].getAllCulturalHeritageObjects()
-
-                object_ids = []
-                for _, row in activities_df.iterrows():
-                    activity_id = row["object_id"]
-                    if activity_id not in object_ids:
-                        object_ids.append(activity_id)
-                        object_data = objects_df[objects_df["id"] == activity_id].iloc[
-                            0
-                        ]
-                        object_type = object_data["type_name"]
-                        if object_type == "NauticalChart":
-                            obj = NauticalChart(
-                                id=str(object_data["id"]),
-                                title=object_data["title"],
-                                date=str(object_data["date"]),
-                                owner=str(object_data["owner"]),
-                                place=object_data["place"],
-                                author_id=(
-                                    str(object_data["author_id"])
-                                    if "author_id" in objects_df.columns
-                                    else None
-                                ),
-                                author_name=(
-                                    object_data["author_name"]
-                                    if "author_name" in objects_df.columns
-                                    else None
-                                ),
-                            )
-                        elif object_type == "ManuscriptPlate":
-                            obj = ManuscriptPlate(
-                                id=str(object_data["id"]),
-                                title=object_data["title"],
-                                date=str(object_data["date"]),
-                                owner=str(object_data["owner"]),
-                                place=object_data["place"],
-                                author_id=(
-                                    str(object_data["author_id"])
-                                    if "author_id" in objects_df.columns
-                                    else None
-                                ),
-                                author_name=(
-                                    object_data["author_name"]
-                                    if "author_name" in objects_df.columns
-                                    else None
-                                ),
-                            )
-                        elif object_type == "ManuscriptVolume":
-                            obj = ManuscriptVolume(
-                                id=str(object_data["id"]),
-                                title=object_data["title"],
-                                date=str(object_data["date"]),
-                                owner=str(object_data["owner"]),
-                                place=object_data["place"],
-                                author_id=(
-                                    str(object_data["author_id"])
-                                    if "author_id" in objects_df.columns
-                                    else None
-                                ),
-                                author_name=(
-                                    object_data["author_name"]
-                                    if "author_name" in objects_df.columns
-                                    else None
-                                ),
-                            )
-                        elif object_type == "PrintedVolume":
-                            obj = PrintedVolume(
-                                id=str(object_data["id"]),
-                                title=object_data["title"],
-                                date=str(object_data["date"]),
-                                owner=str(object_data["owner"]),
-                                place=object_data["place"],
-                                author_id=(
-                                    str(object_data["author_id"])
-                                    if "author_id" in objects_df.columns
-                                    else None
-                                ),
-                                author_name=(
-                                    object_data["author_name"]
-                                    if "author_name" in objects_df.columns
-                                    else None
-                                ),
-                            )
-                        elif object_type == "PrintedMaterial":
-                            obj = PrintedMaterial(
-                                id=str(object_data["id"]),
-                                title=object_data["title"],
-                                date=str(object_data["date"]),
-                                owner=str(object_data["owner"]),
-                                place=object_data["place"],
-                                author_id=(
-                                    str(object_data["author_id"])
-                                    if "author_id" in objects_df.columns
-                                    else None
-                                ),
-                                author_name=(
-                                    object_data["author_name"]
-                                    if "author_name" in objects_df.columns
-                                    else None
-                                ),
-                            )
-                        elif object_type == "Herbarium":
-                            obj = Herbarium(
-                                id=str(object_data["id"]),
-                                title=object_data["title"],
-                                date=str(object_data["date"]),
-                                owner=str(object_data["owner"]),
-                                place=object_data["place"],
-                                author_id=(
-                                    str(object_data["author_id"])
-                                    if "author_id" in objects_df.columns
-                                    else None
-                                ),
-                                author_name=(
-                                    object_data["author_name"]
-                                    if "author_name" in objects_df.columns
-                                    else None
-                                ),
-                            )
-                        elif object_type == "Specimen":
-                            obj = Specimen(
-                                id=str(object_data["id"]),
-                                title=object_data["title"],
-                                date=str(object_data["date"]),
-                                owner=str(object_data["owner"]),
-                                place=object_data["place"],
-                                author_id=(
-                                    str(object_data["author_id"])
-                                    if "author_id" in objects_df.columns
-                                    else None
-                                ),
-                                author_name=(
-                                    object_data["author_name"]
-                                    if "author_name" in objects_df.columns
-                                    else None
-                                ),
-                            )
-                        elif object_type == "Painting":
-                            obj = Painting(
-                                id=str(object_data["id"]),
-                                title=object_data["title"],
-                                date=str(object_data["date"]),
-                                owner=str(object_data["owner"]),
-                                place=object_data["place"],
-                                author_id=(
-                                    str(object_data["author_id"])
-                                    if "author_id" in objects_df.columns
-                                    else None
-                                ),
-                                author_name=(
-                                    object_data["author_name"]
-                                    if "author_name" in objects_df.columns
-                                    else None
-                                ),
-                            )
-                        elif object_type == "Model":
-                            obj = Model(
-                                id=str(object_data["id"]),
-                                title=object_data["title"],
-                                date=str(object_data["date"]),
-                                owner=str(object_data["owner"]),
-                                place=object_data["place"],
-                                author_id=str(object_data["author_id"]),
-                                author_name=object_data["author_name"],
-                            )
-                        elif object_type == "Model":
-                            obj = Model(
-                                id=str(object_data["id"]),
-                                title=object_data["title"],
-                                date=str(object_data["date"]),
-                                owner=str(object_data["owner"]),
-                                place=object_data["place"],
-                                author_id=(
-                                    str(object_data["author_id"])
-                                    if "author_id" in objects_df.columns
-                                    else None
-                                ),
-                                author_name=(
-                                    object_data["author_name"]
-                                    if "author_name" in objects_df.columns
-                                    else None
-                                ),
-                            )
-                        elif object_type == "Map":
-                            obj = Map(
-                                id=str(object_data["id"]),
-                                title=object_data["title"],
-                                date=str(object_data["date"]),
-                                owner=str(object_data["owner"]),
-                                place=object_data["place"],
-                                author_id=(
-                                    str(object_data["author_id"])
-                                    if "author_id" in objects_df.columns
-                                    else None
-                                ),
-                                author_name=(
-                                    object_data["author_name"]
-                                    if "author_name" in objects_df.columns
-                                    else None
-                                ),
-                            )
-                        else:
-                            print(f"No class defined for type: {object_type}")
-                            continue
-
-                        all_objects.append(obj)
-
-        print("Cultural Heritage Objects list created:")
-        for obj in all_objects:
-            print(
-                f"Object ID: {obj.id}, Title: {obj.title}, Type: {type(obj).__name__}"
-            )
+    async def getObjectsHandledByResponsiblePerson(
+        self, responsible_person: str
+    ) -> List[CulturalHeritageObject]:
+        return await self.objectsHandledBy(
+            "getActivitiesByResponsiblePerson", "responsible_person", responsible_person
+        )
 
-        return all_objects
+    async def getObjectsHandledByResponsibleInstitution(
+        self, institute_name: str
+    ) -> List[CulturalHeritageObject]:
+        return await self.objectsHandledBy(
+            "getActivitiesByResponsibleInstitution", "responsible_institute", institute_name
+        )
 
-    def getAuthorsOfObjectsAcquiredInTimeFrame(
+    async def getAuthorsOfObjectsAcquiredInTimeFrame(
         self, start_date: str, end_date: str
-    ) -> list[Person]:   
-        acquired_authors = []
-
-        activities_started = self.processQuery[0].getActivitiesStartedAfter(start_date)
-        started_ids = set(
-            activities_started[activities_started["type"] == "Acquisition"]["object_id"]
+    ) -> List[Person]:
+        if self.catalog_db is not None and len(self.processQuery) == 1:
+            return self.personList(
+                await self.catalogFrame(
+                    "getCatalogAuthorsOfObjectsAcquiredInTimeFrame",
+                    start_date,
+                    end_date,
+                    keys=["id"],
+                )
+            )
+        activities_started, activities_ended = await asyncio.gather(
+            self.processFrame("getActivitiesStartedAfter", start_date),
+            self.processFrame("getActivitiesEndedBefore", end_date),
         )
-
-        activities_ended = self.processQuery[0].getActivitiesEndedBefore(end_date)
-        ended_ids = set(
-            activities_ended[activities_ended["type"] == "Exporting"]["object_id"]
+        object_ids = object_ids_of_type(activities_started, "Acquisition") & object_ids_of_type(
+            activities_ended, "Exporting"
         )
-
-        common_ids = started_ids.intersection(ended_ids)
-        common_ids_int = {int(id) for id in common_ids}
-        print("IDs of this timeframe:", common_ids_int)
-
-        for item in common_ids_int:
-            authors = self.getAuthorsOfCulturalHeritageObject(item)
-            acquired_authors.extend(authors)
-
-        return acquired_authors
+        if not object_ids:
+            return []
+        if self.catalog_db is not None:
+            authors_df = await asyncio.to_thread(
+                CatalogMirror(self.catalog_db).authors_of, sorted(object_ids)
+            )
+        else:
+            authors_df = await self.metadataFrame(
+                "getAuthorsOfCulturalHeritageObjects", sorted(object_ids), keys=["id"]
+            )
+        return self.personList(authors_df)
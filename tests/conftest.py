@@ -0,0 +1,102 @@
+import os
+import shutil
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def process_json(tmp_path):
+    # A copy of the repository's process.json that a test may change
+    path = tmp_path / "process.json"
+    shutil.copy(os.path.join(ROOT, "process.json"), path)
+    return str(path)
+
+
+class SPARQLStub(object):
+    # A SPARQL endpoint on localhost that records every request. The first
+    # `failures` requests are answered with 503, and every answer waits
+    # `delay` seconds.
+    def __init__(self):
+        self.requests = []
+        self.failures = 0
+        self.delay = 0
+        self.csv = "id,name\n"
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                stub.requests.append((self.headers.get("Content-Type"), body))
+                time.sleep(stub.delay)
+                if stub.failures > 0:
+                    stub.failures -= 1
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                if body.startswith(b"query=ASK"):
+                    data, content_type = b'{"head": {}, "boolean": true}', "application/sparql-results+json"
+                else:
+                    data, content_type = stub.csv.encode("utf-8"), "text/csv"
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            def handle_error(self, request, client_address):
+                # Clients that time out close the connection before the answer
+                pass
+
+        self.server = Server(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/sparql"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def updates(self):
+        return [body for content_type, body in self.requests if body.startswith(b"update=")]
+
+
+@pytest.fixture
+def sparql_stub():
+    stub = SPARQLStub()
+    yield stub
+    stub.server.shutdown()
+    stub.server.server_close()
+
+
+@pytest.fixture(scope="session")
+def catalog(tmp_path_factory):
+    # The repository's meta.csv in a local RDF store (store.nt) and in a
+    # SQLite mirror (catalog.db)
+    from impl import MetadataUploadHandler
+
+    directory = tmp_path_factory.mktemp("catalog")
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        MetadataUploadHandler(
+            endpoint=str(directory / "store.nt"), catalog_db=str(directory / "catalog.db")
+        )
+    finally:
+        os.chdir(cwd)
+    return directory
+
+
+@pytest.fixture(scope="session")
+def process_db(tmp_path_factory):
+    # The repository's process.json loaded in the default layout
+    from impl import ActivityLoader
+
+    db_file = str(tmp_path_factory.mktemp("process") / "json.db")
+    ActivityLoader(db_file).load_file(os.path.join(ROOT, "process.json"))
+    return db_file
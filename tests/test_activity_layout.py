@@ -0,0 +1,79 @@
+import json
+import os
+import sqlite3
+
+import pytest
+
+from impl import ActivityLoader, ProcessDataQueryHandler, ProcessDataUploadHandler, stored_layout
+
+
+def query_handler(db_file):
+    handler = ProcessDataQueryHandler()
+    handler.setDbPathOrUrl(db_file)
+    return handler
+
+
+def touch(path, seconds=10):
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + seconds))
+
+
+@pytest.mark.parametrize("first, second", [("tables", "activity"), ("activity", "tables")])
+def test_switching_layout_keeps_the_activities(tmp_path, process_json, first, second):
+    db_file = str(tmp_path / "json.db")
+    ActivityLoader(db_file, layout=first).load_file(process_json)
+    before = query_handler(db_file).getAllActivities()
+    found_before = query_handler(db_file).getActivitiesByResponsiblePerson("Jane")
+
+    # The file has not changed, so only the layout is switched
+    assert ActivityLoader(db_file, layout=second).load_file(process_json) == 0
+    handler = query_handler(db_file)
+    assert stored_layout(handler.getConnection()) == second
+    after = handler.getAllActivities()
+    assert len(after) == len(before) == 175
+    columns = ["object_id", "type"]
+    assert after.sort_values(columns)[columns].values.tolist() == before.sort_values(columns)[columns].values.tolist()
+    assert len(handler.getActivitiesByResponsiblePerson("Jane")) == len(found_before) > 0
+
+
+def test_switching_layout_after_the_file_changed(tmp_path, process_json):
+    db_file = str(tmp_path / "json.db")
+    ActivityLoader(db_file, layout="tables").load_file(process_json)
+    with open(process_json) as f:
+        data = json.load(f)
+    data[0]["acquisition"]["responsible person"] = "Zyx Qwerty"
+    with open(process_json, "w") as f:
+        json.dump(data, f)
+    touch(process_json)
+
+    assert ActivityLoader(db_file, layout="activity").load_file(process_json) > 0
+    found = query_handler(db_file).getActivitiesByResponsiblePerson("qwerty")
+    assert found[["object_id", "type"]].values.tolist() == [[data[0]["object id"], "Acquisition"]]
+
+
+def test_leftover_empty_unified_table_is_not_queried(tmp_path, process_json):
+    # Databases loaded before the layout was recorded may hold an empty
+    # activity table next to the per-type tables
+    db_file = str(tmp_path / "json.db")
+    ActivityLoader(db_file, layout="tables").load_file(process_json)
+    writable = sqlite3.connect(db_file)
+    writable.execute("DROP TABLE activity_layout")
+    writable.execute("CREATE TABLE activity (object_id TEXT, type TEXT)")
+    writable.commit()
+    writable.close()
+    assert stored_layout(query_handler(db_file).getConnection()) == "tables"
+    assert len(query_handler(db_file).getAllActivities()) == 175
+
+
+def test_uploads_use_the_layout_of_the_handler(tmp_path, monkeypatch, process_json):
+    monkeypatch.chdir(tmp_path)
+    handler = ProcessDataUploadHandler(layout="activity")
+    db_file = str(tmp_path / "uploaded.db")
+    handler.setDbPathOrUrl(db_file)
+    assert handler.pushDataToDb(process_json)
+    conn = sqlite3.connect(db_file)
+    try:
+        assert stored_layout(conn) == "activity"
+    finally:
+        conn.close()
+    assert len(query_handler(db_file).getAllActivities()) == 175
@@ -0,0 +1,135 @@
+import json
+import os
+import sqlite3
+
+import pytest
+
+import impl
+from impl import ActivityLoader, ProcessDataUploadHandler
+
+
+def rewrite(path, data):
+    stat = os.stat(path)
+    with open(path, "w") as f:
+        json.dump(data, f)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+
+
+def count(db_file, table="Acquisition"):
+    with sqlite3.connect(db_file) as conn:
+        return conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+
+
+def test_reloading_the_same_data_changes_nothing(tmp_path, process_json):
+    db_file = str(tmp_path / "json.db")
+    loader = ActivityLoader(db_file)
+    assert loader.load_file(process_json) == 175
+    # Unchanged file: skipped
+    assert loader.load_file(process_json) == 0
+    # Changed mtime, same content: nothing rewritten
+    with open(process_json) as f:
+        rewrite(process_json, json.load(f))
+    assert loader.load_file(process_json) == 0
+    assert count(db_file) == 35
+
+
+def test_reload_updates_changed_rows(tmp_path, process_json):
+    db_file = str(tmp_path / "json.db")
+    ActivityLoader(db_file).load_file(process_json)
+    with open(process_json) as f:
+        data = json.load(f)
+    data[3]["exporting"]["end date"] = "2099-01-01"
+    rewrite(process_json, data)
+    assert ActivityLoader(db_file).load_file(process_json) == 1
+    with sqlite3.connect(db_file) as conn:
+        assert conn.execute(
+            "SELECT end_date FROM Exporting WHERE object_id = ?", (data[3]["object id"],)
+        ).fetchone() == ("2099-01-01",)
+
+
+def test_reload_removes_objects_missing_from_the_file(tmp_path, process_json):
+    for layout, table, rows in [("tables", "Acquisition", 34), ("activity", "activity", 170)]:
+        db_file = str(tmp_path / f"{layout}.db")
+        with open(process_json) as f:
+            data = json.load(f)
+        ActivityLoader(db_file, layout=layout).load_file(process_json)
+        removed = data.pop(0)
+        rewrite(process_json, data)
+
+        assert ActivityLoader(db_file, layout=layout).load_file(process_json) == 5
+        assert count(db_file, table) == rows
+        with sqlite3.connect(db_file) as conn:
+            # The search index no longer holds the removed rows
+            conn.execute(f"INSERT INTO {table}_search ({table}_search, rank) VALUES ('integrity-check', 1)")
+        data.insert(0, removed)
+        rewrite(process_json, data)
+
+
+def split_files(tmp_path, process_json):
+    with open(process_json) as f:
+        data = json.load(f)
+    first, second = tmp_path / "a.json", tmp_path / "b.json"
+    first.write_text(json.dumps(data[:20]))
+    second.write_text(json.dumps(data[20:]))
+    return str(first), str(second)
+
+
+def test_loading_another_file_keeps_the_objects_of_the_first(tmp_path, process_json):
+    db_file = str(tmp_path / "json.db")
+    first, second = split_files(tmp_path, process_json)
+    loader = ActivityLoader(db_file)
+    loader.load_file(first)
+    loader.load_file(second)
+    # Unchanged: skipped, and nothing was lost by the other load
+    assert loader.load_file(first) == 0
+    assert count(db_file) == 35
+
+    # Objects dropped from a file are removed, those of the other file kept
+    with open(first) as f:
+        data = json.load(f)
+    rewrite(first, data[1:])
+    assert loader.load_file(first) == 5
+    assert count(db_file) == 34
+
+
+def test_an_object_moved_to_another_file_is_kept(tmp_path, process_json):
+    db_file = str(tmp_path / "json.db")
+    first, second = split_files(tmp_path, process_json)
+    loader = ActivityLoader(db_file)
+    loader.load_file(first)
+    with open(first) as f:
+        data = json.load(f)
+    with open(second) as f:
+        rewrite(second, json.load(f) + data[:1])
+    rewrite(first, data[1:])
+    loader.load_file(second)
+    loader.load_file(first)
+    assert count(db_file) == 35
+
+
+def test_upload_handlers_add_to_the_database(tmp_path, monkeypatch, process_json):
+    monkeypatch.chdir(tmp_path)
+    first, second = split_files(tmp_path, process_json)
+    handler = ProcessDataUploadHandler()
+    db_file = str(tmp_path / "uploaded.db")
+    handler.setDbPathOrUrl(db_file)
+    handler.pushDataToDb(first)
+    handler.pushDataToDb(second)
+    assert count(db_file) == 35
+
+
+def test_missing_file_is_reported(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(impl, "find_file", lambda filename: None)
+    ProcessDataUploadHandler()
+    assert "JSON file not found" in capsys.readouterr().out
+
+
+def test_malformed_data_is_not_reported_as_missing(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    path = tmp_path / "process.json"
+    path.write_text("[1, 2]")
+    monkeypatch.setattr(impl, "find_file", lambda filename: str(path))
+    with pytest.raises(TypeError):
+        ProcessDataUploadHandler()
+    assert "not found" not in capsys.readouterr().out
@@ -0,0 +1,129 @@
+import json
+import sqlite3
+
+import pytest
+
+from impl import ActivityLoader, ProcessDataQueryHandler
+
+
+@pytest.fixture(params=["tables", "activity"])
+def handler(request, tmp_path, process_json):
+    db_file = str(tmp_path / "json.db")
+    ActivityLoader(db_file, layout=request.param).load_file(process_json)
+    handler = ProcessDataQueryHandler()
+    handler.setDbPathOrUrl(db_file)
+    return handler
+
+
+def expected(handler, column, value):
+    # The substring match done in Python on every activity
+    activities = handler.getAllActivities()
+    values = activities[column].fillna("").str.lower()
+    return found(activities[values.str.contains(value.lower(), regex=False)])
+
+
+def found(frame):
+    return sorted(map(tuple, frame[["object_id", "type"]].values))
+
+
+@pytest.mark.parametrize(
+    "method, column, value",
+    [
+        ("getActivitiesByResponsiblePerson", "responsible_person", "jane"),
+        ("getActivitiesByResponsiblePerson", "responsible_person", "ALICE LID"),
+        ("getActivitiesByResponsibleInstitution", "responsible_institute", "co"),
+        ("getActivitiesUsingTool", "tool", "nikon"),
+        ("getActivitiesUsingTool", "tool", "50%"),
+        ("getActivitiesUsingTool", "tool", "é"),
+    ],
+)
+def test_substring_search_matches_a_python_filter(handler, method, column, value):
+    result = getattr(handler, method)(value)
+    assert found(result) == expected(handler, column, value)
+
+
+def test_technique_search_only_returns_acquisitions(handler):
+    result = handler.getAcquisitionsByTechnique("photo")
+    assert len(result) > 0 and set(result["type"]) == {"Acquisition"}
+
+
+def test_substring_search_uses_the_trigram_index(handler):
+    conn = handler.getConnection()
+    query, params = handler.activityQuery(conn, "responsible_person", "LIKE", "jane")
+    plan = " ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + query, params))
+    assert "_search VIRTUAL TABLE" in plan
+
+
+def test_date_filters_use_the_date_indexes(handler):
+    conn = handler.getConnection()
+    query, params = handler.activityQuery(conn, "start_date", ">=", "2023-06-01")
+    plan = " ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + query, params))
+    assert "start_date_idx" in plan and "SCAN" not in plan.replace("SCAN CONSTANT", "")
+    result = handler.getActivitiesStartedAfter("2023-06-01")
+    assert len(result) > 0 and (result["start_date"] >= "2023-06-01").all()
+
+
+def many_objects(count):
+    dates = [f"20{10 + i % 14}-{1 + i % 12:02d}-{1 + i % 28:02d}" for i in range(count)]
+    return [
+        {
+            "object id": str(i),
+            "acquisition": {"responsible person": f"Person {i}", "technique": "Laser", "start date": date, "end date": date},
+            "exporting": {"responsible person": f"Person {i}", "start date": date, "end date": date},
+        }
+        for i, date in enumerate(dates)
+    ]
+
+
+@pytest.mark.parametrize("layout, table", [("tables", "Acquisition"), ("activity", "activity")])
+def test_date_plans_with_the_statistics_of_a_larger_load(tmp_path, layout, table):
+    db_file = str(tmp_path / "json.db")
+    ActivityLoader(db_file, layout=layout).load(many_objects(5000))
+    handler = ProcessDataQueryHandler()
+    handler.setDbPathOrUrl(db_file)
+    conn = handler.getConnection()
+    # The statistics are read from the whole table, not from a sample
+    rows = conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+    stat = conn.execute(
+        "SELECT stat FROM sqlite_stat1 WHERE idx = ?", (f"{table}_start_date_idx",)
+    ).fetchone()[0]
+    assert int(stat.split()[0]) == rows
+    for column, operator, value in [("start_date", ">=", "2023-06-01"), ("end_date", "<=", "2010-02-01")]:
+        query, params = handler.activityQuery(conn, column, operator, value)
+        plan = " ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + query, params))
+        assert f"{column}_idx" in plan and "SCAN" not in plan
+
+
+def test_the_index_is_built_after_the_first_load(tmp_path):
+    db_file = str(tmp_path / "json.db")
+    loader = ActivityLoader(db_file)
+    loader.load(many_objects(100))
+    conn = sqlite3.connect(db_file)
+    try:
+        triggers = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+        assert "Acquisition_search_insert" in triggers
+        # Later loads go through the triggers and keep the index in sync
+        loader.load(many_objects(150)[100:])
+        conn.execute("INSERT INTO Acquisition_search (Acquisition_search, rank) VALUES ('integrity-check', 1)")
+        assert conn.execute(
+            "SELECT count(*) FROM Acquisition_search WHERE responsible_person LIKE '%son 14%'"
+        ).fetchone() == (11,)
+    finally:
+        conn.close()
+
+
+def test_the_shared_index_of_older_versions_is_replaced(tmp_path, process_json):
+    db_file = str(tmp_path / "json.db")
+    ActivityLoader(db_file).load_file(process_json)
+    conn = sqlite3.connect(db_file)
+    with conn:
+        conn.execute("CREATE TABLE activity_search_key (id INTEGER PRIMARY KEY, type TEXT, object_id TEXT)")
+        conn.execute("CREATE VIRTUAL TABLE activity_search USING fts5(responsible_person, tokenize = 'trigram')")
+    conn.close()
+    with open(process_json) as f:
+        ActivityLoader(db_file).load(json.load(f))
+    handler = ProcessDataQueryHandler()
+    handler.setDbPathOrUrl(db_file)
+    names = {row[0] for row in handler.getConnection().execute("SELECT name FROM sqlite_master")}
+    assert "activity_search_key" not in names and "activity_search" not in names
+    assert len(handler.getActivitiesByResponsiblePerson("jane")) > 0
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from impl import (
+    AdvancedMashup,
+    AsyncAdvancedMashup,
+    AsyncMetadataQueryHandler,
+    AsyncProcessDataQueryHandler,
+    BasicMashup,
+    MetadataQueryHandler,
+    ProcessDataQueryHandler,
+)
+
+
+def handlers(catalog, process_db, asynchronous):
+    metadata = AsyncMetadataQueryHandler() if asynchronous else MetadataQueryHandler()
+    metadata.setDbPathOrUrl(str(catalog / "store.nt"))
+    process = AsyncProcessDataQueryHandler() if asynchronous else ProcessDataQueryHandler()
+    process.setDbPathOrUrl(process_db)
+    return metadata, process
+
+
+def test_sync_mashups_reject_async_handlers(catalog, process_db):
+    metadata, process = handlers(catalog, process_db, True)
+    with pytest.raises(TypeError):
+        BasicMashup([metadata], [])
+    mashup = BasicMashup([], [])
+    with pytest.raises(TypeError):
+        mashup.addProcessHandler(process)
+    assert mashup.processQuery == []
+
+
+def test_async_handlers_answer_like_the_sync_ones(catalog, process_db):
+    sync_metadata, sync_process = handlers(catalog, process_db, False)
+    async_metadata, async_process = handlers(catalog, process_db, True)
+
+    async def run():
+        return await asyncio.gather(
+            async_metadata.getAllPeople(),
+            async_metadata.getAuthorsOfCulturalHeritageObjects(["1", "2"]),
+            async_process.getActivitiesUsingTool("Nikon"),
+            async_process.getActivitiesOnObjects(["1", "2"]),
+        )
+
+    people, authors, tool, activities = asyncio.run(run())
+    assert people.equals(sync_metadata.getAllPeople())
+    assert authors.equals(sync_metadata.getAuthorsOfCulturalHeritageObjects(["1", "2"]))
+    assert tool.equals(sync_process.getActivitiesUsingTool("Nikon")) and len(tool) > 0
+    assert activities.equals(sync_process.getActivitiesOnObjects(["1", "2"]))
+
+
+def test_async_mashup_matches_the_sync_mashup(catalog, process_db):
+    sync_mashup = AdvancedMashup(*[[handler] for handler in handlers(catalog, process_db, False)])
+    async_mashup = AsyncAdvancedMashup(*[[handler] for handler in handlers(catalog, process_db, True)])
+
+    expected = sorted(obj.id for obj in sync_mashup.getObjectsHandledByResponsiblePerson("Jane"))
+    found = asyncio.run(async_mashup.getObjectsHandledByResponsiblePerson("Jane"))
+    assert sorted(obj.id for obj in found) == expected and expected
+
+
+
+def test_async_activities_load_their_objects_on_first_use(catalog, process_db):
+    sync_mashup = AdvancedMashup(*[[handler] for handler in handlers(catalog, process_db, False)])
+    async_mashup = AsyncAdvancedMashup(*[[handler] for handler in handlers(catalog, process_db, True)])
+
+    expected = {a.refersTo().id: type(a.refersTo()) for a in sync_mashup.getActivitiesUsingTool("Nikon")}
+    activities = asyncio.run(async_mashup.getActivitiesUsingTool("Nikon"))
+    assert {a.refersTo().id: type(a.refersTo()) for a in activities} == expected and expected
+
+def test_async_metadata_handler_queries_the_endpoint(sparql_stub):
+    pytest.importorskip("aiohttp")
+    sparql_stub.csv = "id,name\nVIAF:1,Someone\n"
+    handler = AsyncMetadataQueryHandler()
+    handler.setDbPathOrUrl(sparql_stub.url)
+    handler.cache = None
+
+    async def run():
+        try:
+            return await handler.getAllPeople()
+        finally:
+            await handler.close()
+
+    people = asyncio.run(run())
+    assert people.values.tolist() == [["VIAF:1", "Someone"]]
+    assert sparql_stub.requests[0][0] == "application/sparql-query"
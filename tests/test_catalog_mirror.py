@@ -0,0 +1,77 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from conftest import ROOT
+from impl import (
+    ActivityLoader,
+    AdvancedMashup,
+    AsyncAdvancedMashup,
+    MetadataQueryHandler,
+    ProcessDataQueryHandler,
+)
+
+TIME_FRAME = ("2023-01-01", "2023-12-31")
+
+
+@pytest.fixture(scope="module")
+def shards(tmp_path_factory):
+    # process.json split so that the acquisition and the export of each
+    # object are in different databases
+    directory = tmp_path_factory.mktemp("shards")
+    with open(os.path.join(ROOT, "process.json")) as f:
+        data = json.load(f)
+    parts = [
+        [{key: value for key, value in item.items() if key != "exporting"} for item in data],
+        [{"object id": item["object id"], "exporting": item["exporting"]} for item in data if "exporting" in item],
+    ]
+    db_files = []
+    for i, part in enumerate(parts):
+        path = directory / f"process{i}.json"
+        path.write_text(json.dumps(part))
+        db_files.append(str(directory / f"process{i}.db"))
+        ActivityLoader(db_files[-1]).load_file(str(path))
+    return db_files
+
+
+def mashup(catalog, db_files, mirror, mashup_class=AdvancedMashup):
+    metadata = MetadataQueryHandler()
+    metadata.setDbPathOrUrl(str(catalog / "store.nt"))
+    processes = []
+    for db_file in db_files:
+        process = ProcessDataQueryHandler()
+        process.setDbPathOrUrl(db_file)
+        processes.append(process)
+    result = mashup_class([metadata], processes)
+    if mirror:
+        result.useCatalogMirror(str(catalog / "catalog.db"))
+    return result
+
+
+def ids(items):
+    return sorted(item.id for item in items)
+
+
+def test_the_mirror_answers_like_the_metadata_handlers(catalog, process_db):
+    expected = mashup(catalog, [process_db], False)
+    mirrored = mashup(catalog, [process_db], True)
+    authors = ids(expected.getAuthorsOfObjectsAcquiredInTimeFrame(*TIME_FRAME))
+    assert authors
+    assert ids(mirrored.getAuthorsOfObjectsAcquiredInTimeFrame(*TIME_FRAME)) == authors
+    assert ids(mirrored.getObjectsHandledByResponsiblePerson("alice")) == ids(
+        expected.getObjectsHandledByResponsiblePerson("alice")
+    )
+
+
+def test_the_time_frame_is_joined_across_shards(catalog, process_db, shards):
+    expected = ids(mashup(catalog, [process_db], False).getAuthorsOfObjectsAcquiredInTimeFrame(*TIME_FRAME))
+    assert ids(mashup(catalog, shards, True).getAuthorsOfObjectsAcquiredInTimeFrame(*TIME_FRAME)) == expected
+    assert ids(mashup(catalog, shards, False).getAuthorsOfObjectsAcquiredInTimeFrame(*TIME_FRAME)) == expected
+
+
+def test_the_async_time_frame_is_joined_across_shards(catalog, process_db, shards):
+    expected = ids(mashup(catalog, [process_db], False).getAuthorsOfObjectsAcquiredInTimeFrame(*TIME_FRAME))
+    sharded = mashup(catalog, shards, True, AsyncAdvancedMashup)
+    assert ids(asyncio.run(sharded.getAuthorsOfObjectsAcquiredInTimeFrame(*TIME_FRAME))) == expected
@@ -0,0 +1,80 @@
+import threading
+import time
+
+import pandas as pd
+
+from impl import (
+    ActivityLoader,
+    AdvancedMashup,
+    MetadataQueryHandler,
+    ProcessDataQueryHandler,
+    merge_frames,
+)
+
+
+class EndlessProcessDataQueryHandler(ProcessDataQueryHandler):
+    # Runs a statement that never ends on its own
+    def __init__(self):
+        super().__init__()
+        self.finished = threading.Event()
+
+    def getAllActivities(self):
+        try:
+            self.getConnection().execute(
+                "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT count(*) FROM c"
+            ).fetchall()
+        finally:
+            self.finished.set()
+
+
+class RecordingMetadataQueryHandler(MetadataQueryHandler):
+    def __init__(self):
+        super().__init__()
+        self.cache = None
+        self.finished = threading.Event()
+
+    def getAllPeople(self):
+        try:
+            return super().getAllPeople()
+        finally:
+            self.finished.set()
+
+
+def test_timed_out_sqlite_call_releases_its_thread(process_db):
+    slow = EndlessProcessDataQueryHandler()
+    slow.setDbPathOrUrl(process_db)
+    fast = ProcessDataQueryHandler()
+    fast.setDbPathOrUrl(process_db)
+    mashup = AdvancedMashup([], [slow, fast])
+    mashup.handler_timeout = 0.5
+
+    started = time.monotonic()
+    assert len(mashup.getAllActivities()) == 175
+    assert time.monotonic() - started < 5
+    assert slow.finished.wait(2)
+
+
+def test_timed_out_http_call_releases_its_thread(sparql_stub):
+    sparql_stub.delay = 3
+    slow = RecordingMetadataQueryHandler()
+    slow.setDbPathOrUrl(sparql_stub.url)
+    mashup = AdvancedMashup([slow], [])
+    mashup.handler_timeout = 0.5
+
+    assert mashup.getAllPeople() == []
+    assert slow.finished.wait(1.5)
+
+
+def test_empty_results_keep_their_columns(tmp_path, catalog):
+    empty = pd.DataFrame(columns=["object_id", "type"])
+    assert list(merge_frames([empty, None], ["object_id", "type"]).columns) == ["object_id", "type"]
+    assert merge_frames([]).empty
+
+    metadata = MetadataQueryHandler()
+    metadata.setDbPathOrUrl(str(catalog / "store.nt"))
+    process = ProcessDataQueryHandler()
+    process.setDbPathOrUrl(str(tmp_path / "nothing.db"))
+    ActivityLoader(str(tmp_path / "nothing.db")).load([])
+    mashup = AdvancedMashup([metadata], [process])
+    assert mashup.getAuthorsOfObjectsAcquiredInTimeFrame("2000-01-01", "2001-01-01") == []
+    assert mashup.getActivitiesOnObjectsAuthoredBy("VIAF:100190422") == []
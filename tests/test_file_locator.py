@@ -0,0 +1,65 @@
+import os
+import shutil
+
+import pytest
+
+import impl
+from impl import FileLocator, ProcessDataQueryHandler, ProcessDataUploadHandler, find_file
+
+
+@pytest.fixture
+def locator(tmp_path, monkeypatch):
+    # The shared locator, with its index kept out of the home directory
+    locator = FileLocator(index_path=str(tmp_path / "index.json"))
+    monkeypatch.setattr(impl, "FILE_LOCATOR", locator)
+    return locator
+
+
+def make_file(path, text=""):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+    return path
+
+
+def test_working_directory_wins_over_cached_path(tmp_path, monkeypatch, locator):
+    first = make_file(str(tmp_path / "first" / "data" / "activities.json"))
+    second = make_file(str(tmp_path / "second" / "activities.json"))
+
+    monkeypatch.chdir(tmp_path / "first")
+    assert find_file("activities.json") == os.path.realpath(first)
+    monkeypatch.chdir(tmp_path / "second")
+    assert find_file("activities.json") == os.path.realpath(second)
+
+
+def test_cache_is_kept_per_search_roots(tmp_path, monkeypatch, locator):
+    first = make_file(str(tmp_path / "first" / "data" / "catalog.csv"))
+    second = make_file(str(tmp_path / "second" / "data" / "catalog.csv"))
+
+    monkeypatch.chdir(tmp_path / "first")
+    assert find_file("catalog.csv") == os.path.realpath(first)
+    monkeypatch.chdir(tmp_path / "second")
+    assert find_file("catalog.csv") == os.path.realpath(second)
+    # A new locator reads the saved index back
+    reloaded = FileLocator(index_path=locator.index_path)
+    assert reloaded.find("catalog.csv") == os.path.realpath(second)
+
+
+def test_search_path_is_searched_without_the_cache(tmp_path, locator):
+    path = make_file(str(tmp_path / "elsewhere" / "a" / "b" / "file.txt"))
+    assert find_file("file.txt", str(tmp_path / "elsewhere")) == os.path.realpath(path)
+    assert find_file("missing.txt", str(tmp_path / "elsewhere")) is None
+
+
+def test_upload_handler_loads_the_process_json_of_the_working_directory(
+    tmp_path, monkeypatch, locator
+):
+    shutil.copy(os.path.join(os.path.dirname(impl.__file__), "process.json"), tmp_path)
+    monkeypatch.chdir(tmp_path)
+    ProcessDataUploadHandler()
+    assert os.path.realpath(ProcessDataUploadHandler(layout="activity").file_path) == os.path.realpath(
+        tmp_path / "process.json"
+    )
+    handler = ProcessDataQueryHandler()
+    handler.setDbPathOrUrl(str(tmp_path / "json.db"))
+    assert len(handler.getAllActivities()) == 175
@@ -0,0 +1,124 @@
+import gc
+
+import pandas as pd
+
+from impl import (
+    AdvancedMashup,
+    CulturalHeritageObject,
+    IdentityMap,
+    MetadataQueryHandler,
+    NauticalChart,
+    Painting,
+    ProcessDataQueryHandler,
+    materialize_objects,
+)
+
+
+class CountingMetadataQueryHandler(MetadataQueryHandler):
+    def __init__(self):
+        super().__init__()
+        self.cache = None
+        self.queries = 0
+
+    def sparqlQuery(self, query):
+        self.queries += 1
+        return super().sparqlQuery(query)
+
+
+def mashup(catalog, process_db):
+    metadata = CountingMetadataQueryHandler()
+    metadata.setDbPathOrUrl(str(catalog / "store.nt"))
+    process = ProcessDataQueryHandler()
+    process.setDbPathOrUrl(process_db)
+    return AdvancedMashup([metadata], [process]), metadata
+
+
+def test_objects_are_loaded_on_the_first_refers_to(catalog, process_db):
+    m, metadata = mashup(catalog, process_db)
+    activities = m.getAllActivities()
+    assert len(activities) == 175
+    # Activity queries do not query the metadata handlers
+    assert metadata.queries == 0
+
+    first = activities[0].refersTo()
+    # The objects of all the activities come from one batched query
+    assert metadata.queries == 1
+    assert type(first) is not CulturalHeritageObject
+    assert first.getTitle() and first.getAuthors()
+    same_object = [a.refersTo() for a in activities if a.refersTo().id == first.id]
+    assert len(same_object) == 5 and all(obj is first for obj in same_object)
+    assert metadata.queries == 1
+
+    objects = {obj.id: obj for obj in m.getAllCulturalHeritageObjects()}
+    assert objects[first.id] is first
+
+
+def test_loaded_objects_are_kept_for_later_queries(catalog, process_db):
+    m, metadata = mashup(catalog, process_db)
+    activities = m.getAllActivities()
+    [activity.refersTo() for activity in activities]
+    del activities
+    gc.collect()
+    activities = m.getActivitiesUsingTool("Blender")
+    assert activities and all(type(a.refersTo()) is not CulturalHeritageObject for a in activities)
+    assert metadata.queries == 1
+
+    m.cleanMetadataHandlers()
+    assert len(m.identity_map.objects) == 0
+
+
+def test_objects_loaded_first_are_used_directly(catalog, process_db):
+    m, metadata = mashup(catalog, process_db)
+    objects = {obj.id: obj for obj in m.getAllCulturalHeritageObjects()}
+    queries = metadata.queries
+    activities = m.getAllActivities()
+    assert all(a.refersTo() is objects[a.refersTo().id] for a in activities)
+    assert metadata.queries == queries
+
+
+def test_unknown_objects_are_not_queried_again():
+    loads = []
+    identity_map = IdentityMap(loads.append)
+    reference = identity_map.object_reference("7")
+    identity_map.object_reference("8")
+    bare = reference.resolve()
+    assert loads == [["7", "8"]]
+    assert type(bare) is CulturalHeritageObject
+    assert identity_map.object_reference("7") is bare and loads == [["7", "8"]]
+
+    chart = identity_map.cultural_heritage_object(NauticalChart, "7", "Chart", "1700", "Owner", "Place")
+    assert type(chart) is NauticalChart and chart is not bare
+    assert identity_map.object_reference("7") is chart
+
+
+def test_people_are_shared_by_id():
+    identity_map = IdentityMap()
+    person = identity_map.person("VIAF:1", "Someone")
+    obj = identity_map.cultural_heritage_object(Painting, "1", "Title", "1900", "Owner", "Place", [person])
+    assert identity_map.person("VIAF:1") is person
+    assert identity_map.cultural_heritage_object(Painting, "1", "New title", "1900", "Owner", "Place") is obj
+    assert obj.title == "New title"
+
+
+def test_authors_without_an_identifier_stay_apart():
+    identity_map = IdentityMap()
+    first = identity_map.person("noID", "Anonymous")
+    second = identity_map.person("noID", "Unknown")
+    assert first is not second
+    assert (first.name, second.name) == ("Anonymous", "Unknown")
+
+    objects = materialize_objects(
+        pd.DataFrame(
+            {
+                "type_name": ["Painting"],
+                "id": ["1"],
+                "title": ["Title"],
+                "date": ["1900"],
+                "owner": ["Owner"],
+                "place": ["Place"],
+                "authors": ["noID\tAnonymous\nnoID\tUnknown"],
+            }
+        ),
+        identity_map,
+    )
+    assert sorted(author.name for author in objects[0].getAuthors()) == ["Anonymous", "Unknown"]
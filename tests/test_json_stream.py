@@ -0,0 +1,48 @@
+import io
+import json
+import time
+
+import pytest
+
+from impl import iter_json_array
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 65536])
+def test_elements_are_parsed_across_chunk_boundaries(chunk_size):
+    data = [
+        {"object id": "1", "tool": ["a, b", "]["], "text": "quote \" and \\ and é"},
+        12345,
+        [],
+        {},
+        "string",
+        None,
+        {"nested": {"deep": [1, 2, {"x": "}"}]}},
+    ]
+    text = json.dumps(data, indent=2)
+    assert list(iter_json_array(io.StringIO(text), chunk_size)) == data
+
+
+def test_empty_array():
+    assert list(iter_json_array(io.StringIO("  [ ]  "))) == []
+
+
+def test_repository_process_json(process_json):
+    with open(process_json) as f:
+        expected = json.load(f)
+    with open(process_json) as f:
+        assert list(iter_json_array(f, 100)) == expected
+
+
+@pytest.mark.parametrize("text", ['{"a": 1}', "[1, 2", "[1 2]", "[1,]", ""])
+def test_invalid_input_raises(text):
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO(text), 3))
+
+
+def test_a_chunk_of_many_small_elements_is_parsed_in_linear_time():
+    # Copying the rest of the chunk after every element made this quadratic
+    text = json.dumps([{"a": i} for i in range(200000)])
+    start = time.monotonic()
+    count = sum(1 for _ in iter_json_array(io.StringIO(text), chunk_size=len(text)))
+    assert count == 200000
+    assert time.monotonic() - start < 5
@@ -0,0 +1,74 @@
+import os
+import shutil
+
+from rdflib import Graph, Literal, URIRef
+
+from impl import LocalRDFStore, MetadataQueryHandler, sparql_frame
+
+QUERY = """
+SELECT ?s ?name ?missing WHERE {
+    ?s <https://schema.org/name> ?name .
+    OPTIONAL { ?s <https://schema.org/missing> ?missing }
+} ORDER BY ?s
+"""
+
+
+def write_graph(path, count, mtime=None):
+    graph = Graph()
+    for i in range(count):
+        graph.add((URIRef(f"https://example.org/{i}"), URIRef("https://schema.org/name"), Literal(str(i))))
+    graph.serialize(destination=str(path), format="nt", encoding="utf-8")
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def test_results_match_the_csv_of_an_endpoint(tmp_path):
+    path = tmp_path / "store.nt"
+    write_graph(path, 3)
+    graph = Graph()
+    graph.parse(str(path), format="nt")
+    csv = graph.query(QUERY).serialize(format="csv").decode("utf-8")
+    expected = sparql_frame(csv)
+    result = LocalRDFStore(str(path)).query(QUERY)
+    assert list(result.columns) == list(expected.columns)
+    assert result["name"].tolist() == expected["name"].tolist() == ["0", "1", "2"]
+    assert result["missing"].isna().all() and expected["missing"].isna().all()
+
+
+def test_the_file_is_parsed_again_after_it_changes(tmp_path):
+    path = tmp_path / "store.nt"
+    write_graph(path, 2, mtime=1000)
+    store = LocalRDFStore(str(path))
+    key = store.cache_key()
+    assert len(store.query(QUERY)) == 2
+    graph = store.graph
+    # Unchanged file: the parsed graph is kept
+    store.query(QUERY)
+    assert store.graph is graph
+    write_graph(path, 5, mtime=2000)
+    assert len(store.query(QUERY)) == 5
+    assert store.cache_key() != key
+
+
+def test_a_missing_file_is_an_empty_store(tmp_path):
+    store = LocalRDFStore(str(tmp_path / "store.nt"))
+    assert store.query(QUERY).empty
+
+
+def test_added_quads_keep_their_triples_in_a_triple_file(tmp_path):
+    store = LocalRDFStore(str(tmp_path / "store.nt"))
+    quads = tmp_path / "data.nq"
+    quads.write_text('<https://example.org/1> <https://schema.org/name> "1" <https://example.org/graph> .\n')
+    store.add_file(str(quads))
+    assert len(LocalRDFStore(str(tmp_path / "store.nt")).query(QUERY)) == 1
+
+
+def test_the_uploaded_catalog_is_queried_in_process(catalog, tmp_path):
+    shutil.copy(catalog / "store.nt", tmp_path / "store.nt")
+    handler = MetadataQueryHandler()
+    handler.cache = None
+    handler.setDbPathOrUrl(str(tmp_path / "store.nt"))
+    people = handler.getAllPeople()
+    assert not people.empty
+    # Text values, as read from the CSV of an endpoint
+    assert all(isinstance(value, str) for value in people.iloc[:, 0])
@@ -0,0 +1,28 @@
+import os
+
+import pytest
+
+from impl import MetadataUploadHandler
+
+
+def test_nquads_with_insert_data_is_rejected_before_any_work(tmp_path, monkeypatch, sparql_stub):
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(ValueError):
+        MetadataUploadHandler(upload_mode="update", output_format="nq", endpoint=sparql_stub.url)
+    assert not os.path.exists(tmp_path / "output_triples.nq")
+    assert sparql_stub.requests == []
+
+
+def test_nquads_are_posted_with_the_graph_store_protocol(tmp_path, monkeypatch, sparql_stub):
+    monkeypatch.chdir(tmp_path)
+    handler = MetadataUploadHandler(output_format="nq", endpoint=sparql_stub.url)
+    assert handler.upload_mode == "graph"
+    content_type, body = sparql_stub.requests[0]
+    assert content_type.startswith("text/x-nquads")
+    assert body.count(b"\n") == 290
+
+
+def test_nquads_can_be_added_to_a_local_store_in_any_mode(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    MetadataUploadHandler(upload_mode="update", output_format="nq", endpoint=str(tmp_path / "store.nq"))
+    assert os.path.getsize(tmp_path / "store.nq") > 0
@@ -0,0 +1,78 @@
+import pandas as pd
+
+import impl
+from impl import MetadataQueryHandler, MetadataUploadHandler, QueryCache
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def frame(value):
+    return pd.DataFrame({"id": [value]})
+
+
+def test_results_expire_after_the_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(impl.time, "monotonic", clock.monotonic)
+    cache = QueryCache(ttl=10)
+    cache.put("endpoint", "query", frame("1"))
+    clock.now += 10
+    assert cache.get("endpoint", "query") is not None
+    clock.now += 0.1
+    assert cache.get("endpoint", "query") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 0}
+
+
+def test_the_least_recently_used_result_is_evicted():
+    cache = QueryCache(max_entries=2)
+    cache.put("endpoint", "a", frame("a"))
+    cache.put("endpoint", "b", frame("b"))
+    cache.get("endpoint", "a")
+    cache.put("endpoint", "c", frame("c"))
+    assert cache.get("endpoint", "b") is None
+    assert cache.get("endpoint", "a") is not None
+    assert cache.get("endpoint", "c") is not None
+
+
+def test_callers_get_a_copy():
+    cache = QueryCache()
+    cache.put("endpoint", "query", frame("1"))
+    cache.get("endpoint", "query")["id"] = "changed"
+    assert cache.get("endpoint", "query")["id"].tolist() == ["1"]
+
+
+def test_invalidate_forgets_one_endpoint_or_all():
+    cache = QueryCache()
+    cache.put("one", "query", frame("1"))
+    cache.put("two", "query", frame("2"))
+    cache.invalidate("one")
+    assert cache.get("one", "query") is None
+    assert cache.get("two", "query") is not None
+    cache.invalidate()
+    assert cache.stats()["entries"] == 0
+
+
+def test_repeated_queries_reach_the_endpoint_once(sparql_stub):
+    handler = MetadataQueryHandler()
+    handler.cache = QueryCache()
+    handler.setDbPathOrUrl(sparql_stub.url)
+    sparql_stub.csv = "id,name\n1,Dante\n"
+    first = handler.sparqlQuery("SELECT * WHERE { ?s ?p ?o }")
+    second = handler.sparqlQuery("SELECT * WHERE { ?s ?p ?o }")
+    assert len(sparql_stub.requests) == 1
+    assert first.equals(second)
+
+
+def test_an_upload_invalidates_the_endpoint(tmp_path, monkeypatch, sparql_stub):
+    monkeypatch.chdir(tmp_path)
+    impl.QUERY_CACHE.put(sparql_stub.url, "query", frame("1"))
+    impl.QUERY_CACHE.put("other", "query", frame("2"))
+    MetadataUploadHandler(endpoint=sparql_stub.url)
+    assert impl.QUERY_CACHE.get(sparql_stub.url, "query") is None
+    assert impl.QUERY_CACHE.get("other", "query") is not None
+    impl.QUERY_CACHE.invalidate()
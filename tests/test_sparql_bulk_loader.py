@@ -0,0 +1,68 @@
+import pytest
+import requests
+from rdflib import Literal, URIRef
+
+from impl import SPARQL_BATCH_SIZE, MetadataUploadHandler, SPARQLBulkLoader
+
+
+def triples(count):
+    name = URIRef("https://schema.org/name")
+    return [(URIRef(f"https://example.org/object/{i}"), name, Literal(f"Object {i}")) for i in range(count)]
+
+
+def test_triples_are_sent_in_batches(sparql_stub):
+    loader = SPARQLBulkLoader(sparql_stub.url, batch_size=100)
+    assert loader.load(triples(250)) == 250
+    updates = sparql_stub.updates()
+    assert len(updates) == 3
+    assert [update.count(b"+.%0A") for update in updates] == [100, 100, 50]
+
+
+def test_the_catalog_takes_one_request_with_the_default_batch_size(tmp_path, monkeypatch, sparql_stub):
+    monkeypatch.chdir(tmp_path)
+    assert SPARQL_BATCH_SIZE >= 290
+    MetadataUploadHandler(endpoint=sparql_stub.url)
+    assert len(sparql_stub.updates()) == 1
+
+
+def test_the_catalog_takes_three_requests_with_batches_of_100(tmp_path, monkeypatch, sparql_stub):
+    monkeypatch.chdir(tmp_path)
+    MetadataUploadHandler(endpoint=sparql_stub.url, batch_size=100)
+    assert len(sparql_stub.updates()) == 3
+
+
+def test_server_errors_are_retried(sparql_stub):
+    sparql_stub.failures = 2
+    loader = SPARQLBulkLoader(sparql_stub.url, retries=3, backoff=0)
+    assert loader.load(triples(10)) == 10
+    assert loader.requests_sent == 3
+    # Every attempt sent the same batch
+    assert len(set(sparql_stub.updates())) == 1
+
+
+def test_the_last_error_is_raised_when_retries_run_out(sparql_stub):
+    sparql_stub.failures = 3
+    loader = SPARQLBulkLoader(sparql_stub.url, retries=3, backoff=0)
+    with pytest.raises(requests.HTTPError):
+        loader.load(triples(10))
+    assert len(sparql_stub.requests) == 3
+
+
+def test_a_file_body_is_rewound_before_a_retry(tmp_path, sparql_stub):
+    path = tmp_path / "data.nt"
+    loader = SPARQLBulkLoader(sparql_stub.url, mode="graph", backoff=0)
+    path.write_text(loader.to_ntriples(triples(5)))
+    sparql_stub.failures = 1
+    loader.load_file(str(path))
+    first, second = (body for content_type, body in sparql_stub.requests)
+    assert first == second == path.read_bytes()
+
+
+def test_an_upload_is_confirmed_with_one_ask_query(tmp_path, monkeypatch, capsys, sparql_stub):
+    monkeypatch.chdir(tmp_path)
+    sparql_stub.csv = "s,p,o\nwhole,store,dump\n"
+    handler = MetadataUploadHandler(endpoint=sparql_stub.url)
+    queries = [body for content_type, body in sparql_stub.requests if not body.startswith(b"update=")]
+    assert len(queries) == 1 and queries[0].startswith(b"query=ASK")
+    assert "dump" not in capsys.readouterr().out
+    assert handler.confirm_upload()